@@ -1,11 +1,18 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 import json
 import os
-import random
+import time
+import uuid
+from data_processor import DataProcessor
+from assessment_engine import AssessmentEngine
+from gap_analyzer import GapAnalyzer
+from learning_path import LearningPathGenerator
+from skill_tree import SkillTreeBuilder
+from report_builder import build_report, performance_breakdown
+from event_log import ResponseLog
+from knowledge_tracing import KnowledgeTracer, LearnerMastery, MasteryStore
 
 # Page configuration
 st.set_page_config(
@@ -74,360 +81,56 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def get_data_processor():
+    """One DataProcessor (and question store) shared by every session in this process"""
+    processor = DataProcessor()
+    # Pick up edited question banks without restarting the app
+    processor.watch()
+    return processor
 
-# Define all classes in the same file to avoid import issues
-class DataProcessor:
-    def __init__(self):
-        self.courses = ['Data Science', 'AI/ML', 'Cybersecurity', 'Full Stack']
-        self.question_banks = {}
-        self.load_all_courses()
-
-    def load_all_courses(self):
-        for course in self.courses:
-            self.question_banks[course] = self._create_sample_data(course)
-
-    def _create_sample_data(self, course_name):
-        sample_data = []
-        course_configs = {
-            'Data Science': {
-                'topics': ['Statistics', 'Python', 'Data Visualization', 'Machine Learning'],
-                'questions': [
-                    ("What is the mean of a dataset?", "Average", "Median", "Mode", "Range", 0),
-                    ("Which library is used for data manipulation?", "NumPy", "Pandas", "Matplotlib", "Scikit-learn",
-                     1),
-                    ("What does PDF stand for in statistics?", "Probability Density Function",
-                     "Portable Document Format", "Both", "Neither", 0),
-                    ("What is regression analysis used for?", "Classification", "Predicting continuous values",
-                     "Clustering", "Dimensionality reduction", 1),
-                ]
-            },
-            'AI/ML': {
-                'topics': ['Linear Algebra', 'Calculus', 'Neural Networks', 'Deep Learning'],
-                'questions': [
-                    ("What is a gradient in machine learning?", "Slope of a function", "Type of algorithm",
-                     "Data structure", "Learning rate", 0),
-                    ("What does ReLU stand for?", "Rectified Linear Unit", "Real Learning Update",
-                     "Regression Linear Unit", "Random Learning Update", 0),
-                    ("What is overfitting?", "Model too simple", "Model too complex", "Perfect fit", "Underperformance",
-                     1),
-                    ("What is backpropagation used for?", "Data preprocessing", "Training neural networks",
-                     "Feature selection", "Model evaluation", 1),
-                ]
-            },
-            'Cybersecurity': {
-                'topics': ['Network Security', 'Cryptography', 'Ethical Hacking', 'OS Security'],
-                'questions': [
-                    ("What is a firewall used for?", "Network security", "Data backup", "Speed optimization",
-                     "Memory management", 0),
-                    ("What is encryption?", "Data scrambling", "Data compression", "Data deletion", "Data copying", 0),
-                    ("What is phishing?", "Social engineering attack", "Virus type", "Firewall technique",
-                     "Encryption method", 0),
-                    ("What is two-factor authentication?", "Security verification", "Data encryption",
-                     "Network protocol", "Backup method", 0),
-                ]
-            },
-            'Full Stack': {
-                'topics': ['HTML/CSS', 'JavaScript', 'React', 'Node.js'],
-                'questions': [
-                    ("What does HTML stand for?", "HyperText Markup Language", "HighTech Modern Language",
-                     "Hyper Transfer Markup Language", "HighText Machine Language", 0),
-                    ("What is CSS used for?", "Styling web pages", "Adding interactivity", "Database management",
-                     "Server operations", 0),
-                    ("What is JavaScript primarily used for?", "Client-side scripting", "Database management",
-                     "Server configuration", "Graphic design", 0),
-                    ("What is React?", "Frontend framework", "Backend framework", "Database", "Programming language",
-                     0),
-                ]
-            }
-        }
-
-        config = course_configs[course_name]
-        for i in range(20):
-            topic = config['topics'][i % len(config['topics'])]
-            level = (i % 5) + 1
-            question_data = config['questions'][i % len(config['questions'])]
-
-            sample_data.append({
-                'id': f"{course_name[:2].lower()}_{i + 1}",
-                'course': course_name,
-                'topic': topic,
-                'level': level,
-                'question': question_data[0],
-                'option_a': question_data[1],
-                'option_b': question_data[2],
-                'option_c': question_data[3],
-                'option_d': question_data[4],
-                'correct_answer': question_data[5]
-            })
-
-        return pd.DataFrame(sample_data)
-
-    def get_questions_by_level(self, course, level, limit=None):
-        if course not in self.question_banks:
-            return pd.DataFrame()
-        df = self.question_banks[course]
-        filtered = df[df['level'] == level]
-        if limit and len(filtered) > limit:
-            filtered = filtered.sample(n=limit)
-        return filtered
-
-    def get_level_distribution(self, course):
-        if course not in self.question_banks:
-            return {}
-        df = self.question_banks[course]
-        return df['level'].value_counts().sort_index().to_dict()
-
-
-class AssessmentEngine:
-    def __init__(self, data_processor):
-        self.data_processor = data_processor
-
-    def generate_adaptive_quiz(self, course, initial_level):
-        quiz_questions = []
-        for level in range(1, 6):
-            questions = self.data_processor.get_questions_by_level(course, level, 4)
-            for _, q_row in questions.iterrows():
-                quiz_questions.append({
-                    'question_data': q_row,
-                    'adaptive_level': level,
-                    'question_number': len(quiz_questions) + 1
-                })
-        random.shuffle(quiz_questions)
-        for idx, q in enumerate(quiz_questions):
-            q['question_number'] = idx + 1
-        return quiz_questions[:20]
-
-    def calculate_score(self, answers, quiz_questions):
-        correct_count = 0
-        level_performance = {1: {'correct': 0, 'total': 0}, 2: {'correct': 0, 'total': 0},
-                             3: {'correct': 0, 'total': 0}, 4: {'correct': 0, 'total': 0},
-                             5: {'correct': 0, 'total': 0}}
-        topic_performance = {}
-
-        for q_dict in quiz_questions:
-            q_num = q_dict['question_number']
-            q_data = q_dict['question_data']
-            level = q_dict['adaptive_level']
-            topic = q_data['topic']
-
-            if topic not in topic_performance:
-                topic_performance[topic] = {'correct': 0, 'total': 0}
-
-            level_performance[level]['total'] += 1
-            topic_performance[topic]['total'] += 1
-
-            if q_num in answers:
-                user_answer = answers[q_num]
-                correct_answer = q_data['correct_answer']
-                if user_answer == correct_answer:
-                    correct_count += 1
-                    level_performance[level]['correct'] += 1
-                    topic_performance[topic]['correct'] += 1
-
-        score_percentage = (correct_count / len(quiz_questions) * 100) if quiz_questions else 0
-        return {
-            'score_percentage': score_percentage,
-            'correct_count': correct_count,
-            'total_count': len(quiz_questions),
-            'level_performance': level_performance,
-            'topic_performance': topic_performance
-        }
-
-
-class GapAnalyzer:
-    def __init__(self):
-        self.mastery_threshold = 70
-        self.weak_threshold = 50
-
-    def analyze_gaps(self, results, course, initial_level):
-        level_performance = results['level_performance']
-        topic_performance = results['topic_performance']
-
-        strong_topics = []
-        weak_topics = []
-        moderate_topics = []
-
-        for topic, perf in topic_performance.items():
-            if perf['total'] > 0:
-                percentage = (perf['correct'] / perf['total'] * 100)
-                topic_data = {
-                    'topic': topic,
-                    'percentage': percentage,
-                    'correct': perf['correct'],
-                    'total': perf['total']
-                }
-
-                if percentage >= 80:
-                    strong_topics.append(topic_data)
-                elif percentage < 60:
-                    weak_topics.append(topic_data)
-                else:
-                    moderate_topics.append(topic_data)
-
-        overall_score = results['score_percentage']
-        if overall_score >= 80:
-            readiness = "Excellent"
-            readiness_message = "You have excellent prerequisite knowledge for this course."
-        elif overall_score >= 70:
-            readiness = "Good"
-            readiness_message = "You have solid foundational knowledge. Minor improvements needed."
-        elif overall_score >= 60:
-            readiness = "Satisfactory"
-            readiness_message = "You have basic understanding. Focus on key improvement areas."
-        else:
-            readiness = "Needs Improvement"
-            readiness_message = "Significant preparation recommended before starting the course."
-
-        actual_level = self._calculate_actual_level(level_performance)
-        level_gap = initial_level - actual_level
-
-        return {
-            'overall_score': overall_score,
-            'readiness': readiness,
-            'readiness_message': readiness_message,
-            'strong_topics': strong_topics,
-            'weak_topics': weak_topics,
-            'moderate_topics': moderate_topics,
-            'actual_level': actual_level,
-            'self_assessed_level': initial_level,
-            'level_gap': level_gap,
-            'level_gap_message': self._get_level_gap_message(level_gap),
-            'level_performance': level_performance,
-            'topic_performance': topic_performance
-        }
-
-    def _calculate_actual_level(self, level_performance):
-        actual_level = 1
-        for level in range(5, 0, -1):
-            perf = level_performance[level]
-            if perf['total'] > 0:
-                percentage = (perf['correct'] / perf['total'] * 100)
-                if percentage >= self.mastery_threshold:
-                    actual_level = level
-                    break
-        return actual_level
-
-    def _get_level_gap_message(self, gap):
-        if gap > 2:
-            return "Your self-assessment was significantly higher than your actual performance. Focus on fundamentals."
-        elif gap > 0:
-            return "Your self-assessment was slightly optimistic. Review the recommended materials."
-        elif gap == 0:
-            return "Your self-assessment matches your performance. Great self-awareness!"
-        else:
-            return "You're performing above your self-assessment. Consider challenging yourself more!"
-
-    def generate_priority_list(self, gap_analysis):
-        priorities = []
-
-        for topic in gap_analysis['weak_topics']:
-            priorities.append({
-                'priority': 'High',
-                'area': topic['topic'],
-                'type': 'Topic',
-                'score': topic['percentage'],
-                'reason': f"Low performance ({topic['percentage']:.1f}%) - needs immediate attention"
-            })
-
-        for topic in gap_analysis['moderate_topics']:
-            priorities.append({
-                'priority': 'Medium',
-                'area': topic['topic'],
-                'type': 'Topic',
-                'score': topic['percentage'],
-                'reason': f"Room for improvement ({topic['percentage']:.1f}%)"
-            })
-
-        return priorities
-
-
-class LearningPathGenerator:
-    def generate_learning_path(self, course, gap_analysis, priorities):
-        learning_path = {
-            'immediate_focus': [],
-            'short_term': [],
-            'long_term': [],
-            'estimated_hours': 0
-        }
-
-        for item in priorities[:3]:
-            learning_path['immediate_focus'].append({
-                'area': item['area'],
-                'current_score': f"{item['score']:.1f}%",
-                'target_score': '70%+',
-                'resources': [
-                    f'Online tutorials on {item["area"]}',
-                    f'Practice exercises for {item["area"]}',
-                    f'Video courses covering {item["area"]} fundamentals',
-                    f'Interactive coding challenges'
-                ],
-                'estimated_hours': 6
-            })
-            learning_path['estimated_hours'] += 6
-
-        return learning_path
-
-    def generate_study_schedule(self, learning_path, weeks=4):
-        schedule = []
-        for i in range(weeks):
-            focus_areas = {
-                1: "Foundation Building & Core Concepts",
-                2: "Practice & Skill Development",
-                3: "Advanced Topics & Projects",
-                4: "Review & Final Assessment"
-            }
-            schedule.append({
-                'week': i + 1,
-                'focus': focus_areas[i + 1],
-                'activities': [
-                    'Complete all assigned readings and tutorials',
-                    'Solve daily practice problems',
-                    'Participate in discussion forums',
-                    'Work on mini-projects',
-                    'Take weekly progress assessment'
-                ],
-                'hours': 8
-            })
-        return schedule
-
-
-class SkillTreeBuilder:
-    def build_skill_tree(self, course, gap_analysis):
-        labels = [course, "Foundation", "Intermediate", "Advanced", "Expert"]
-        parents = ["", course, course, course, course]
-        values = [100, 25, 25, 25, 25]
-        colors = ['lightblue', 'lightgreen', 'yellow', 'orange', 'lightcoral']
-
-        fig = go.Figure(go.Sunburst(
-            labels=labels,
-            parents=parents,
-            values=values,
-            marker=dict(colors=colors),
-            branchvalues="total"
-        ))
-        fig.update_layout(title=f"{course} Skill Tree", width=600, height=600)
-        return fig
-
-    def create_performance_radar(self, gap_analysis):
-        levels = [f"Level {i}" for i in range(1, 6)]
-        scores = [70, 65, 60, 55, 50]
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(
-            r=scores,
-            theta=levels,
-            fill='toself',
-            name='Your Performance'
-        ))
-        fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])))
-        return fig
+
+@st.cache_resource
+def get_assessment_engine(_data_processor):
+    """Shared engine, so quiz form pools and adaptive test-length statistics cover every session"""
+    engine = AssessmentEngine(_data_processor)
+    for course in _data_processor.catalog.most_popular(2):
+        engine.prepare_forms(course)
+    return engine
+
+
+@st.cache_resource
+def get_response_log():
+    """Process-wide answer log; writes happen on its background thread"""
+    return ResponseLog(os.path.join("uploads", ".events", "responses.sqlite"))
+
+
+@st.cache_resource
+def get_mastery_store():
+    """Topic mastery per learner, kept across quiz attempts"""
+    return MasteryStore(os.path.join("uploads", ".events", "mastery.sqlite"))
 
 
+@st.cache_resource
+def get_learning_path_generator():
+    """Resource library and its topic aliases, registered once per process"""
+    return LearningPathGenerator()
+
+
+@st.cache_resource
+def get_skill_tree_builder():
+    """Skill hierarchies and their topic aliases, registered once per process"""
+    return SkillTreeBuilder()
+
+
+data_processor = get_data_processor()
+response_log = get_response_log()
+mastery_store = get_mastery_store()
+knowledge_tracer = KnowledgeTracer()
+
 # Initialize session state
 if 'page' not in st.session_state:
     st.session_state.page = 'home'
-if 'data_processor' not in st.session_state:
-    st.session_state.data_processor = DataProcessor()
 if 'selected_course' not in st.session_state:
     st.session_state.selected_course = None
 if 'selected_level' not in st.session_state:
@@ -444,12 +147,33 @@ if 'results' not in st.session_state:
     st.session_state.results = None
 if 'gap_analysis' not in st.session_state:
     st.session_state.gap_analysis = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'learner_id' not in st.session_state:
+    # Mastery is stored per learner, so a ?learner= link resumes it from any browser
+    st.session_state.learner_id = st.query_params.get('learner', '').strip()
+if 'shown_at' not in st.session_state:
+    st.session_state.shown_at = {}
+
+
+def start_retake():
+    """Clear the finished quiz but keep the learner and course; the next attempt reloads stored mastery"""
+    st.session_state.pop('score_tracker', None)
+    st.session_state.pop('mastery', None)
+    st.session_state.quiz_questions = []
+    st.session_state.current_question = 0
+    st.session_state.answers = {}
+    st.session_state.quiz_completed = False
+    st.session_state.results = None
+    st.session_state.gap_analysis = None
+    st.session_state.shown_at = {}
+    st.session_state.page = 'assessment'
 
 # Initialize engines
-assessment_engine = AssessmentEngine(st.session_state.data_processor)
+assessment_engine = get_assessment_engine(data_processor)
 gap_analyzer = GapAnalyzer()
-learning_path_gen = LearningPathGenerator()
-skill_tree_builder = SkillTreeBuilder()
+learning_path_gen = get_learning_path_generator()
+skill_tree_builder = get_skill_tree_builder()
 
 # Sidebar navigation
 st.sidebar.title("📚 Navigation")
@@ -484,13 +208,15 @@ if st.session_state.page == 'home':
     """, unsafe_allow_html=True)
 
     st.markdown("### 📋 Available Courses")
+    course_names = data_processor.catalog.names()
     col1, col2 = st.columns(2)
+    half = (len(course_names) + 1) // 2
     with col1:
-        st.markdown("**🔬 Data Science**")
-        st.markdown("**🤖 AI/ML**")
+        for course_name in course_names[:half]:
+            st.markdown(f"**{course_name}**")
     with col2:
-        st.markdown("**🔒 Cybersecurity**")
-        st.markdown("**💻 Full Stack**")
+        for course_name in course_names[half:]:
+            st.markdown(f"**{course_name}**")
 
     st.markdown("---")
     st.markdown("### 🚀 Get Started")
@@ -502,65 +228,134 @@ elif st.session_state.page == 'assessment':
 
     if not st.session_state.selected_course:
         st.markdown("### Step 1: Select Your Course")
-        course_options = st.session_state.data_processor.courses
+        learner_id = st.text_input("Your name or student ID:", value=st.session_state.learner_id,
+                                   help="Your progress is saved under this ID; use the same one when you retake")
+        course_options = data_processor.catalog.names()
         selected = st.selectbox("Choose a course:", course_options)
+        # Start loading the highlighted course and its quiz forms while the student decides
+        assessment_engine.prepare_forms(selected)
         if st.button("Select Course"):
-            st.session_state.selected_course = selected
-            st.rerun()
+            if not learner_id.strip():
+                st.warning("Enter your name or student ID so your progress can be saved.")
+            else:
+                st.session_state.learner_id = learner_id.strip()
+                st.query_params['learner'] = st.session_state.learner_id
+                st.session_state.selected_course = selected
+                with st.spinner('Loading question bank...'):
+                    data_processor.get_bank(selected)
+                st.rerun()
 
     elif not st.session_state.quiz_questions:
         st.markdown(f"### Step 2: Self-Assess Your Level")
         st.markdown(f"**Selected Course:** {st.session_state.selected_course}")
+        known_mastery = mastery_store.load(st.session_state.learner_id, st.session_state.selected_course)
+        if known_mastery:
+            st.info(f"Welcome back, {st.session_state.learner_id}! This attempt builds on your mastery "
+                    f"of {len(known_mastery)} topics from earlier attempts.")
 
         level = st.slider("Rate your knowledge level (1-5):", 1, 5, 3)
         st.session_state.selected_level = level
 
+        mode = st.radio("Assessment mode:", ["Adaptive", "Fixed form"],
+                        help="Adaptive picks each question from your previous answers")
+
         if st.button("Start Assessment"):
             with st.spinner('Generating quiz...'):
-                st.session_state.quiz_questions = assessment_engine.generate_adaptive_quiz(
-                    st.session_state.selected_course, level
+                if mode == "Adaptive":
+                    st.session_state.quiz_questions = assessment_engine.start_adaptive_quiz(
+                        st.session_state.selected_course, level
+                    )
+                else:
+                    st.session_state.quiz_questions = assessment_engine.generate_adaptive_quiz(
+                        st.session_state.selected_course, level
+                    )
+                st.session_state.score_tracker = assessment_engine.track(st.session_state.quiz_questions)
+                st.session_state.mastery = LearnerMastery(
+                    knowledge_tracer, st.session_state.selected_course, known_mastery
                 )
                 st.rerun()
 
     elif not st.session_state.quiz_completed:
-        total_questions = len(st.session_state.quiz_questions)
+        quiz = st.session_state.quiz_questions
+        total_questions = quiz.planned_length
         current_idx = st.session_state.current_question
 
         progress = current_idx / total_questions
-        st.progress(progress, text=f"Question {current_idx + 1} of {total_questions}")
+        # Adaptive quizzes may stop early once the estimate is precise enough
+        of_total = f"up to {total_questions}" if quiz.adaptive else total_questions
+        st.progress(progress, text=f"Question {current_idx + 1} of {of_total}")
+        tracker = st.session_state.score_tracker
+        if tracker.answered:
+            st.caption(f"Running score: {tracker.correct_count} of {tracker.answered} answered correctly")
 
-        q_dict = st.session_state.quiz_questions[current_idx]
-        q_data = q_dict['question_data']
+        # Question text is resolved from the shared bank only when rendered
+        q_dict = quiz.question(current_idx)
+        st.session_state.shown_at.setdefault(current_idx, time.time())
 
         st.markdown(f"### Question {current_idx + 1}")
-        st.markdown(f"**Level:** {q_dict['adaptive_level']} | **Topic:** {q_data['topic']}")
-        st.markdown(f"**{q_data['question']}**")
-
-        options = [q_data['option_a'], q_data['option_b'], q_data['option_c'], q_data['option_d']]
-        selected_option = st.radio("Select your answer:", options, key=f"q_{current_idx}")
+        st.markdown(f"**Level:** {q_dict['adaptive_level']} | **Topic:** {q_dict['topic']}")
+        st.markdown(f"**{q_dict['question']}**")
+
+        options = q_dict['options']
+        selected_option = st.radio("Select your answer:", range(len(options)),
+                                   format_func=lambda i: options[i], key=f"q_{current_idx}")
+
+        def record_answer():
+            st.session_state.answers[q_dict['question_number']] = selected_option
+            tracker.record(current_idx, selected_option)
+            correct = quiz.is_correct(current_idx, selected_option)
+            st.session_state.mastery.record(q_dict['topic'], correct, question=current_idx)
+            response_log.record(
+                session_id=st.session_state.session_id,
+                course=quiz.course,
+                question_id=q_dict['id'],
+                chosen=selected_option,
+                correct=correct,
+                latency_ms=(time.time() - st.session_state.shown_at[current_idx]) * 1000,
+                position=q_dict['question_number'],
+                bank_version=quiz.bank.version,
+                mode='adaptive' if quiz.adaptive else 'fixed',
+                learner_id=st.session_state.learner_id
+            )
+
+        def submit_assessment():
+            # Tallies were kept up to date answer by answer
+            st.session_state.results = assessment_engine.tracked_results(tracker)
+            mastery = st.session_state.mastery
+            mastery_store.save(st.session_state.learner_id, mastery)
+            st.session_state.gap_analysis = gap_analyzer.analyze_gaps(
+                st.session_state.results, st.session_state.selected_course, st.session_state.selected_level,
+                mastery=mastery.probabilities()
+            )
+            st.session_state.quiz_completed = True
+            st.success("Assessment completed!")
+            st.balloons()
+            st.rerun()
 
         col1, col2, col3 = st.columns([1, 1, 1])
-        with col1:
-            if current_idx > 0 and st.button("Previous"):
-                st.session_state.current_question -= 1
-                st.rerun()
-        with col3:
-            if current_idx < total_questions - 1 and st.button("Next"):
-                st.session_state.answers[q_dict['question_number']] = options.index(selected_option)
-                st.session_state.current_question += 1
-                st.rerun()
-            elif current_idx == total_questions - 1 and st.button("Submit"):
-                st.session_state.answers[q_dict['question_number']] = options.index(selected_option)
-                st.session_state.results = assessment_engine.calculate_score(
-                    st.session_state.answers, st.session_state.quiz_questions
-                )
-                st.session_state.gap_analysis = gap_analyzer.analyze_gaps(
-                    st.session_state.results, st.session_state.selected_course, st.session_state.selected_level
-                )
-                st.session_state.quiz_completed = True
-                st.success("Assessment completed!")
-                st.balloons()
-                st.rerun()
+        if quiz.adaptive:
+            # Later questions depend on earlier answers, so there is no going back
+            with col3:
+                if st.button("Next"):
+                    record_answer()
+                    if assessment_engine.record_adaptive_answer(quiz, selected_option):
+                        st.session_state.current_question += 1
+                        st.rerun()
+                    else:
+                        submit_assessment()
+        else:
+            with col1:
+                if current_idx > 0 and st.button("Previous"):
+                    st.session_state.current_question -= 1
+                    st.rerun()
+            with col3:
+                if current_idx < total_questions - 1 and st.button("Next"):
+                    record_answer()
+                    st.session_state.current_question += 1
+                    st.rerun()
+                elif current_idx == total_questions - 1 and st.button("Submit"):
+                    record_answer()
+                    submit_assessment()
 
 # RESULTS PAGE
 elif st.session_state.page == 'results' and st.session_state.gap_analysis:
@@ -678,6 +473,9 @@ elif st.session_state.page == 'results' and st.session_state.gap_analysis:
         if st.button("📚 View Detailed Learning Path", type="primary"):
             st.session_state.page = 'learning_path'
             st.rerun()
+        if st.button("🔁 Retake Assessment"):
+            start_retake()
+            st.rerun()
 
 # LEARNING PATH PAGE
 elif st.session_state.page == 'learning_path' and st.session_state.gap_analysis:
@@ -697,12 +495,13 @@ elif st.session_state.page == 'learning_path' and st.session_state.gap_analysis:
         <div class="info-box">
         <h3>📋 Gap Analysis Report</h3>
         <h4>Candidate Information</h4>
-        <p><strong>Candidate Name:</strong> Student</p>
+        <p><strong>Candidate Name:</strong> {}</p>
         <p><strong>Test Date:</strong> {}</p>
         <p><strong>Score:</strong> {}/{} ({:.1f}%)</p>
         <p><strong>Overall Status:</strong> {}</p>
         </div>
         """.format(
+            st.session_state.learner_id or 'Student',
             datetime.now().strftime('%Y-%m-%d'),
             st.session_state.results['correct_count'],
             st.session_state.results['total_count'],
@@ -715,31 +514,7 @@ elif st.session_state.page == 'learning_path' and st.session_state.gap_analysis:
         st.markdown("### 📊 Section-wise Performance")
 
         # Create performance table
-        performance_data = []
-        for topic, perf in st.session_state.results['topic_performance'].items():
-            if perf['total'] > 0:
-                percentage = (perf['correct'] / perf['total'] * 100)
-                if percentage >= 80:
-                    strength = "Excellent"
-                    remarks = "Strong understanding of this topic"
-                elif percentage >= 70:
-                    strength = "Good"
-                    remarks = "Good performance, minor improvements needed"
-                elif percentage >= 60:
-                    strength = "Satisfactory"
-                    remarks = "Basic understanding, needs practice"
-                else:
-                    strength = "Needs Improvement"
-                    remarks = "Significant improvement required"
-
-                performance_data.append({
-                    'Section': topic,
-                    'Correct': perf['correct'],
-                    'Incorrect': perf['total'] - perf['correct'],
-                    'Unattempted': 0,
-                    'Strength Level': strength,
-                    'Remarks': remarks
-                })
+        performance_data = performance_breakdown(st.session_state.results['topic_performance'])
 
         # Display as table
         perf_df = pd.DataFrame(performance_data)
@@ -776,6 +551,8 @@ elif st.session_state.page == 'learning_path' and st.session_state.gap_analysis:
                 st.markdown(f"**Current Performance:** {item['current_score']}")
                 st.markdown(f"**Target:** {item['target_score']}")
                 st.markdown(f"**Time Commitment:** {item['estimated_hours']} hours")
+                if item.get('prerequisites'):
+                    st.markdown(f"**Review First:** {', '.join(item['prerequisites'])}")
                 st.markdown("**Action Plan:**")
                 for resource in item['resources']:
                     st.markdown(f"- {resource}")
@@ -784,6 +561,10 @@ elif st.session_state.page == 'learning_path' and st.session_state.gap_analysis:
                 st.markdown("- Ability to solve intermediate problems")
                 st.markdown("- Improved confidence in this area")
 
+        if learning_path.get('next_skills'):
+            st.markdown("#### 🧭 Ready to Learn Next")
+            st.markdown(", ".join(learning_path['next_skills']))
+
         # Study schedule
         st.markdown("---")
         st.markdown("### 📆 4-Week Study Plan")
@@ -809,24 +590,8 @@ elif st.session_state.page == 'learning_path' and st.session_state.gap_analysis:
         st.markdown("---")
         st.markdown("### 📥 Download Full Report")
 
-        report_data = {
-            'candidate_name': 'Student',
-            'course': st.session_state.selected_course,
-            'test_date': datetime.now().strftime('%Y-%m-%d'),
-            'score': f"{st.session_state.results['correct_count']}/{st.session_state.results['total_count']}",
-            'percentage': gap['overall_score'],
-            'status': gap['readiness'],
-            'performance_breakdown': performance_data,
-            'strengths': [f"Excellent knowledge of {topic['topic']}" for topic in gap['strong_topics']],
-            'improvement_areas': [f"Improve understanding of {topic['topic']}" for topic in gap['weak_topics']],
-            'recommendations': [
-                "Review and practice core concepts",
-                "Take advanced courses on weak areas",
-                "Practice with real-world projects",
-                "Participate in coding exercises",
-                "Engage in peer learning activities"
-            ]
-        }
+        report_data = build_report(st.session_state.selected_course, st.session_state.results, gap,
+                                   candidate_name=st.session_state.learner_id or 'Student')
 
         report_json = json.dumps(report_data, indent=2)
         st.download_button(
@@ -1,7 +1,246 @@
-import pandas as pd
-import random
-from typing import Dict, List, Tuple
+import threading
+
+import numpy as np
+from typing import Dict, List
 from data_processor import DataProcessor
+from question_store import QuestionBank
+from irt import AbilityEstimate, ItemPool, get_item_pool, level_to_theta, theta_to_level
+from quiz_forms import QuizFormPool
+from stratified_sampler import get_stratified_sampler
+
+
+class Quiz:
+    """
+    Compact quiz representation kept in session state
+
+    Holds only question ids (row positions in a pinned bank version) and
+    the level each question was drawn for. Question text and options are
+    resolved from the shared bank when a question is rendered.
+    """
+
+    __slots__ = ('bank', 'question_ids', 'levels')
+
+    adaptive = False
+
+    def __init__(self, bank: QuestionBank, question_ids: np.ndarray, levels: np.ndarray):
+        self.bank = bank
+        self.question_ids = np.asarray(question_ids, dtype=np.int32)
+        self.levels = np.asarray(levels, dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    @property
+    def course(self) -> str:
+        return self.bank.course if self.bank is not None else None
+
+    @property
+    def planned_length(self) -> int:
+        """Number of questions the student should expect"""
+        return len(self)
+
+    def is_correct(self, index: int, answer: int) -> bool:
+        """Whether an option index answers the question at a zero-based quiz position"""
+        return bool(answer == self.bank.answer_key[self.question_ids[index]])
+
+    def question(self, index: int) -> Dict:
+        """Display fields for the question at a zero-based quiz position"""
+        q = self.bank.question(self.question_ids[index])
+        q['question_number'] = index + 1
+        q['adaptive_level'] = int(self.levels[index])
+        return q
+
+
+class AdaptiveQuiz(Quiz):
+    """
+    Quiz that grows one question at a time
+
+    Each answer updates the ability estimate and the next question is the
+    most informative unused item at the new estimate.
+    """
+
+    __slots__ = ('pool', 'ability', 'responses', 'max_length', 'finished', 'stop_reason', 'rng')
+
+    adaptive = True
+
+    def __init__(self, bank: QuestionBank, pool: ItemPool, ability: AbilityEstimate, max_length: int):
+        super().__init__(bank, [], [])
+        self.pool = pool
+        self.ability = ability
+        self.responses = []
+        self.max_length = max_length
+        self.finished = False
+        self.stop_reason = None
+        self.rng = np.random.default_rng()
+
+    @property
+    def planned_length(self) -> int:
+        return len(self) if self.finished else self.max_length
+
+    def add(self, question_id: int, level: int):
+        self.question_ids = np.append(self.question_ids, np.int32(question_id))
+        self.levels = np.append(self.levels, np.int8(level))
+
+
+class ScoreTracker:
+    """
+    Running score of one quiz, updated as each answer is recorded
+
+    Changing an earlier answer adjusts the tallies by the difference, so
+    results are available at any moment without rescoring the quiz.
+    Questions an adaptive quiz adds later are picked up on the next call.
+    """
+
+    def __init__(self, quiz: Quiz):
+        self.quiz = quiz
+        self.chosen = []
+        self.correct = []
+        self.slots = []
+        self.correct_count = 0
+        self.answered = 0
+        self.level_correct = [0] * 6
+        self.level_total = [0] * 6
+        self.level_answered = [0] * 6
+        # Topics in first-appearance order, as calculate_score reports them
+        self.topic_slots = {}
+        self.topic_codes = []
+        self.topic_correct = []
+        self.topic_total = []
+        self.topic_answered = []
+        self.sync()
+
+    def sync(self):
+        """Start tracking questions added to the quiz since the last call"""
+        if self.quiz.bank is None:
+            return
+        topic_codes = self.quiz.bank.index.topic_codes
+        for index in range(len(self.chosen), len(self.quiz)):
+            self.level_total[int(self.quiz.levels[index])] += 1
+            code = int(topic_codes[self.quiz.question_ids[index]])
+            slot = self.topic_slots.get(code)
+            if slot is None:
+                slot = self.topic_slots[code] = len(self.topic_codes)
+                self.topic_codes.append(code)
+                self.topic_correct.append(0)
+                self.topic_total.append(0)
+                self.topic_answered.append(0)
+            self.topic_total[slot] += 1
+            self.chosen.append(-1)
+            self.correct.append(False)
+            self.slots.append(slot)
+
+    def record(self, index: int, answer: int):
+        """Record or change the answer to the question at a zero-based quiz position"""
+        self.sync()
+        level = int(self.quiz.levels[index])
+        slot = self.slots[index]
+        if self.chosen[index] < 0:
+            self.answered += 1
+            self.level_answered[level] += 1
+            self.topic_answered[slot] += 1
+
+        now = self.quiz.is_correct(index, answer)
+        delta = int(now) - int(self.correct[index])
+        self.chosen[index] = answer
+        self.correct[index] = now
+        self.correct_count += delta
+        self.level_correct[level] += delta
+        self.topic_correct[slot] += delta
+
+    def results(self) -> Dict:
+        """Final results, identical to AssessmentEngine.calculate_score; unanswered questions count as wrong"""
+        self.sync()
+        return self._results(len(self.chosen), self.level_total, self.topic_total)
+
+    def partial_results(self) -> Dict:
+        """Results over the questions answered so far, for a live gap analysis"""
+        self.sync()
+        return self._results(self.answered, self.level_answered, self.topic_answered)
+
+    def _results(self, total_count: int, level_total: List[int], topic_total: List[int]) -> Dict:
+        topic_names = self.quiz.bank.index.topics if self.quiz.bank is not None else []
+        shown = [slot for slot, total in enumerate(topic_total) if total > 0]
+        codes = np.array([self.topic_codes[slot] for slot in shown], dtype=np.int32)
+        topic_correct = np.array([self.topic_correct[slot] for slot in shown], dtype=np.int64)
+        topic_totals = np.array([topic_total[slot] for slot in shown], dtype=np.int64)
+
+        return {
+            'score_percentage': (self.correct_count / total_count * 100) if total_count > 0 else 0,
+            'correct_count': self.correct_count,
+            'total_count': total_count,
+            'level_performance': {level: {'correct': self.level_correct[level], 'total': level_total[level]}
+                                  for level in range(1, 6)},
+            'topic_performance': {topic_names[code]: {'correct': int(c), 'total': int(t)}
+                                  for code, c, t in zip(codes, topic_correct, topic_totals)},
+            'topic_codes': codes,
+            'topic_correct': topic_correct,
+            'topic_total': topic_totals,
+            'topic_names': topic_names
+        }
+
+
+class BatchScores:
+    """
+    Columnar scoring results for a cohort
+
+    Every tally is an array with one row per student, so cohort-wide
+    statistics need no per-student Python work. results(i) expands one
+    student into the dict shape GapAnalyzer.analyze_gaps consumes.
+    """
+
+    __slots__ = ('correct', 'correct_count', 'total_count', 'level_correct', 'level_total',
+                 'topic_codes', 'topic_correct', 'topic_total', 'topic_names', '_student_topics')
+
+    def __init__(self, correct, level_correct, level_total, topic_codes, topic_correct, topic_total,
+                 topic_names, student_topics):
+        self.correct = correct
+        self.correct_count = correct.sum(axis=1)
+        self.total_count = correct.shape[1]
+        self.level_correct = level_correct
+        self.level_total = level_total
+        self.topic_codes = topic_codes
+        self.topic_correct = topic_correct
+        self.topic_total = topic_total
+        self.topic_names = topic_names
+        self._student_topics = student_topics
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+    @property
+    def score_percentage(self) -> np.ndarray:
+        if not self.total_count:
+            return np.zeros(len(self))
+        return self.correct_count / self.total_count * 100
+
+    def results(self, student: int) -> Dict:
+        """Scoring results for one student, as returned by AssessmentEngine.calculate_score"""
+        level_performance = {level: {'correct': int(self.level_correct[student, level]),
+                                     'total': int(self.level_total[student, level])}
+                             for level in range(1, 6)}
+
+        # Topics in the order the student met them, as in the quiz
+        row = self._student_topics[student] if self._student_topics.ndim == 2 else self._student_topics
+        present, first_seen = np.unique(row, return_index=True)
+        present = present[np.argsort(first_seen)]
+        columns = np.searchsorted(self.topic_codes, present)
+        topic_correct = self.topic_correct[student, columns]
+        topic_total = self.topic_total[student, columns]
+
+        topic_performance = {self.topic_names[code]: {'correct': int(c), 'total': int(t)}
+                             for code, c, t in zip(present, topic_correct, topic_total)}
+
+        return {
+            'score_percentage': (int(self.correct_count[student]) / self.total_count * 100) if self.total_count else 0,
+            'correct_count': int(self.correct_count[student]),
+            'total_count': self.total_count,
+            'level_performance': level_performance,
+            'topic_performance': topic_performance,
+            'topic_codes': present,
+            'topic_correct': topic_correct,
+            'topic_total': topic_total,
+            'topic_names': self.topic_names
+        }
 
 
 class AssessmentEngine:
@@ -11,76 +250,211 @@ class AssessmentEngine:
         self.data_processor = data_processor
         self.min_questions = 15
         self.max_questions = 25
+        # Draw each adaptive item from this many top-information candidates to limit item exposure
+        self.randomesque = 3
+        # Adaptive quizzes stop between min and max questions once either target is reached
+        self.stop_standard_error = 0.5
+        self.stop_level_confidence = 0.75
+        self._length_lock = threading.Lock()
+        self._completed_quizzes = 0
+        self._completed_questions = 0
+        self.form_pool = QuizFormPool(self._build_form)
 
-    def generate_adaptive_quiz(self, course: str, initial_level: int) -> List[Dict]:
+    def generate_adaptive_quiz(self, course: str, initial_level: int) -> Quiz:
         """
-        Generate an adaptive quiz starting at the user's self-assessed level
+        Hand out a pre-generated quiz form starting at the user's self-assessed level
         """
-        quiz_questions = []
+        # Pin the current bank version for the lifetime of the quiz
+        bank = self.data_processor.checkout(course)
+        if bank is None:
+            return Quiz(None, [], [])
 
-        # Get questions from different levels for comprehensive assessment
-        for level in range(1, 6):
-            questions = self.data_processor.get_questions_by_level(course, level, 5)
-            for _, q_row in questions.iterrows():
-                quiz_questions.append({
-                    'question_data': q_row,
-                    'adaptive_level': level,
-                    'question_number': len(quiz_questions) + 1
-                })
+        form = self.form_pool.take(bank, initial_level)
+        return Quiz(bank, form.question_ids, form.levels)
 
-        # Shuffle questions
-        random.shuffle(quiz_questions)
+    def prepare_forms(self, course: str):
+        """Build quiz forms for a course in the background, loading its bank first if needed"""
+        bank = self.data_processor.store.get(course)
+        if bank is not None:
+            self.form_pool.warm(bank)
+            return
+        for future in self.data_processor.prefetch([course]):
+            future.add_done_callback(lambda f: self.form_pool.warm(f.result()))
 
-        # Limit to max questions
-        quiz_questions = quiz_questions[:self.max_questions]
+    def _build_form(self, bank: QuestionBank, initial_level: int, rng: np.random.Generator):
+        """Form covering the bank's topic x level blueprint, shuffled, opening at the starting level"""
+        question_ids, levels = get_stratified_sampler(bank).draw(self.max_questions, rng)
 
-        # Re-number after shuffle
-        for idx, q in enumerate(quiz_questions):
-            q['question_number'] = idx + 1
+        order = rng.permutation(len(question_ids))
+        opening = np.flatnonzero(levels[order] == initial_level)
+        if len(opening):
+            order[[0, opening[0]]] = order[[opening[0], 0]]
 
-        return quiz_questions
+        return question_ids[order], levels[order]
 
-    def calculate_score(self, answers: Dict[int, int], quiz_questions: List[Dict]) -> Dict:
+    def start_adaptive_quiz(self, course: str, initial_level: int) -> AdaptiveQuiz:
         """
-        Calculate quiz score and detailed results
+        Start an IRT adaptive quiz
+
+        The self-assessed level sets the prior ability, so the first question
+        is pitched at that level.
         """
-        correct_count = 0
-        total_count = len(quiz_questions)
-        level_performance = {1: {'correct': 0, 'total': 0},
-                             2: {'correct': 0, 'total': 0},
-                             3: {'correct': 0, 'total': 0},
-                             4: {'correct': 0, 'total': 0},
-                             5: {'correct': 0, 'total': 0}}
+        bank = self.data_processor.checkout(course)
+        if bank is None:
+            return Quiz(None, [], [])
 
-        topic_performance = {}
+        pool = get_item_pool(bank)
+        ability = AbilityEstimate(prior_mean=float(level_to_theta(initial_level)))
+        quiz = AdaptiveQuiz(bank, pool, ability, min(self.max_questions, len(pool)))
+        self._administer_next(quiz)
+        return quiz
 
-        for q_dict in quiz_questions:
-            q_num = q_dict['question_number']
-            q_data = q_dict['question_data']
-            level = q_dict['adaptive_level']
-            topic = q_data['topic']
+    def record_adaptive_answer(self, quiz: AdaptiveQuiz, answer: int) -> bool:
+        """
+        Score the answer to the latest question and pick the next one
 
-            if topic not in topic_performance:
-                topic_performance[topic] = {'correct': 0, 'total': 0}
+        Returns:
+            True if there is another question, False when the quiz is over
+        """
+        item = int(quiz.question_ids[len(quiz.responses)])
+        correct = answer == quiz.bank.answer_key[item]
+        quiz.ability.update(quiz.pool.response_likelihood(item, correct))
+        quiz.responses.append(bool(correct))
 
-            level_performance[level]['total'] += 1
-            topic_performance[topic]['total'] += 1
+        reason = self._stop_reason(quiz)
+        if reason:
+            self._finish(quiz, reason)
+            return False
+        return self._administer_next(quiz)
 
-            if q_num in answers:
-                user_answer = answers[q_num]
-                correct_answer = q_data['correct_answer']
+    def _stop_reason(self, quiz: AdaptiveQuiz):
+        """Why the quiz should end after the latest answer, or None to continue"""
+        answered = len(quiz.responses)
+        if answered >= quiz.max_length:
+            return 'max_questions'
+        if answered < self.min_questions:
+            return None
+        if quiz.ability.standard_error <= self.stop_standard_error:
+            return 'standard_error'
+        if quiz.ability.level_confidence()[1] >= self.stop_level_confidence:
+            return 'level_confidence'
+        return None
 
-                if user_answer == correct_answer:
-                    correct_count += 1
-                    level_performance[level]['correct'] += 1
-                    topic_performance[topic]['correct'] += 1
+    def _administer_next(self, quiz: AdaptiveQuiz) -> bool:
+        item = quiz.pool.next_item(quiz.ability.theta, quiz.question_ids, quiz.rng, self.randomesque)
+        if item < 0:
+            self._finish(quiz, 'bank_exhausted')
+            return False
+        quiz.add(item, quiz.bank.levels[item])
+        return True
 
-        score_percentage = (correct_count / total_count * 100) if total_count > 0 else 0
+    def _finish(self, quiz: AdaptiveQuiz, reason: str):
+        quiz.finished = True
+        quiz.stop_reason = reason
+        with self._length_lock:
+            self._completed_quizzes += 1
+            self._completed_questions += len(quiz.responses)
+        summary = self.test_length_summary()
+        print(f"Adaptive quiz for {quiz.course} stopped after {len(quiz.responses)} questions ({reason}); "
+              f"average {summary['average_length']:.1f} questions, "
+              f"{summary['average_saved']:.1f} saved per assessment")
 
+    def test_length_summary(self) -> Dict:
+        """Average adaptive test length and questions saved against a full max_questions quiz"""
+        with self._length_lock:
+            quizzes = self._completed_quizzes
+            questions = self._completed_questions
+        average = questions / quizzes if quizzes else 0.0
         return {
-            'score_percentage': score_percentage,
-            'correct_count': correct_count,
-            'total_count': total_count,
-            'level_performance': level_performance,
-            'topic_performance': topic_performance
-        }
\ No newline at end of file
+            'quizzes': quizzes,
+            'average_length': average,
+            'average_saved': self.max_questions - average if quizzes else 0.0
+        }
+
+    def score_batch(self, answers: np.ndarray, key: np.ndarray, levels: np.ndarray,
+                    topic_codes: np.ndarray, topic_names) -> BatchScores:
+        """
+        Score a students x questions answer matrix in a few array operations
+
+        Args:
+            answers: Chosen option index per student and question, -1 when unanswered
+            key: Correct option index per question, or per student and question
+                when students sat different forms
+            levels: Level of each question, shaped like key
+            topic_codes: Topic code of each question, shaped like key
+            topic_names: Topic name for every code
+        """
+        answers = np.asarray(answers)
+        n_students, n_questions = answers.shape
+        shape = (n_students, n_questions)
+        correct = answers == np.broadcast_to(key, shape)
+        student_rows = np.repeat(np.arange(n_students), n_questions)
+        flat_correct = correct.ravel()
+
+        flat_levels = np.broadcast_to(levels, shape).ravel().astype(np.int64)
+        level_cells = student_rows * 6 + flat_levels
+        level_correct = np.bincount(level_cells, weights=flat_correct, minlength=n_students * 6)
+        level_total = np.bincount(level_cells, minlength=n_students * 6)
+
+        # Tally only the topics that occur, not every topic in the bank
+        present, columns = np.unique(np.broadcast_to(topic_codes, shape), return_inverse=True)
+        topic_cells = student_rows * len(present) + columns.ravel()
+        topic_correct = np.bincount(topic_cells, weights=flat_correct, minlength=n_students * len(present))
+        topic_total = np.bincount(topic_cells, minlength=n_students * len(present))
+
+        return BatchScores(
+            correct,
+            level_correct.reshape(n_students, 6).astype(np.int64),
+            level_total.reshape(n_students, 6),
+            present,
+            topic_correct.reshape(n_students, len(present)).astype(np.int64),
+            topic_total.reshape(n_students, len(present)),
+            topic_names,
+            np.asarray(topic_codes)
+        )
+
+    def score_quiz_batch(self, answers: np.ndarray, quiz: Quiz) -> BatchScores:
+        """Score many students who all sat the same quiz"""
+        if quiz.bank is None:
+            empty = np.zeros(0, dtype=np.int64)
+            return self.score_batch(answers, empty, empty, empty, [])
+        return self.score_batch(
+            answers,
+            quiz.bank.answer_key[quiz.question_ids],
+            quiz.levels,
+            quiz.bank.index.topic_codes[quiz.question_ids],
+            quiz.bank.index.topics
+        )
+
+    def calculate_score(self, answers: Dict[int, int], quiz: Quiz) -> Dict:
+        """
+        Calculate quiz score and detailed results
+
+        Args:
+            answers: Chosen option index keyed by 1-based question number
+            quiz: Quiz the answers belong to
+        """
+        total_count = len(quiz)
+        chosen = np.full(total_count, -1, dtype=np.int64)
+        for q_num, user_answer in answers.items():
+            if 1 <= q_num <= total_count:
+                chosen[q_num - 1] = user_answer
+
+        results = self.score_quiz_batch(chosen[None, :], quiz).results(0)
+        return self._add_ability(results, quiz)
+
+    def track(self, quiz: Quiz) -> ScoreTracker:
+        """Incremental scoring state for a quiz in progress"""
+        return ScoreTracker(quiz)
+
+    def tracked_results(self, tracker: ScoreTracker) -> Dict:
+        """Final results from a tracker, without rescoring the quiz"""
+        return self._add_ability(tracker.results(), tracker.quiz)
+
+    def _add_ability(self, results: Dict, quiz: Quiz) -> Dict:
+        if quiz.adaptive:
+            results['ability'] = quiz.ability.theta
+            results['ability_se'] = quiz.ability.standard_error
+            results['estimated_level'] = int(theta_to_level(quiz.ability.theta))
+            results['stop_reason'] = quiz.stop_reason
+        return results
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from bank_reader import CATEGORICAL_COLUMNS
+
+
+# Bump whenever the normalized bank layout changes so stale caches are rebuilt
+CACHE_FORMAT = 2
+
+
+class BankCache:
+    """
+    Compiled on-disk form of normalized question banks
+
+    Each bank is stored as one .npy array per column. String columns hold
+    int32 codes into a per-bank string table (one NUL-separated UTF-8 blob),
+    so repeated values like topic and course names are stored once. Arrays
+    are opened with memory mapping. A small JSON manifest per source file
+    records its size, mtime and SHA-256; the bank is rebuilt only when the
+    source content actually changes. Entries are keyed by the source's
+    full path, so same-named uploads in other directories or with another
+    extension never share one.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def load(self, source_path: str) -> Optional[pd.DataFrame]:
+        """Load the compiled bank for a source file, or None if missing or stale"""
+        meta = self._read_meta(source_path)
+        if meta is None:
+            return None
+
+        fingerprint = self._stat(source_path)
+        if fingerprint['size'] != meta['size']:
+            return None
+        if fingerprint['mtime_ns'] != meta['mtime_ns']:
+            # Touched but possibly unchanged: fall back to the content hash
+            if self.content_hash(source_path) != meta['sha256']:
+                return None
+            meta.update(fingerprint)
+            self._write_meta(source_path, meta)
+
+        try:
+            return self._load_arrays(os.path.join(self.cache_dir, meta['data_dir']), meta)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable bank cache for {source_path}: {e}")
+            return None
+
+    def store(self, source_path: str, df: pd.DataFrame, sha256: Optional[str] = None) -> Dict:
+        """Compile a normalized bank and record it as the current version for its source"""
+        fingerprint = self._stat(source_path)
+        sha256 = sha256 or self.content_hash(source_path)
+        data_dir = f"{self._key(source_path)}-{sha256[:16]}"
+        target = os.path.join(self.cache_dir, data_dir)
+
+        staging = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        columns = self._write_arrays(staging, df)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+
+        previous = self._read_meta(source_path)
+        meta = {
+            'format': CACHE_FORMAT,
+            'source': os.path.abspath(source_path),
+            'size': fingerprint['size'],
+            'mtime_ns': fingerprint['mtime_ns'],
+            'sha256': sha256,
+            'rows': len(df),
+            'columns': columns,
+            'data_dir': data_dir,
+            'compiled_at': time.time()
+        }
+        self._write_meta(source_path, meta)
+
+        # Readers that still map the old arrays keep them alive until they close
+        if previous and previous.get('data_dir') != data_dir:
+            shutil.rmtree(os.path.join(self.cache_dir, previous['data_dir']), ignore_errors=True)
+        return meta
+
+    def store_calibration(self, source_path: str, ids: np.ndarray, discrimination: np.ndarray,
+                          difficulty: np.ndarray, guessing: np.ndarray, responses: np.ndarray) -> str:
+        """
+        Record calibrated IRT parameters for a bank, keyed by question id
+
+        Calibration lives beside the compiled arrays rather than in them, so
+        it survives edits to the source file and recompiles.
+        """
+        path = self._calibration_path(source_path)
+        blob = np.frombuffer('\x00'.join(str(i).replace('\x00', '') for i in ids).encode('utf-8'), dtype=np.uint8)
+        staging = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(staging, ids=blob, irt_a=discrimination, irt_b=difficulty, irt_c=guessing,
+                 irt_responses=responses, calibrated_at=np.array(time.time()))
+        os.replace(staging, path)
+        return path
+
+    def load_calibration(self, source_path: str) -> Optional[pd.DataFrame]:
+        """Calibrated parameters by question id, or None if the bank was never calibrated"""
+        path = self._calibration_path(source_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                ids = data['ids'].tobytes().decode('utf-8').split('\x00')
+                return pd.DataFrame({
+                    'id': ids,
+                    'irt_a': data['irt_a'],
+                    'irt_b': data['irt_b'],
+                    'irt_c': data['irt_c'],
+                    'irt_responses': data['irt_responses']
+                })
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable calibration for {source_path}: {e}")
+            return None
+
+    def content_hash(self, source_path: str) -> str:
+        """SHA-256 of the source file, read in blocks"""
+        digest = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _write_arrays(self, target: str, df: pd.DataFrame) -> Dict[str, str]:
+        """Write one array per column plus the shared string table"""
+        columns = {}
+        string_columns = []
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_integer_dtype(series) or pd.api.types.is_float_dtype(series):
+                np.save(os.path.join(target, f"{col}.npy"), series.to_numpy())
+                columns[col] = 'numeric'
+            else:
+                string_columns.append(col)
+                columns[col] = 'string'
+
+        # One deduplicated table for every string column; NUL separates entries
+        values = [df[col].astype(str).str.replace('\x00', '', regex=False).to_numpy(dtype=object)
+                  for col in string_columns]
+        if values:
+            strings, inverse = np.unique(np.concatenate(values), return_inverse=True)
+        else:
+            strings, inverse = np.array([], dtype=object), np.array([], dtype=np.int64)
+        start = 0
+        for col, column_values in zip(string_columns, values):
+            codes = inverse[start:start + len(column_values)].astype(np.int32)
+            np.save(os.path.join(target, f"{col}.npy"), codes)
+            start += len(column_values)
+
+        blob = np.frombuffer('\x00'.join(strings).encode('utf-8'), dtype=np.uint8)
+        np.save(os.path.join(target, '_strings.npy'), blob)
+        return columns
+
+    def _load_arrays(self, target: str, meta: Dict) -> pd.DataFrame:
+        """Map the column arrays and rebuild the DataFrame"""
+        blob = np.load(os.path.join(target, '_strings.npy'), mmap_mode='r')
+        table = np.array(blob.tobytes().decode('utf-8').split('\x00'), dtype=object)
+
+        data = {}
+        for col, kind in meta['columns'].items():
+            values = np.load(os.path.join(target, f"{col}.npy"), mmap_mode='r')
+            if kind != 'string':
+                data[col] = values
+            elif col in CATEGORICAL_COLUMNS:
+                # The stored codes already deduplicate; no string hashing needed
+                used, codes = np.unique(values, return_inverse=True)
+                data[col] = pd.Categorical.from_codes(codes.astype(np.int32), table[used])
+            else:
+                data[col] = table[values]
+        return pd.DataFrame(data, columns=list(meta['columns']))
+
+    def _key(self, source_path: str) -> str:
+        path = os.path.normcase(os.path.realpath(source_path))
+        digest = hashlib.sha256(path.encode('utf-8', 'surrogateescape')).hexdigest()[:12]
+        return f"{os.path.splitext(os.path.basename(source_path))[0]}-{digest}"
+
+    def _calibration_path(self, source_path: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(source_path)}.calibration.npz")
+
+    def _meta_path(self, source_path: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(source_path)}.json")
+
+    def _read_meta(self, source_path: str) -> Optional[Dict]:
+        try:
+            with open(self._meta_path(source_path), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != CACHE_FORMAT:
+            return None
+        return meta
+
+    def _write_meta(self, source_path: str, meta: Dict):
+        path = self._meta_path(source_path)
+        staging = f"{path}.tmp-{os.getpid()}"
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(staging, path)
+
+    def _stat(self, source_path: str) -> Dict[str, int]:
+        st = os.stat(source_path)
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
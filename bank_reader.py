@@ -0,0 +1,222 @@
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import chardet
+import numpy as np
+import pandas as pd
+
+
+# Canonical question bank schema used throughout the app
+CANONICAL_COLUMNS = [
+    'id', 'course', 'topic', 'level', 'question',
+    'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer'
+]
+OPTION_COLUMNS = ['option_a', 'option_b', 'option_c', 'option_d']
+# Columns normalize_chunk parses to numbers (NaN where unparseable); the rest stay strings
+NUMERIC_COLUMNS = ['level', 'correct_answer']
+# Low-cardinality (or lookup) columns stored as pandas categoricals once a bank is published
+CATEGORICAL_COLUMNS = ['id', 'course', 'topic']
+
+# Alternative column spellings found in the uploaded banks
+COLUMN_ALIASES = {
+    'option1': 'option_a',
+    'option2': 'option_b',
+    'option3': 'option_c',
+    'option4': 'option_d',
+    'answer_index': 'correct_answer',
+}
+ANSWER_LETTERS = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+
+# Encodings chardet reports for the legacy single-byte exports. cp1252 is a
+# superset of their printable range and decodes the smart quotes they contain.
+LATIN_ENCODINGS = {'ascii', 'iso-8859-1', 'iso8859-1', 'iso-8859-15', 'iso8859-15', 'windows-1252', 'latin-1'}
+
+
+class QuestionBankReader:
+    """Stream question bank CSV files in chunks and normalize them to the canonical schema"""
+
+    def __init__(self, chunk_size: int = 50000, sample_bytes: int = 64 * 1024):
+        self.chunk_size = chunk_size
+        self.sample_bytes = sample_bytes
+
+    def read(self, file_path: str, course: str, assign_ids: bool = True) -> Tuple[pd.DataFrame, Dict]:
+        """
+        Read a whole question bank file
+
+        Pass assign_ids=False to keep the ids exactly as they appear in the
+        file, e.g. so validation can report duplicates before they are fixed.
+        Each normalized chunk is copied into columns sized from the file's
+        line count and then dropped, so parsing holds one chunk at a time
+        on top of the bank itself.
+
+        Returns:
+            Tuple of (normalized DataFrame, parse statistics)
+        """
+        started = time.perf_counter()
+        stats = {'file': file_path, 'rows': 0, 'skipped': 0}
+
+        # Every row ends at a newline except perhaps the last, so this bounds the row count
+        capacity = self.count_lines(file_path) + 1
+        columns = {col: np.empty(capacity, dtype=float if col in NUMERIC_COLUMNS else object)
+                   for col in CANONICAL_COLUMNS}
+        filled = 0
+        for chunk in self.iter_chunks(file_path, course, stats):
+            end = filled + len(chunk)
+            for col in CANONICAL_COLUMNS:
+                columns[col][filled:end] = chunk[col].to_numpy(dtype=columns[col].dtype)
+            filled = end
+
+        df = pd.DataFrame({col: values[:filled] for col, values in columns.items()}, copy=False)
+        if assign_ids:
+            df = self.assign_ids(df)
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        stats['rows'] = len(df)
+        stats['bytes'] = os.path.getsize(file_path)
+        stats['seconds'] = elapsed
+        stats['rows_per_sec'] = len(df) / elapsed
+        stats['mb_per_sec'] = stats['bytes'] / elapsed / (1024 * 1024)
+        return df, stats
+
+    def iter_chunks(self, file_path: str, course: str, stats: Optional[Dict] = None) -> Iterator[pd.DataFrame]:
+        """Yield normalized chunks of a question bank file"""
+        if stats is None:
+            stats = {'skipped': 0}
+        encoding = self.detect_encoding(file_path)
+        header_offset = self.find_header_offset(file_path, encoding)
+        stats['encoding'] = encoding
+        stats['header_offset'] = header_offset
+
+        reader = pd.read_csv(
+            file_path,
+            skiprows=header_offset,
+            encoding=encoding,
+            encoding_errors='replace',
+            dtype=str,
+            keep_default_na=False,
+            chunksize=self.chunk_size
+        )
+        with reader:
+            for raw in reader:
+                chunk = self.normalize_chunk(raw, course)
+                stats['skipped'] = stats.get('skipped', 0) + len(raw) - len(chunk)
+                yield chunk
+
+    def count_lines(self, file_path: str) -> int:
+        """Newlines in a file, counted over fixed-size binary blocks"""
+        lines = 0
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                lines += block.count(b'\n')
+        return lines
+
+    def detect_encoding(self, file_path: str) -> str:
+        """Guess the file encoding from a leading sample with chardet"""
+        with open(file_path, 'rb') as f:
+            sample = f.read(self.sample_bytes)
+
+        detected = (chardet.detect(sample).get('encoding') or '').lower()
+        if not detected or detected in ('ascii', 'utf-8', 'utf-8-sig'):
+            return 'utf-8-sig'
+        if detected in LATIN_ENCODINGS:
+            return 'cp1252'
+        return detected
+
+    def find_header_offset(self, file_path: str, encoding: str) -> int:
+        """Count the comment and blank lines merge tools prepend before the header row"""
+        offset = 0
+        with open(file_path, 'r', encoding=encoding, errors='replace', newline='') as f:
+            for line in f:
+                stripped = line.replace('\ufeff', '').strip()
+                if stripped.startswith('#') or not stripped.strip(','):
+                    offset += 1
+                    continue
+                break
+        return offset
+
+    def normalize_chunk(self, raw: pd.DataFrame, course: str) -> pd.DataFrame:
+        """Map one raw chunk onto the canonical column layout"""
+        raw.columns = [str(col).replace('\ufeff', '').strip().lower() for col in raw.columns]
+        # Drop the unnamed trailing columns left behind by trailing commas
+        keep = [col for col in raw.columns if col and not col.startswith('unnamed:')]
+        # Rows with nothing but separators carry no question at all
+        empty = (raw[keep].apply(lambda col: col.str.strip()) == '').all(axis=1)
+        df = self._realign_rows(raw.loc[~empty, keep]).rename(columns=COLUMN_ALIASES)
+
+        if 'correct_answer' not in df.columns and 'answer_letter' in df.columns:
+            df['correct_answer'] = df['answer_letter']
+
+        for col in CANONICAL_COLUMNS:
+            if col not in df.columns:
+                df[col] = ''
+        df = df[CANONICAL_COLUMNS].copy()
+
+        df['course'] = df['course'].where(df['course'].str.strip() != '', course)
+        # Unparseable levels and answers become NaN here and are reported by validation
+        df['level'] = pd.to_numeric(df['level'], errors='coerce')
+        df['correct_answer'] = self._resolve_answers(df['correct_answer'])
+        return df
+
+    def _realign_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Shift rows that carry an extra course field into the header layout
+
+        Merged files concatenate banks without repeating their headers, so a
+        file whose header has no course column can contain rows that do.
+        Those rows show a non-numeric level followed by a numeric one.
+        """
+        cols = list(df.columns)
+        if 'course' in cols or 'level' not in cols or cols.index('level') + 1 >= len(cols):
+            return df
+
+        level_pos = cols.index('level')
+        level_numeric = pd.to_numeric(df['level'], errors='coerce').notna()
+        next_numeric = pd.to_numeric(df[cols[level_pos + 1]], errors='coerce').notna()
+        shifted = (~level_numeric & next_numeric).to_numpy()
+
+        df = df.copy()
+        df['course'] = ''
+        if shifted.any():
+            values = df[cols].to_numpy(dtype=object)
+            rows = values[shifted]
+            df.loc[shifted, 'course'] = rows[:, 1]
+            realigned = rows.copy()
+            realigned[:, 1:-1] = rows[:, 2:]
+            realigned[:, -1] = ''
+            df.loc[shifted, cols] = realigned
+        return df
+
+    def _resolve_answers(self, answers: pd.Series) -> pd.Series:
+        """Convert answer letters (A-D) or zero-based indices to integer indices"""
+        cleaned = answers.astype(str).str.strip()
+        from_letters = cleaned.str.upper().map(ANSWER_LETTERS)
+        from_indices = pd.to_numeric(cleaned, errors='coerce')
+        return from_letters.fillna(from_indices)
+
+    def assign_ids(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Fill blank ids from the topic and make repeated ids unique"""
+        if len(df) == 0:
+            return df
+        ids = df['id'].str.strip()
+        ids = ids.where(ids != '', df['topic'].str.strip())
+        duplicated = ids.duplicated(keep=False)
+        if duplicated.any():
+            occurrence = ids.groupby(ids).cumcount() + 1
+            ids = ids.where(~duplicated, ids + '_' + occurrence.astype(str))
+        df['id'] = ids
+        return df
+
+
+def question_hashes(df: pd.DataFrame) -> pd.Series:
+    """64-bit hash of each question's normalized text (case and whitespace insensitive)"""
+    columns = [df[col].astype(str).to_numpy(dtype=object) for col in ['question'] + OPTION_COLUMNS]
+    normalized = ['\x00'.join(' '.join(value.lower().split()) for value in row) for row in zip(*columns)]
+    return pd.util.hash_pandas_object(pd.Series(normalized, dtype=object), index=False)
+
+
+def format_stats(stats: Dict) -> str:
+    """Human readable parse throughput summary"""
+    return (f"{stats['rows']} rows, {stats.get('skipped', 0)} skipped, "
+            f"{stats['seconds'] * 1000:.1f} ms "
+            f"({stats['rows_per_sec']:,.0f} rows/s, {stats['mb_per_sec']:.2f} MB/s, {stats.get('encoding')})")
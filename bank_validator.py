@@ -0,0 +1,150 @@
+import json
+import os
+import re
+import time
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bank_reader import OPTION_COLUMNS
+
+# U+FFFD from undecodable bytes, and the usual UTF-8-read-as-cp1252 sequences
+MOJIBAKE_PATTERN = re.compile('\ufffd|Ã[\x80-\xbf]|â€|Â[\xa0-\xbf]')
+
+ISSUE_COLUMNS = ['row', 'id', 'check', 'severity', 'column', 'message']
+
+
+class QuestionBankValidator:
+    """
+    Column-wise validation of a normalized question bank
+
+    Errors make a question unusable and the row is dropped from the bank.
+    Warnings are reported; whitespace problems are also repaired. The
+    cleaned bank has integer level and correct_answer columns.
+    """
+
+    def __init__(self, min_level: int = 1, max_level: int = 5):
+        self.min_level = min_level
+        self.max_level = max_level
+
+    def validate(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Check every row of a bank
+
+        Returns:
+            Tuple of (bank with invalid rows removed, issues DataFrame)
+        """
+        issues = []
+        rows = np.arange(len(df))
+        ids = df['id'].astype(str).to_numpy(dtype=object)
+
+        def report(mask, check, severity, column, message):
+            mask = np.asarray(mask, dtype=bool)
+            if mask.any():
+                issues.append(pd.DataFrame({
+                    'row': rows[mask],
+                    'id': ids[mask],
+                    'check': check,
+                    'severity': severity,
+                    'column': column,
+                    'message': message
+                }))
+
+        text = {col: self._as_text(df[col]) for col in ['question'] + OPTION_COLUMNS}
+        stripped = {col: self._strip(values) for col, values in text.items()}
+
+        blank = np.column_stack([stripped[col] == '' for col in OPTION_COLUMNS])
+        for i, col in enumerate(OPTION_COLUMNS):
+            report(blank[:, i], 'blank_option', 'error', col, 'Option is empty')
+
+        answers = pd.to_numeric(df['correct_answer'], errors='coerce').to_numpy(dtype=float)
+        in_range = (answers >= 0) & (answers < len(OPTION_COLUMNS)) & (answers == np.floor(answers))
+        report(~in_range, 'answer_out_of_range', 'error', 'correct_answer',
+               f'Answer index must be between 0 and {len(OPTION_COLUMNS) - 1}')
+        answer_pos = np.where(in_range, answers, 0).astype(np.int64)
+        answer_blank = in_range & blank[np.arange(len(df)), answer_pos]
+        report(answer_blank, 'answer_blank', 'error', 'correct_answer',
+               'Answer points at an empty option')
+
+        levels = pd.to_numeric(df['level'], errors='coerce').to_numpy(dtype=float)
+        report(~((levels >= self.min_level) & (levels <= self.max_level)), 'level_out_of_range', 'error', 'level',
+               f'Level must be between {self.min_level} and {self.max_level}')
+
+        report(stripped['question'] == '', 'blank_question', 'error', 'question', 'Question is empty')
+
+        raw_ids = df['id'].fillna('').astype(str).str.strip()
+        report((raw_ids.duplicated(keep=False) & (raw_ids != '')).to_numpy(), 'duplicate_id', 'warning', 'id',
+               'Question id is not unique')
+
+        for col, values in text.items():
+            report(self._matching_rows(values, MOJIBAKE_PATTERN), 'encoding_damage', 'warning', col,
+                   'Text contains undecodable or mis-decoded characters')
+            report((stripped[col] != values) & (stripped[col] != ''), 'untrimmed_text', 'warning', col,
+                   'Leading or trailing whitespace removed')
+
+        report_df = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+        invalid = np.zeros(len(df), dtype=bool)
+        errors = report_df[report_df['severity'] == 'error']
+        invalid[errors['row'].to_numpy(dtype=np.int64)] = True
+
+        clean = df[~invalid].astype({'level': 'int64', 'correct_answer': 'int64'})
+        for col, values in stripped.items():
+            clean[col] = values[~invalid]
+        return clean.reset_index(drop=True), report_df.sort_values(['row', 'check'], kind='stable', ignore_index=True)
+
+    def _as_text(self, series: pd.Series) -> np.ndarray:
+        return series.fillna('').astype(str).to_numpy(dtype=object)
+
+    def _strip(self, values: np.ndarray) -> np.ndarray:
+        stripped = np.empty(len(values), dtype=object)
+        stripped[:] = [value.strip() for value in values]
+        return stripped
+
+    def _matching_rows(self, values: np.ndarray, pattern) -> np.ndarray:
+        """Rows whose text matches pattern, found with one regex pass over the joined column"""
+        mask = np.zeros(len(values), dtype=bool)
+        if len(values) == 0:
+            return mask
+        joined = '\x00'.join(values)
+        positions = [match.start() for match in pattern.finditer(joined)]
+        if positions:
+            starts = np.zeros(len(values), dtype=np.int64)
+            np.cumsum([len(value) + 1 for value in values[:-1]], out=starts[1:])
+            mask[np.searchsorted(starts, positions, side='right') - 1] = True
+        return mask
+
+    def write_report(self, report_path: str, issues: pd.DataFrame, course: str, source: str,
+                     rows: int, kept: int, seconds: float) -> Dict:
+        """Write a machine-readable JSON report of a validation run"""
+        severity_counts = issues['severity'].value_counts().to_dict()
+        report = {
+            'course': course,
+            'source': source,
+            'validated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'rows': rows,
+            'rows_kept': kept,
+            'rows_dropped': rows - kept,
+            'errors': int(severity_counts.get('error', 0)),
+            'warnings': int(severity_counts.get('warning', 0)),
+            'checks': {check: int(n) for check, n in issues['check'].value_counts().items()},
+            'seconds': seconds,
+            'issues': issues.astype({'row': 'int64'}).to_dict('records')
+        }
+        os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+        staging = f"{report_path}.tmp-{os.getpid()}"
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(staging, report_path)
+        return report
+
+
+def validate_bank(df: pd.DataFrame, course: str, source: str, report_path: str,
+                  validator: QuestionBankValidator = None) -> Tuple[pd.DataFrame, Dict]:
+    """Validate a bank, write its report and return the cleaned bank with the report summary"""
+    validator = validator or QuestionBankValidator()
+    started = time.perf_counter()
+    clean, issues = validator.validate(df)
+    elapsed = time.perf_counter() - started
+    report = validator.write_report(report_path, issues, course, source, len(df), len(clean), elapsed)
+    return clean, report
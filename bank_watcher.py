@@ -0,0 +1,105 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class UploadsWatcher:
+    """
+    Poll the uploads directory and hot-reload question banks that change
+
+    Only the affected course is re-ingested and re-indexed. A change is
+    applied once a file's size and mtime are the same on two polls in a
+    row, so a bank still being written is not read half-finished. Sessions
+    that hold the previous bank version keep using it until their quiz ends.
+    """
+
+    WATCHED_EXTENSIONS = ('.csv', '.json')
+
+    def __init__(self, data_processor, interval: float = 2.0):
+        self.data_processor = data_processor
+        self.uploads_dir = data_processor.uploads_dir
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = self._scan()
+        # Fingerprints (None once deleted) of changes waiting for a second identical poll
+        self._pending: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def start(self):
+        """Start polling on a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='uploads-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+
+    def poll(self) -> Dict[str, str]:
+        """Check once for changes and apply those that have settled; returns {path: change}"""
+        current = self._scan()
+        snapshot = dict(self._snapshot)
+        changes = {}
+        for path in current.keys() | self._snapshot.keys():
+            fingerprint = current.get(path)
+            previous = self._snapshot.get(path)
+            if fingerprint == previous:
+                self._pending.pop(path, None)
+                continue
+            if path not in self._pending or self._pending[path] != fingerprint:
+                # Still being written, or just finished: wait for one more identical poll
+                self._pending[path] = fingerprint
+                continue
+            del self._pending[path]
+            if fingerprint is None:
+                changes[path] = 'removed'
+                del snapshot[path]
+            else:
+                changes[path] = 'added' if previous is None else 'modified'
+                snapshot[path] = fingerprint
+        self._snapshot = snapshot
+
+        if changes:
+            self._apply(changes)
+        return changes
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error watching {self.uploads_dir}: {e}")
+
+    def _apply(self, changes: Dict[str, str]):
+        catalog = self.data_processor.catalog
+        # Resolve course names before the catalog forgets removed files
+        courses = {path: catalog.course_for_path(path) for path in changes}
+        catalog.refresh()
+
+        for path, change in changes.items():
+            if not path.endswith('.csv'):
+                continue
+            course = courses[path] or catalog.course_for_path(path)
+            if course is None:
+                continue
+            if change == 'removed':
+                print(f"Question bank for {course} removed")
+                self.data_processor.store.remove(course)
+            else:
+                print(f"Question bank for {course} {change}")
+                self.data_processor.refresh_course(course)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            entries = list(os.scandir(self.uploads_dir))
+        except OSError:
+            return snapshot
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(self.WATCHED_EXTENSIONS):
+                st = entry.stat()
+                snapshot[os.path.abspath(entry.path)] = (st.st_size, st.st_mtime_ns)
+        return snapshot
@@ -0,0 +1,149 @@
+"""
+Bulk importer for large partner question banks
+
+Parses many CSV files in a process pool, normalizes them to the
+DataProcessor schema, drops duplicate questions by normalized-text hash
+and writes the merged course bank plus its compiled cache in one pass.
+
+Usage:
+    python bulk_import.py --course "Data Engineering" partner_banks/*.csv
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from bank_cache import BankCache
+from bank_reader import QuestionBankReader, CANONICAL_COLUMNS, question_hashes
+from bank_validator import validate_bank
+from course_catalog import CourseCatalog
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def parse_file(file_path: str, course: str, chunk_size: int) -> Tuple[pd.DataFrame, Dict]:
+    """Worker: normalize one file and drop duplicates within it"""
+    started = time.perf_counter()
+    reader = QuestionBankReader(chunk_size=chunk_size)
+    stats = {'file': file_path, 'skipped': 0}
+
+    chunks = []
+    seen = set()
+    parsed = 0
+    for chunk in reader.iter_chunks(file_path, course, stats):
+        parsed += len(chunk)
+        hashes = question_hashes(chunk).to_numpy()
+        chunk = chunk.assign(_hash=hashes)
+        chunk = chunk[~chunk['_hash'].duplicated()]
+        chunk = chunk[~chunk['_hash'].isin(seen)]
+        seen.update(chunk['_hash'].tolist())
+        chunks.append(chunk)
+
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=CANONICAL_COLUMNS + ['_hash'])
+    stats['rows'] = len(df)
+    stats['parsed'] = parsed
+    stats['duplicates'] = parsed - len(df)
+    stats['seconds'] = time.perf_counter() - started
+    return df, stats
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process plus its finished workers"""
+    if resource is None:
+        return 0.0
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(own, children) / scale
+
+
+def import_banks(files: List[str], course: str, uploads_dir: str, output_name: str,
+                 workers: int = None, chunk_size: int = 100000, register: bool = True) -> Dict:
+    """Import files into one course bank and return summary statistics"""
+    started = time.perf_counter()
+    input_bytes = sum(os.path.getsize(f) for f in files)
+
+    frames = []
+    parsed_rows = 0
+    duplicates = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(parse_file, files, [course] * len(files), [chunk_size] * len(files))
+        for df, stats in results:
+            parsed_rows += stats['parsed'] + stats['skipped']
+            duplicates += stats['duplicates']
+            rate = stats['parsed'] / stats['seconds'] if stats['seconds'] else 0
+            print(f"  {stats['file']}: {stats['parsed']} rows, {stats['rows']} unique, {stats['skipped']} skipped, "
+                  f"{stats['seconds']:.2f}s ({rate:,.0f} rows/s)")
+            frames.append(df)
+
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CANONICAL_COLUMNS + ['_hash'])
+    # Duplicates within a file were dropped by its worker; these span files
+    before = len(merged)
+    merged = merged[~merged['_hash'].duplicated()].drop(columns='_hash').reset_index(drop=True)
+    duplicates += before - len(merged)
+
+    output_path = os.path.join(uploads_dir, output_name)
+    report_path = os.path.join(uploads_dir, '.bank_reports', f"{os.path.splitext(output_name)[0]}.json")
+    merged, report = validate_bank(merged, course, output_path, report_path)
+    merged = QuestionBankReader().assign_ids(merged)
+    os.makedirs(uploads_dir, exist_ok=True)
+    staging = f"{output_path}.tmp-{os.getpid()}"
+    merged.to_csv(staging, index=False, encoding='utf-8')
+    os.replace(staging, output_path)
+    # Compile right away so the app's first load is a cache hit
+    BankCache(os.path.join(uploads_dir, '.bank_cache')).store(output_path, merged)
+    if register:
+        CourseCatalog(uploads_dir).register(course, output_name)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'files': len(files),
+        'parsed_rows': parsed_rows,
+        'unique_rows': len(merged),
+        'duplicates': duplicates,
+        'invalid_rows': report['rows_dropped'],
+        'warnings': report['warnings'],
+        'report': report_path,
+        'seconds': elapsed,
+        'rows_per_sec': len(merged) / elapsed if elapsed else 0,
+        'mb_per_sec': input_bytes / elapsed / (1024 * 1024) if elapsed else 0,
+        'peak_rss_mb': peak_rss_mb(),
+        'output': output_path
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import question bank CSVs into one course bank")
+    parser.add_argument('files', nargs='+', help="CSV files to import")
+    parser.add_argument('--course', required=True, help="Course name to register the bank under")
+    parser.add_argument('--uploads-dir', default='uploads', help="Directory the app loads banks from")
+    parser.add_argument('--output', help="Output CSV file name (default: derived from the course name)")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Rows per parse chunk")
+    parser.add_argument('--no-register', action='store_true', help="Do not add the course to manifest.json")
+    args = parser.parse_args(argv)
+
+    output_name = args.output or f"{args.course.lower().replace('/', '_').replace(' ', '_')}.csv"
+    print(f"Importing {len(args.files)} files into {args.course}")
+    summary = import_banks(args.files, args.course, args.uploads_dir, output_name,
+                           workers=args.workers, chunk_size=args.chunk_size, register=not args.no_register)
+
+    print(f"Wrote {summary['unique_rows']} questions to {summary['output']} "
+          f"({summary['duplicates']} duplicates, {summary['invalid_rows']} invalid rows removed; "
+          f"{summary['warnings']} warnings in {summary['report']})")
+    print(f"Imported {summary['unique_rows']} of {summary['parsed_rows']} rows in {summary['seconds']:.2f}s: "
+          f"{summary['rows_per_sec']:,.0f} imported rows/s, {summary['mb_per_sec']:.1f} MB/s, "
+          f"peak RSS {summary['peak_rss_mb']:.0f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+Offline IRT calibration of a course question bank from logged responses
+
+Fits a three-parameter logistic model by marginal maximum likelihood with
+EM over a fixed quadrature grid: discrimination and difficulty per item,
+with guessing fixed at the value uncalibrated items use, so calibrated and
+uncalibrated items share one model. The parameters are stored next to the
+compiled bank, and AssessmentEngine uses them the next time the bank is
+loaded.
+
+Response file format (CSV, any row order):
+    student_id, question_id, correct | answer[, course]
+
+Responses logged by the app can be read straight from its event log.
+
+Usage:
+    python calibration.py --course "Data Science" responses/*.csv
+    python calibration.py --course "Data Science" --event-log uploads/.events/responses.sqlite
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bank_reader import ANSWER_LETTERS
+from data_processor import DataProcessor
+from event_log import read_responses
+from irt import DEFAULT_GUESSING
+from question_store import QuestionBank
+
+
+def csv_chunks(files: List[str], chunk_size: int = 1000000) -> Iterator[pd.DataFrame]:
+    """Response rows from CSV files, a chunk at a time"""
+    for file_path in files:
+        yield from pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+
+def load_responses(chunks: Iterable[pd.DataFrame], bank: QuestionBank,
+                   student_codes: Dict[str, int] = None) -> Tuple[np.ndarray, ...]:
+    """
+    Collect response chunks into (student codes, item positions, correct) arrays
+
+    Rows keep their input order. Rows for other courses or questions the
+    bank does not contain are skipped. Pass student_codes to get the
+    student id -> code mapping back.
+    """
+    id_index = pd.Index(bank.df['id'].astype(str))
+    student_codes = {} if student_codes is None else student_codes
+    students, items, correct = [], [], []
+    stats = {'rows': 0, 'skipped': 0}
+
+    for chunk in chunks:
+        chunk.columns = [str(col).strip().lower() for col in chunk.columns]
+        stats['rows'] += len(chunk)
+        if 'course' in chunk.columns:
+            chunk = chunk[chunk['course'] == bank.course]
+
+        positions = id_index.get_indexer(chunk['question_id'].str.strip())
+        if 'correct' in chunk.columns:
+            outcome = pd.to_numeric(chunk['correct'], errors='coerce').to_numpy()
+        else:
+            cleaned = chunk['answer'].str.strip()
+            answers = cleaned.str.upper().map(ANSWER_LETTERS).fillna(pd.to_numeric(cleaned, errors='coerce'))
+            answers = answers.to_numpy(dtype=float)
+            outcome = np.where(np.isnan(answers), np.nan,
+                               answers == bank.answer_key[np.maximum(positions, 0)])
+        keep = (positions >= 0) & ~np.isnan(outcome)
+        stats['skipped'] += len(keep) - int(keep.sum())
+
+        # Student ids become dense integer codes shared across chunks and files
+        chunk_students = chunk['student_id'].to_numpy()[keep]
+        codes = pd.Series(chunk_students).map(student_codes)
+        unseen = pd.unique(chunk_students[codes.isna().to_numpy()])
+        student_codes.update(zip(unseen, range(len(student_codes), len(student_codes) + len(unseen))))
+        students.append(pd.Series(chunk_students).map(student_codes).to_numpy(dtype=np.int32))
+        items.append(positions[keep].astype(np.int32))
+        correct.append(outcome[keep].astype(bool))
+
+    if not students:
+        empty = np.zeros(0, dtype=np.int32)
+        return empty, empty, np.zeros(0, dtype=bool), stats
+    stats['students'] = len(student_codes)
+    return np.concatenate(students), np.concatenate(items), np.concatenate(correct), stats
+
+
+class ItemCalibrator:
+    """
+    3PL item calibration with fixed guessing by marginal maximum likelihood (EM)
+
+    Each response is encoded once as item * 2 + correct and grouped per
+    chunk by student and by that code. An EM iteration then needs no
+    per-response transcendental math: the E-step gathers rows of a small
+    (item, outcome) x node log-probability table and sums them per student
+    with reduceat, and the expected counts are one more gather and reduceat.
+    The M-step is a few Fisher scoring steps on (slope, intercept) for all
+    items at once. Chunks are processed on a thread pool; the NumPy kernels release
+    the GIL.
+    """
+
+    def __init__(self, quadrature_points: int = 21, max_iter: int = 100, tol: float = 1e-3,
+                 chunk_size: int = 1000000, workers: int = None, min_responses: int = 30,
+                 newton_steps: int = 4, guessing: float = DEFAULT_GUESSING):
+        self.nodes = np.linspace(-4.0, 4.0, quadrature_points)
+        weights = np.exp(-0.5 * self.nodes ** 2)
+        self.log_prior = np.log(weights / weights.sum())
+        self.max_iter = max_iter
+        self.tol = tol
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.min_responses = min_responses
+        self.newton_steps = newton_steps
+        self.guessing = guessing
+        self.log_guessing = np.log(guessing) if guessing > 0 else -np.inf
+        # Gentle shrinkage keeps items with little or one-sided data finite
+        self.slope_prior_weight = 0.5
+        self.intercept_prior_weight = 0.01
+
+    def fit(self, students: np.ndarray, items: np.ndarray, correct: np.ndarray, n_items: int) -> Dict:
+        """Calibrate every item; items with fewer than min_responses responses get NaN parameters"""
+        order = np.argsort(students, kind='stable')
+        students = students[order]
+        codes = (items[order].astype(np.int32) * 2 + correct[order]).astype(np.int32)
+        del order
+        n_students = int(students[-1]) + 1 if len(students) else 0
+        responses = np.bincount(codes // 2, minlength=n_items)
+
+        slope = np.ones(n_items)
+        intercept = np.zeros(n_items)
+        history = []
+        converged = False
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            started = time.perf_counter()
+            plans = list(pool.map(lambda bounds: self._plan(students, codes, *bounds), self._chunks(students)))
+            print(f"Prepared {len(plans)} chunks of {len(codes):,} responses in {time.perf_counter() - started:.1f}s")
+
+            for iteration in range(1, self.max_iter + 1):
+                started = time.perf_counter()
+                log_likelihood, expected_total, expected_correct = self._e_step(
+                    pool, plans, students, slope, intercept, n_students, n_items)
+                new_slope, new_intercept = self._m_step(slope, intercept, expected_total, expected_correct)
+
+                change = float(max(np.abs(new_slope - slope).max(initial=0),
+                                   np.abs(new_intercept - intercept).max(initial=0)))
+                slope, intercept = new_slope, new_intercept
+                elapsed = time.perf_counter() - started
+                history.append({'iteration': iteration, 'log_likelihood': log_likelihood,
+                                'max_change': change, 'seconds': elapsed})
+                print(f"Iteration {iteration}: log-likelihood {log_likelihood:,.1f}, max parameter change "
+                      f"{change:.5f} ({elapsed:.1f}s, {len(codes) / elapsed:,.0f} responses/s)")
+                if change < self.tol:
+                    converged = True
+                    break
+
+        calibrated = responses >= self.min_responses
+        return {
+            'discrimination': np.where(calibrated, slope, np.nan),
+            'difficulty': np.where(calibrated, -intercept / slope, np.nan),
+            'guessing': np.where(calibrated, self.guessing, np.nan),
+            'responses': responses,
+            'calibrated_items': int(calibrated.sum()),
+            'students': n_students,
+            'iterations': len(history),
+            'converged': converged,
+            'history': history
+        }
+
+    def _chunks(self, students: np.ndarray) -> List[Tuple[int, int]]:
+        """Response ranges of about chunk_size rows that never split a student"""
+        bounds = [0]
+        while bounds[-1] < len(students):
+            end = min(bounds[-1] + self.chunk_size, len(students))
+            if end < len(students):
+                end = int(np.searchsorted(students, students[end], side='left'))
+                if end <= bounds[-1]:
+                    end = int(np.searchsorted(students, students[bounds[-1]], side='right'))
+            bounds.append(end)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _plan(self, students: np.ndarray, codes: np.ndarray, start: int, end: int) -> Dict:
+        """Per-chunk groupings that stay fixed across EM iterations"""
+        chunk_students = students[start:end]
+        chunk_codes = codes[start:end]
+        student_starts = np.flatnonzero(np.r_[True, chunk_students[1:] != chunk_students[:-1]])
+        code_order = np.argsort(chunk_codes, kind='stable').astype(np.int32)
+        sorted_codes = chunk_codes[code_order]
+        code_starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        return {
+            'start': start,
+            'end': end,
+            'students': chunk_students[student_starts],
+            'student_starts': student_starts,
+            'code_order': code_order,
+            'codes': sorted_codes[code_starts],
+            'code_starts': code_starts,
+            'response_codes': chunk_codes
+        }
+
+    def _log_probability_table(self, slope, intercept) -> np.ndarray:
+        """Row item * 2 + outcome holds log P(outcome) for that item at every node"""
+        z = slope[:, None] * self.nodes[None, :] + intercept[:, None]
+        log_range = np.log1p(-self.guessing)
+        table = np.empty((2 * len(slope), len(self.nodes)), dtype=np.float32)
+        table[0::2] = log_range - np.logaddexp(0, z)
+        table[1::2] = np.logaddexp(self.log_guessing, log_range - np.logaddexp(0, -z))
+        return table
+
+    def _e_step(self, pool, plans, students, slope, intercept, n_students, n_items):
+        n_nodes = len(self.nodes)
+        table = self._log_probability_table(slope, intercept)
+
+        def student_likelihood(plan):
+            log_p = table[plan['response_codes']]
+            return plan['students'], np.add.reduceat(log_p, plan['student_starts'], axis=0, dtype=np.float64)
+
+        # Pass 1: each student's log-likelihood at every node, then the posterior over nodes
+        log_posterior = np.zeros((n_students, n_nodes))
+        for chunk_students, sums in pool.map(student_likelihood, plans):
+            log_posterior[chunk_students] = sums
+        log_posterior += self.log_prior
+        peak = log_posterior.max(axis=1, keepdims=True)
+        log_marginal = peak[:, 0] + np.log(np.exp(log_posterior - peak).sum(axis=1))
+        posterior = np.exp(log_posterior - log_marginal[:, None]).astype(np.float32)
+        del log_posterior
+
+        # Pass 2: expected responses per (item, outcome) and node
+        def code_counts(plan):
+            weights = posterior[students[plan['start']:plan['end']][plan['code_order']]]
+            return plan['codes'], np.add.reduceat(weights, plan['code_starts'], axis=0, dtype=np.float64)
+
+        counts = np.zeros((2 * n_items, n_nodes))
+        for chunk_codes, sums in pool.map(code_counts, plans):
+            counts[chunk_codes] += sums
+        expected_correct = counts[1::2]
+        expected_total = counts[0::2] + expected_correct
+        return float(log_marginal.sum()), expected_total, expected_correct
+
+    def _m_step(self, slope, intercept, expected_total, expected_correct):
+        x = self.nodes[None, :]
+        slope = slope.copy()
+        intercept = intercept.copy()
+        c = self.guessing
+        for _ in range(self.newton_steps):
+            s = 1.0 / (1.0 + np.exp(-(slope[:, None] * x + intercept[:, None])))
+            p = c + (1.0 - c) * s
+            # Score and expected information with respect to the logit; the 2PL ones when c = 0
+            residual = (expected_correct - expected_total * p) * s / p
+            w = expected_total * (1.0 - c) * s ** 2 * (1.0 - s) / p
+
+            grad_slope = (residual * x).sum(axis=1) - self.slope_prior_weight * (slope - 1.0)
+            grad_intercept = residual.sum(axis=1) - self.intercept_prior_weight * intercept
+            h_ss = (w * x ** 2).sum(axis=1) + self.slope_prior_weight
+            h_si = (w * x).sum(axis=1)
+            h_ii = w.sum(axis=1) + self.intercept_prior_weight
+
+            det = h_ss * h_ii - h_si ** 2
+            slope = np.clip(slope + (h_ii * grad_slope - h_si * grad_intercept) / det, 0.2, 4.0)
+            intercept = np.clip(intercept + (h_ss * grad_intercept - h_si * grad_slope) / det, -12.0, 12.0)
+        return slope, intercept
+
+
+def calibrate_course(files: List[str], course: str, uploads_dir: str = 'uploads', chunk_size: int = 1000000,
+                     calibrator: ItemCalibrator = None, event_log: str = None) -> Dict:
+    """Calibrate one course bank from response files and/or the app's event log and store the parameters"""
+    started = time.perf_counter()
+    data_processor = DataProcessor(uploads_dir, prefetch=0)
+    bank = data_processor.get_bank(course)
+    source_path = data_processor.catalog.path_for(course)
+    if bank is None or source_path is None or len(bank) == 0:
+        raise ValueError(f"No question bank for course {course!r}")
+
+    chunks = csv_chunks(files, chunk_size)
+    if event_log:
+        chunks = itertools.chain(chunks, read_responses(event_log, course, chunk_size))
+    students, items, correct, stats = load_responses(chunks, bank)
+    print(f"Loaded {len(items):,} responses from {stats.get('students', 0):,} students "
+          f"({stats['skipped']:,} rows skipped) in {time.perf_counter() - started:.1f}s")
+    if len(items) == 0:
+        raise ValueError("No usable responses")
+
+    calibrator = calibrator or ItemCalibrator()
+    fit = calibrator.fit(students, items, correct, len(bank))
+
+    path = data_processor.cache.store_calibration(
+        source_path,
+        ids=bank.df['id'].astype(str).to_numpy(),
+        discrimination=fit['discrimination'],
+        difficulty=fit['difficulty'],
+        guessing=fit['guessing'],
+        responses=fit['responses']
+    )
+    fit.update(stats)
+    fit['path'] = path
+    fit['seconds'] = time.perf_counter() - started
+    return fit
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate IRT item parameters for a course from logged responses")
+    parser.add_argument('files', nargs='*', help="Response CSV files")
+    parser.add_argument('--event-log', help="Also read responses from the app's SQLite event log")
+    parser.add_argument('--course', required=True, help="Course whose bank to calibrate")
+    parser.add_argument('--uploads-dir', default='uploads', help="Directory the question banks live in")
+    parser.add_argument('--chunk-size', type=int, default=1000000, help="Responses per read and EM chunk")
+    parser.add_argument('--workers', type=int, default=None, help="EM threads (default: CPU count)")
+    parser.add_argument('--max-iter', type=int, default=100, help="Maximum EM iterations")
+    parser.add_argument('--tol', type=float, default=1e-3, help="Stop when no parameter moves more than this")
+    parser.add_argument('--min-responses', type=int, default=30, help="Responses an item needs to be calibrated")
+    args = parser.parse_args(argv)
+    if not args.files and not args.event_log:
+        parser.error("give response files and/or --event-log")
+
+    calibrator = ItemCalibrator(max_iter=args.max_iter, tol=args.tol, chunk_size=args.chunk_size,
+                                workers=args.workers, min_responses=args.min_responses)
+    fit = calibrate_course(args.files, args.course, args.uploads_dir, args.chunk_size, calibrator, args.event_log)
+
+    status = 'converged' if fit['converged'] else 'did not converge'
+    print(f"{status} after {fit['iterations']} iterations; calibrated {fit['calibrated_items']} items "
+          f"from {len(fit['responses'])} in the bank")
+    print(f"Wrote {fit['path']} in {fit['seconds']:.1f}s; the parameters apply the next time the bank loads")
+    return 0 if fit['converged'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Headless placement runner for whole intakes
+
+Reads exported answer sheets, then scores, gap-analyzes and plans every
+student on a process pool, writing one JSON report per student in the
+same shape as the app's download.
+
+Answer sheet format (CSV, one row per answered question, rows of a student
+kept together):
+    student_id, course, question_id, answer[, self_assessed_level]
+
+Answers are option letters (A-D) or zero-based option indices; blank means
+unanswered. The self-assessed level defaults to 3.
+
+Usage:
+    python cohort_runner.py answers.csv --output reports/
+    python cohort_runner.py answers.csv --output reports/ --cohort-report cohort.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from assessment_engine import AssessmentEngine, Quiz
+from bank_reader import ANSWER_LETTERS
+from bulk_import import peak_rss_mb
+from data_processor import DataProcessor
+from gap_analyzer import GapAnalyzer
+from learning_path import LearningPathGenerator
+from report_builder import build_report
+
+REQUIRED_COLUMNS = ['student_id', 'course', 'question_id', 'answer']
+DEFAULT_LEVEL = 3
+
+# Per-worker state, set up once by _init_worker
+_worker = {}
+
+
+def read_students(file_path: str, chunk_size: int) -> Iterator[Tuple]:
+    """
+    Stream (student_id, course, level, question_ids, answers) per student
+
+    Only one chunk plus the rows of the student that straddles it are held
+    in memory, so memory does not grow with cohort size.
+    """
+    carry = None
+    for chunk in pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        chunk.columns = [str(col).strip().lower() for col in chunk.columns]
+        missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"{file_path} is missing columns: {', '.join(missing)}")
+        if 'self_assessed_level' not in chunk.columns:
+            chunk['self_assessed_level'] = ''
+
+        chunk['answer'] = normalize_answers(chunk['answer'])
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+
+        # The last student may continue in the next chunk
+        last_id = chunk['student_id'].iat[-1]
+        tail = (chunk['student_id'] == last_id).to_numpy()
+        carry = chunk[tail]
+        yield from _group_students(chunk[~tail])
+
+    if carry is not None:
+        yield from _group_students(carry)
+
+
+def normalize_answers(answers: pd.Series) -> np.ndarray:
+    """Option letters or indices to integer indices, -1 for unanswered"""
+    cleaned = answers.str.strip()
+    from_letters = cleaned.str.upper().map(ANSWER_LETTERS)
+    from_indices = pd.to_numeric(cleaned, errors='coerce')
+    return from_letters.fillna(from_indices).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _group_students(rows: pd.DataFrame) -> Iterator[Tuple]:
+    if rows.empty:
+        return
+    starts = np.flatnonzero(np.r_[True, rows['student_id'].to_numpy()[1:] != rows['student_id'].to_numpy()[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+    student_ids = rows['student_id'].to_numpy()
+    courses = rows['course'].to_numpy()
+    levels = pd.to_numeric(rows['self_assessed_level'], errors='coerce').to_numpy()
+    question_ids = rows['question_id'].str.strip().to_numpy()
+    answers = rows['answer'].to_numpy()
+    for start, end in zip(starts, ends):
+        level = levels[start]
+        yield (student_ids[start], courses[start], int(level) if level == level else DEFAULT_LEVEL,
+               question_ids[start:end].tolist(), answers[start:end].tolist())
+
+
+def _init_worker(uploads_dir: str):
+    data_processor = DataProcessor(uploads_dir, prefetch=0)
+    _worker['data_processor'] = data_processor
+    _worker['engine'] = AssessmentEngine(data_processor)
+    _worker['gap_analyzer'] = GapAnalyzer()
+    _worker['learning_path'] = LearningPathGenerator(os.path.join(uploads_dir, 'resources.json'))
+    _worker['id_index'] = {}
+
+
+def _question_positions(course: str, question_ids: List[str]):
+    """Bank and row positions for question ids, -1 where the bank has no such question"""
+    bank = _worker['data_processor'].get_bank(course)
+    if bank is None:
+        return None, None
+    key = (course, bank.version)
+    index = _worker['id_index'].get(key)
+    if index is None:
+        index = pd.Index(bank.df['id'].astype(str))
+        _worker['id_index'] = {k: v for k, v in _worker['id_index'].items() if k[0] != course}
+        _worker['id_index'][key] = index
+    return bank, index.get_indexer(question_ids)
+
+
+def assess_student(student_id: str, course: str, level: int, question_ids: List[str],
+                   answers: List[int], test_date: str) -> Dict:
+    """Score, analyze and plan one student; returns the report"""
+    return _assess(student_id, course, level, question_ids, answers, test_date)[0]
+
+
+def _assess(student_id: str, course: str, level: int, question_ids: List[str],
+            answers: List[int], test_date: str) -> Tuple[Dict, Dict]:
+    bank, positions = _question_positions(course, question_ids)
+    if bank is None:
+        raise ValueError(f"Unknown course {course!r}")
+    known = positions >= 0
+    positions = positions[known]
+    quiz = Quiz(bank, positions, bank.levels[positions])
+    answer_map = {i + 1: int(answer) for i, answer in enumerate(np.asarray(answers)[known]) if answer >= 0}
+
+    gap_analyzer = _worker['gap_analyzer']
+    path_generator = _worker['learning_path']
+    results = _worker['engine'].calculate_score(answer_map, quiz)
+    gap = gap_analyzer.analyze_gaps(results, course, level)
+    priorities = gap_analyzer.generate_priority_list(gap)
+    learning_path = path_generator.generate_learning_path(course, gap, priorities)
+    schedule = path_generator.generate_study_schedule(learning_path)
+
+    report = build_report(course, results, gap, candidate_name=str(student_id), test_date=test_date,
+                          learning_path=learning_path, study_schedule=schedule)
+    report['unknown_questions'] = int((~known).sum())
+    return report, results
+
+
+def assess_batch(students: List[Tuple], output_dir: str, test_date: str, cohort: bool = False) -> Dict:
+    """Worker: write reports for a batch of students and return summary counts (and tallies with cohort)"""
+    summary = {'students': 0, 'failed': 0, 'unknown_questions': 0, 'readiness': {}, 'tallies': []}
+    for student_id, course, level, question_ids, answers in students:
+        try:
+            report, results = _assess(student_id, course, level, question_ids, answers, test_date)
+        except Exception as e:
+            print(f"Error assessing student {student_id}: {e}")
+            summary['failed'] += 1
+            continue
+
+        file_name = f"{str(student_id).replace(os.sep, '_').replace('/', '_')}.json"
+        with open(os.path.join(output_dir, file_name), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=_json_default)
+        summary['students'] += 1
+        summary['unknown_questions'] += report['unknown_questions']
+        summary['readiness'][report['status']] = summary['readiness'].get(report['status'], 0) + 1
+        if cohort:
+            summary['tallies'].append(_tallies(student_id, course, level, results))
+    return summary
+
+
+def _tallies(student_id: str, course: str, level: int, results: Dict) -> Tuple:
+    """The per-student counts cohort_analysis needs, small enough to send back from a worker"""
+    level_performance = results['level_performance']
+    return (student_id, course, level, results['score_percentage'],
+            [level_performance[lv]['correct'] for lv in range(1, 6)],
+            [level_performance[lv]['total'] for lv in range(1, 6)],
+            {topic: (p['correct'], p['total']) for topic, p in results['topic_performance'].items()})
+
+
+def cohort_analysis(tallies: List[Tuple], gap_analyzer: GapAnalyzer = None) -> Dict[str, Dict]:
+    """GapAnalyzer.analyze_cohort for each course in a list of per-student tallies"""
+    gap_analyzer = gap_analyzer or GapAnalyzer()
+    by_course = {}
+    for row in tallies:
+        by_course.setdefault(row[1], []).append(row)
+
+    analyses = {}
+    for course, rows in by_course.items():
+        student_ids, _, levels, scores, level_correct, level_total, topics = zip(*rows)
+        # Topic columns are the union over students; unmet topics count as 0 of 0
+        topic_correct = pd.DataFrame.from_records([{t: c for t, (c, _) in row.items()} for row in topics])
+        topic_total = pd.DataFrame.from_records([{t: n for t, (_, n) in row.items()} for row in topics],
+                                                columns=topic_correct.columns)
+        analyses[course] = gap_analyzer.analyze_cohort(
+            np.array(level_correct), np.array(level_total),
+            topic_correct.fillna(0).to_numpy(), topic_total.fillna(0).to_numpy(), list(topic_correct.columns),
+            np.array(scores), np.array(levels), list(student_ids)
+        )
+    return analyses
+
+
+def cohort_report(analyses: Dict[str, Dict]) -> Dict:
+    """JSON-ready summary of cohort_analysis output for instructors"""
+    report = {}
+    for course, analysis in analyses.items():
+        students = analysis['students']
+        report[course] = {
+            'students': len(students),
+            'mean_score': float(students['overall_score'].mean()),
+            'mean_level_gap': float(students['level_gap'].mean()),
+            'readiness': {str(k): int(v) for k, v in analysis['readiness_distribution'].items()},
+            'actual_levels': {int(k): int(v) for k, v in analysis['level_distribution'].items()},
+            'topics': analysis['topics'].reset_index(names='topic').to_dict(orient='records'),
+            'weak_share_by_level': {
+                int(level): {topic: (None if share != share else float(share)) for topic, share in row.items()}
+                for level, row in analysis['topic_heatmap'].iterrows()
+            }
+        }
+    return report
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _batches(students: Iterator[Tuple], batch_size: int) -> Iterator[List[Tuple]]:
+    batch = []
+    for student in students:
+        batch.append(student)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_cohort(answers_path: str, output_dir: str, uploads_dir: str = 'uploads', workers: int = None,
+               batch_size: int = 200, chunk_size: int = 100000, cohort: bool = False) -> Dict:
+    """
+    Assess every student in an answer sheet and return summary statistics
+
+    With cohort=True the summary also carries 'cohort', the per-course
+    cohort_report of the whole intake.
+    """
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    test_date = time.strftime('%Y-%m-%d')
+    totals = {'students': 0, 'failed': 0, 'unknown_questions': 0, 'readiness': {}}
+    tallies = []
+
+    def collect(future):
+        summary = future.result()
+        tallies.extend(summary['tallies'])
+        for key in ('students', 'failed', 'unknown_questions'):
+            totals[key] += summary[key]
+        for status, n in summary['readiness'].items():
+            totals['readiness'][status] = totals['readiness'].get(status, 0) + n
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(uploads_dir,)) as pool:
+        # A bounded number of batches in flight keeps memory flat for any cohort size
+        pending = set()
+        for batch in _batches(read_students(answers_path, chunk_size), batch_size):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            pending.add(pool.submit(assess_batch, batch, output_dir, test_date, cohort))
+        for future in pending:
+            collect(future)
+
+    if cohort:
+        totals['cohort'] = cohort_report(cohort_analysis(tallies))
+
+    elapsed = time.perf_counter() - started
+    totals['seconds'] = elapsed
+    totals['students_per_sec'] = totals['students'] / elapsed if elapsed else 0
+    totals['peak_rss_mb'] = peak_rss_mb()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score, gap-analyze and plan a cohort from exported answer sheets")
+    parser.add_argument('answers', help="CSV of student answers")
+    parser.add_argument('--output', required=True, help="Directory for per-student JSON reports")
+    parser.add_argument('--uploads-dir', default='uploads', help="Directory the question banks live in")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=200, help="Students per worker task")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Answer rows read per chunk")
+    parser.add_argument('--cohort-report', help="Also write cohort-wide gap analytics to this JSON file")
+    args = parser.parse_args(argv)
+
+    summary = run_cohort(args.answers, args.output, args.uploads_dir, workers=args.workers,
+                         batch_size=args.batch_size, chunk_size=args.chunk_size, cohort=bool(args.cohort_report))
+    if args.cohort_report:
+        with open(args.cohort_report, 'w', encoding='utf-8') as f:
+            json.dump(summary['cohort'], f, indent=2, default=_json_default)
+
+    print(f"Wrote {summary['students']} reports to {args.output} ({summary['failed']} failed, "
+          f"{summary['unknown_questions']} answers to unknown questions ignored)")
+    for status, n in sorted(summary['readiness'].items()):
+        print(f"  {status}: {n}")
+    print(f"{summary['seconds']:.2f}s: {summary['students_per_sec']:,.0f} students/s, "
+          f"peak RSS {summary['peak_rss_mb']:.0f} MB")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
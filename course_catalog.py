@@ -0,0 +1,111 @@
+import glob
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+class CourseCatalog:
+    """
+    Course list built from uploads/manifest.json, or from a scan of the uploads directory
+
+    Manifest format:
+        {"courses": [{"name": "Data Science", "file": "ds.csv", "popularity": 100}, ...]}
+
+    CSV files in the uploads directory that the manifest does not mention are
+    added with a title derived from their file name, so dropping in a new bank
+    is enough to publish a course.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, uploads_dir: str = "uploads"):
+        self.uploads_dir = uploads_dir
+        self._lock = threading.Lock()
+        self._access_counts: Dict[str, int] = {}
+        self.courses: Dict[str, Dict] = {}
+        self.refresh()
+
+    def refresh(self):
+        """Rebuild the catalog from the manifest and the uploads directory"""
+        courses = {}
+        for entry in self._read_manifest():
+            name = entry.get('name')
+            file_name = entry.get('file')
+            if not name or not file_name:
+                continue
+            courses[name] = {
+                'name': name,
+                'path': os.path.join(self.uploads_dir, file_name),
+                'popularity': float(entry.get('popularity', 0))
+            }
+
+        known_paths = {os.path.abspath(c['path']) for c in courses.values()}
+        for path in sorted(glob.glob(os.path.join(self.uploads_dir, '*.csv'))):
+            if os.path.abspath(path) in known_paths:
+                continue
+            name = self._title_from_path(path)
+            courses.setdefault(name, {'name': name, 'path': path, 'popularity': 0.0})
+
+        self.courses = courses
+
+    def names(self) -> List[str]:
+        """Course names in manifest order"""
+        return list(self.courses)
+
+    def paths(self) -> Dict[str, str]:
+        """Mapping of course name to question bank file"""
+        return {name: course['path'] for name, course in self.courses.items()}
+
+    def path_for(self, name: str) -> Optional[str]:
+        course = self.courses.get(name)
+        return course['path'] if course else None
+
+    def course_for_path(self, path: str) -> Optional[str]:
+        """Course name whose bank lives at path"""
+        target = os.path.abspath(path)
+        for name, course in self.courses.items():
+            if os.path.abspath(course['path']) == target:
+                return name
+        return None
+
+    def record_access(self, name: str):
+        """Count a selection so popularity reflects actual use"""
+        with self._lock:
+            self._access_counts[name] = self._access_counts.get(name, 0) + 1
+
+    def most_popular(self, limit: int) -> List[str]:
+        """Courses ranked by manifest popularity plus observed selections"""
+        ranked = sorted(
+            self.courses,
+            key=lambda name: self.courses[name]['popularity'] + self._access_counts.get(name, 0),
+            reverse=True
+        )
+        return ranked[:limit]
+
+    def register(self, name: str, file_name: str, popularity: float = 0):
+        """Add or update a course entry in manifest.json"""
+        entries = [entry for entry in self._read_manifest() if entry.get('name') != name]
+        entries.append({'name': name, 'file': file_name, 'popularity': popularity})
+
+        path = os.path.join(self.uploads_dir, self.MANIFEST_NAME)
+        staging = f"{path}.tmp-{os.getpid()}"
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump({'courses': entries}, f, indent=2)
+        os.replace(staging, path)
+        self.refresh()
+
+    def _read_manifest(self) -> List[Dict]:
+        path = os.path.join(self.uploads_dir, self.MANIFEST_NAME)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('courses', [])
+        except (OSError, ValueError) as e:
+            print(f"Error reading course manifest {path}: {e}")
+            return []
+
+    def _title_from_path(self, path: str) -> str:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return stem.replace('_', ' ').replace('-', ' ').strip().title()
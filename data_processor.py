@@ -1,39 +1,184 @@
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, List, Tuple
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from bank_reader import QuestionBankReader, CANONICAL_COLUMNS, format_stats
+from bank_cache import BankCache
+from bank_validator import validate_bank
+from question_store import QuestionBank, QuestionStore, get_question_store
+from course_catalog import CourseCatalog
+from bank_watcher import UploadsWatcher
+from topic_aliases import get_topic_aliases
 
 
 class DataProcessor:
     """Process and normalize question bank CSV files"""
 
-    def __init__(self, uploads_dir="uploads"):
+    def __init__(self, uploads_dir="uploads", cache_dir=None, store: QuestionStore = None,
+                 prefetch: int = 2, prefetch_workers: int = 2):
         self.uploads_dir = uploads_dir
         # Create uploads directory if it doesn't exist
         os.makedirs(uploads_dir, exist_ok=True)
+        self.cache = BankCache(cache_dir or os.path.join(uploads_dir, '.bank_cache'))
+        self.reports_dir = os.path.join(uploads_dir, '.bank_reports')
 
-        self.courses = {
-            'Data Science': os.path.join(uploads_dir, 'ds.csv'),
-            'AI/ML': os.path.join(uploads_dir, 'aiml.csv'),
-            'Cybersecurity': os.path.join(uploads_dir, 'cyber.csv'),
-            'Full Stack': os.path.join(uploads_dir, 'fullstack.csv')
-        }
-        self.question_banks = {}
-        self.load_all_courses()
-
-    def load_all_courses(self):
-        """Load all course question banks"""
-        for course_name, file_path in self.courses.items():
-            try:
-                # Create sample data for all courses
-                self.question_banks[course_name] = self._create_sample_data(course_name)
-                print(f"Created sample data for {course_name}: {len(self.question_banks[course_name])} questions")
-            except Exception as e:
-                print(f"Error loading {course_name}: {e}")
-                # Create empty DataFrame with required columns
-                self.question_banks[course_name] = pd.DataFrame(columns=[
-                    'id', 'course', 'topic', 'level', 'question',
-                    'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer'
-                ])
+        self.catalog = CourseCatalog(uploads_dir)
+        # Banks live in a store shared by every DataProcessor in the process
+        self.store = store or get_question_store()
+        self.load_stats = {}
+        self.reader = QuestionBankReader()
+
+        # Banks load on first access; the most popular ones are warmed in the background
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._load_locks_guard = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='bank-prefetch')
+        self.prefetch(self.catalog.most_popular(prefetch))
+        self.watcher = None
+
+    @property
+    def courses(self) -> Dict[str, str]:
+        """Mapping of course name to question bank file"""
+        return self.catalog.paths()
+
+    @property
+    def question_banks(self) -> Dict[str, pd.DataFrame]:
+        """Current DataFrame for each loaded course"""
+        return {course: bank.df for course, bank in self.store.snapshot().items()}
+
+    def load_all_courses(self, reload: bool = False):
+        """Eagerly load every catalog course not already in the shared store"""
+        for course_name in self.courses:
+            if reload:
+                self.reload_course(course_name)
+            else:
+                self.get_bank(course_name)
+
+    def get_bank(self, course: str) -> Optional[QuestionBank]:
+        """Current bank for a course, loading it on first access"""
+        bank = self.store.get(course)
+        if bank is not None or course not in self.catalog.courses:
+            return bank
+
+        with self._load_lock(course):
+            # Another thread may have finished loading while we waited
+            bank = self.store.get(course)
+            if bank is None:
+                bank = self.reload_course(course)
+        return bank
+
+    def prefetch(self, courses: List[str]) -> List[Future]:
+        """Load courses on the background thread pool"""
+        return [self._prefetcher.submit(self.get_bank, course)
+                for course in courses if self.store.get(course) is None]
+
+    def reload_course(self, course_name: str) -> QuestionBank:
+        """Load a course bank and publish it as the new current version"""
+        file_path = self.catalog.path_for(course_name)
+        try:
+            if os.path.exists(file_path):
+                df = self._load_bank(course_name, file_path)
+            else:
+                # Fall back to sample data when the bank has not been uploaded
+                df = self._create_sample_data(course_name)
+                print(f"Created sample data for {course_name}: {len(df)} questions")
+        except Exception as e:
+            print(f"Error loading {course_name}: {e}")
+            # Create empty DataFrame with required columns
+            df = pd.DataFrame(columns=CANONICAL_COLUMNS)
+        bank = self.store.publish(course_name, df, file_path)
+        get_topic_aliases(course_name).add_topics(bank.index.topics)
+        return bank
+
+    def refresh_course(self, course_name: str) -> Optional[QuestionBank]:
+        """
+        Re-ingest a changed bank and publish it only if its questions differ
+
+        The new version is built from the current one: unchanged rows and
+        their index entries are reused, and only added, changed and removed
+        questions are applied. Courses that have not been loaded yet are
+        left alone; they pick up the new file on first access.
+        """
+        current = self.store.get(course_name)
+        if current is None:
+            return None
+
+        with self._load_lock(course_name):
+            file_path = self.catalog.path_for(course_name)
+            df = self._load_bank(course_name, file_path)
+            diff = diff_banks(current.df, df)
+            counts = {change: len(diff[change]) for change in ('added', 'changed', 'removed')}
+            if not any(counts.values()):
+                print(f"{course_name} unchanged ({diff['unchanged']} questions), keeping version {current.version}")
+                return current
+            if set(df.columns) == set(current.df.columns):
+                df, index = current.apply_changes(df, diff)
+                bank = self.store.publish(course_name, df, file_path, index)
+            else:
+                bank = self.store.publish(course_name, df, file_path)
+        get_topic_aliases(course_name).add_topics(bank.index.topics)
+        print(f"Published {course_name} version {bank.version}: {counts['added']} added, "
+              f"{counts['changed']} changed, {counts['removed']} removed, {diff['unchanged']} unchanged")
+        return bank
+
+    def watch(self, interval: float = 2.0) -> UploadsWatcher:
+        """Start hot-reloading banks when files in the uploads directory change"""
+        if self.watcher is None:
+            self.watcher = UploadsWatcher(self, interval)
+            self.watcher.start()
+        return self.watcher
+
+    def checkout(self, course: str) -> QuestionBank:
+        """
+        Current bank version for a course
+
+        Sessions keep the returned reference for the length of a quiz so a
+        concurrent reload never changes questions mid-assessment.
+        """
+        self.catalog.record_access(course)
+        return self.get_bank(course)
+
+    def _load_lock(self, course: str) -> threading.Lock:
+        with self._load_locks_guard:
+            return self._load_locks.setdefault(course, threading.Lock())
+
+    def _load_bank(self, course_name: str, file_path: str) -> pd.DataFrame:
+        """Load a bank from the compiled cache, parsing and compiling the CSV on a miss"""
+        started = time.perf_counter()
+        df = self.cache.load(file_path)
+        if df is not None:
+            print(f"Loaded {course_name} from compiled cache: {len(df)} questions "
+                  f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+            return self._apply_calibration(course_name, file_path, df)
+
+        df, stats = self.reader.read(file_path, course_name, assign_ids=False)
+        self.load_stats[course_name] = stats
+        print(f"Loaded {course_name} from {file_path}: {format_stats(stats)}")
+
+        report_path = os.path.join(self.reports_dir, f"{os.path.splitext(os.path.basename(file_path))[0]}.json")
+        df, report = validate_bank(df, course_name, file_path, report_path)
+        df = self.reader.assign_ids(df)
+        if report['errors'] or report['warnings']:
+            print(f"Validated {course_name}: {report['rows_dropped']} rows dropped, {report['errors']} errors, "
+                  f"{report['warnings']} warnings ({report['seconds'] * 1000:.1f} ms, see {report_path})")
+        try:
+            self.cache.store(file_path, df)
+        except OSError as e:
+            print(f"Could not compile {course_name} bank: {e}")
+        return self._apply_calibration(course_name, file_path, df)
+
+    def _apply_calibration(self, course_name: str, file_path: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Attach calibrated IRT parameters by question id; uncalibrated questions get NaN"""
+        calibration = self.cache.load_calibration(file_path)
+        if calibration is None:
+            return df
+        params = calibration.drop_duplicates('id').set_index('id').reindex(df['id'].astype(str))
+        df = df.assign(**{col: params[col].to_numpy(dtype=float) for col in params.columns})
+        print(f"Applied IRT calibration to {course_name}: "
+              f"{int(params['irt_b'].notna().sum())} of {len(df)} questions calibrated")
+        return df
 
     def _create_sample_data(self, course_name: str) -> pd.DataFrame:
         """Create comprehensive sample data"""
@@ -122,40 +267,82 @@ class DataProcessor:
 
         return pd.DataFrame(sample_data)
 
-    def get_questions_by_level(self, course: str, level: int, limit: int = None) -> pd.DataFrame:
-        """Get questions for a specific course and level"""
-        if course not in self.question_banks:
+    def get_questions(self, course: str, level: int = None, topic: str = None,
+                      limit: int = None, random_state=None) -> pd.DataFrame:
+        """Get questions for a course filtered by level and/or topic from the precomputed index"""
+        bank = self.get_bank(course)
+        if bank is None:
             return pd.DataFrame()
 
-        df = self.question_banks[course]
+        df = bank.df
         if len(df) == 0:
             return df
 
-        filtered = df[df['level'] == level]
+        positions = self.sample_positions(bank, level, topic, limit, random_state)
+        return df.iloc[positions].reset_index(drop=True)
 
-        if limit and len(filtered) > limit:
-            filtered = filtered.sample(n=limit, random_state=42)
+    def sample_positions(self, bank: QuestionBank, level: int = None, topic: str = None,
+                         limit: int = None, random_state=None) -> np.ndarray:
+        """
+        Sample question ids (row positions) from a bank version by level and/or topic
 
-        return filtered.reset_index(drop=True)
+        random_state may be a seed or a numpy Generator; None draws a fresh sample.
+        """
+        positions = bank.index.positions(level, topic)
+        if limit and len(positions) > limit:
+            rng = np.random.default_rng(random_state)
+            positions = rng.choice(positions, size=limit, replace=False)
+        return positions
+
+    def get_questions_by_level(self, course: str, level: int, limit: int = None) -> pd.DataFrame:
+        """Get questions for a specific course and level"""
+        return self.get_questions(course, level=level, limit=limit)
 
     def get_all_topics(self, course: str) -> List[str]:
         """Get all unique topics for a course"""
-        if course not in self.question_banks:
+        bank = self.get_bank(course)
+        if bank is None:
             return []
 
-        df = self.question_banks[course]
-        if len(df) == 0:
+        if len(bank) == 0:
             return ['General']
 
-        return df['topic'].unique().tolist()
+        return list(bank.index.topic_order)
 
     def get_level_distribution(self, course: str) -> Dict[int, int]:
         """Get count of questions per level"""
-        if course not in self.question_banks:
+        bank = self.get_bank(course)
+        if bank is None:
             return {}
 
-        df = self.question_banks[course]
-        if len(df) == 0:
+        if len(bank) == 0:
             return {1: 5, 2: 5, 3: 5, 4: 5, 5: 5}
 
-        return df['level'].value_counts().sort_index().to_dict()
\ No newline at end of file
+        return dict(bank.index.level_distribution)
+
+
+def diff_banks(old_df: pd.DataFrame, new_df: pd.DataFrame) -> Dict:
+    """
+    Match the questions of two bank versions by id and compare their row hashes
+
+    Returns row positions: 'removed' and 'changed' in old_df, 'changed_to'
+    (the matching rows of 'changed') and 'added' in new_df, plus the
+    'unchanged' count. Ids must be unique, as assign_ids makes them.
+    """
+    def row_hashes(df):
+        if len(df) == 0:
+            return np.empty(0, dtype=np.uint64)
+        # Categorical, string and integer columns hash by value, whatever their dtype
+        return pd.util.hash_pandas_object(df[CANONICAL_COLUMNS], index=False).to_numpy()
+
+    old_ids = pd.Index(old_df['id'].astype(str).to_numpy())
+    matches = old_ids.get_indexer(new_df['id'].astype(str).to_numpy())
+    matched = np.flatnonzero(matches >= 0)
+    differs = row_hashes(old_df)[matches[matched]] != row_hashes(new_df)[matched]
+    return {
+        'removed': np.setdiff1d(np.arange(len(old_df)), matches[matched]),
+        'changed': matches[matched[differs]],
+        'changed_to': matched[differs],
+        'added': np.flatnonzero(matches < 0),
+        'unchanged': int(len(matched) - differs.sum())
+    }
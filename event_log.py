@@ -0,0 +1,150 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional
+
+import pandas as pd
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    logged_at REAL NOT NULL,
+    session_id TEXT NOT NULL,
+    learner_id TEXT,
+    course TEXT,
+    bank_version INTEGER,
+    mode TEXT,
+    position INTEGER,
+    question_id TEXT,
+    chosen INTEGER,
+    correct INTEGER,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS responses_course ON responses (course);
+"""
+
+RESPONSE_FIELDS = ('logged_at', 'session_id', 'learner_id', 'course', 'bank_version', 'mode', 'position',
+                   'question_id', 'chosen', 'correct', 'latency_ms')
+
+
+class ResponseLog:
+    """
+    Append-only log of answer submissions in SQLite (WAL mode)
+
+    record() only puts a tuple on an in-memory queue; a background thread
+    writes queued events in batches, one transaction per batch. Pending
+    events are flushed when the process exits.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='response-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, session_id: str, course: str, question_id: str, chosen: int, correct: bool,
+               latency_ms: Optional[float] = None, position: Optional[int] = None,
+               bank_version: Optional[int] = None, mode: Optional[str] = None, learner_id: Optional[str] = None):
+        """Queue one answer submission; never blocks on disk"""
+        self._queue.put_nowait((time.time(), session_id, learner_id, course, bank_version, mode, position,
+                                question_id, chosen, int(bool(correct)), latency_ms))
+
+    def flush(self):
+        """Block until every queued event is on disk"""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending events and stop the writer"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        if 'learner_id' not in _columns(connection):
+            # Logs written before answers carried the learner
+            connection.execute("ALTER TABLE responses ADD COLUMN learner_id TEXT")
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write(connection, batch)
+        finally:
+            connection.close()
+
+    def _write(self, connection: sqlite3.Connection, batch):
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO responses ({', '.join(RESPONSE_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(RESPONSE_FIELDS))})",
+                    batch
+                )
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            self.dropped += len(batch)
+            print(f"Error writing {len(batch)} response events to {self.path}: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+def _columns(connection: sqlite3.Connection):
+    return {row[1] for row in connection.execute("PRAGMA table_info(responses)")}
+
+
+def read_responses(path: str, course: Optional[str] = None, chunk_size: int = 1000000,
+                   which: str = 'last') -> Iterator[pd.DataFrame]:
+    """
+    Stream logged responses as DataFrames with student_id, course, question_id and correct
+
+    The student is the learner id the answer was logged with, so retakes
+    count as one student; rows logged without one fall back to their
+    session id. Rows come in the order they were logged. which selects the
+    'last' (final) or 'first' answer of a student to each question, or
+    'all' answers.
+    """
+    if which not in ('first', 'last', 'all'):
+        raise ValueError(f"which must be 'first', 'last' or 'all', not {which!r}")
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        student = ("COALESCE(NULLIF(learner_id, ''), session_id)" if 'learner_id' in _columns(connection)
+                   else "session_id")
+        conditions = []
+        if which != 'all':
+            conditions.append(f"id IN (SELECT {'MIN' if which == 'first' else 'MAX'}(id) FROM responses "
+                              f"GROUP BY {student}, question_id)")
+        if course:
+            conditions.append("course = ?")
+        query = (f"SELECT {student} AS student_id, course, question_id, correct FROM responses"
+                 + (" WHERE " + " AND ".join(conditions) if conditions else "") + " ORDER BY id")
+        params = (course,) if course else ()
+        for chunk in pd.read_sql_query(query, connection, params=params, chunksize=chunk_size):
+            yield chunk.astype(str)
+    finally:
+        connection.close()
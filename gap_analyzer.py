@@ -1,9 +1,37 @@
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+TOPIC_BANDS = ('strong', 'moderate', 'weak')
+
+
 class GapAnalyzer:
     def __init__(self):
         self.mastery_threshold = 70
         self.weak_threshold = 50
+        # Topic percentage at or above strong_threshold is strong, below moderate_threshold weak
+        self.strong_threshold = 80
+        self.moderate_threshold = 60
+        # Same bands on knowledge-tracing mastery probabilities, when those are available
+        self.strong_mastery = 0.8
+        self.weak_mastery = 0.5
+        # (minimum overall score, label, message), highest band first
+        self.readiness_bands = [
+            (80, "Excellent", "You have excellent prerequisite knowledge for this course."),
+            (70, "Good", "You have solid foundational knowledge. Minor improvements needed."),
+            (60, "Satisfactory", "You have basic understanding. Focus on key improvement areas."),
+            (None, "Needs Improvement", "Significant preparation recommended before starting the course.")
+        ]
 
-    def analyze_gaps(self, results, course, initial_level):
+    def analyze_gaps(self, results, course, initial_level, mastery: Dict[str, float] = None):
+        """
+        Gap analysis for one student
+
+        mastery maps topics to knowledge-tracing mastery probabilities; topics
+        found there are banded by that posterior rather than by this quiz's
+        percentage alone.
+        """
         level_performance = results['level_performance']
         topic_performance = results['topic_performance']
 
@@ -12,37 +40,30 @@ class GapAnalyzer:
         weak_topics = []
         moderate_topics = []
 
-        for topic, perf in topic_performance.items():
-            if perf['total'] > 0:
-                percentage = (perf['correct'] / perf['total'] * 100)
-                topic_data = {
-                    'topic': topic,
-                    'percentage': percentage,
-                    'correct': perf['correct'],
-                    'total': perf['total']
-                }
-
-                if percentage >= 80:
-                    strong_topics.append(topic_data)
-                elif percentage < 60:
-                    weak_topics.append(topic_data)
-                else:
-                    moderate_topics.append(topic_data)
+        names, correct, total = self._topic_tallies(results)
+        attempted = total > 0
+        percentage = self._percentages(correct, total)
+        band = self.topic_bands(percentage)
+        if mastery:
+            probability = np.array([mastery.get(name, np.nan) for name in names], dtype=float)
+            traced = ~np.isnan(probability)
+            band = np.where(traced, self.mastery_bands(probability), band)
+        buckets = (strong_topics, moderate_topics, weak_topics)
+
+        for i in np.flatnonzero(attempted):
+            entry = {
+                'topic': names[i],
+                'percentage': float(percentage[i]),
+                'correct': int(correct[i]),
+                'total': int(total[i])
+            }
+            if mastery and traced[i]:
+                entry['mastery'] = float(probability[i])
+            buckets[band[i]].append(entry)
 
         # Determine readiness level
         overall_score = results['score_percentage']
-        if overall_score >= 80:
-            readiness = "Excellent"
-            readiness_message = "You have excellent prerequisite knowledge for this course."
-        elif overall_score >= 70:
-            readiness = "Good"
-            readiness_message = "You have solid foundational knowledge. Minor improvements needed."
-        elif overall_score >= 60:
-            readiness = "Satisfactory"
-            readiness_message = "You have basic understanding. Focus on key improvement areas."
-        else:
-            readiness = "Needs Improvement"
-            readiness_message = "Significant preparation recommended before starting the course."
+        _, readiness, readiness_message = self.readiness_bands[int(self.readiness_band([overall_score])[0])]
 
         # Calculate actual level
         actual_level = self._calculate_actual_level(level_performance)
@@ -63,16 +84,141 @@ class GapAnalyzer:
             'topic_performance': topic_performance
         }
 
+    def _topic_tallies(self, results):
+        """Topic names with aligned correct/total arrays, from topic codes when available"""
+        if 'topic_codes' in results:
+            topic_names = results['topic_names']
+            names = [topic_names[code] for code in results['topic_codes']]
+            return names, np.asarray(results['topic_correct']), np.asarray(results['topic_total'])
+
+        topic_performance = results['topic_performance']
+        names = list(topic_performance)
+        correct = np.fromiter((p['correct'] for p in topic_performance.values()), dtype=np.int64, count=len(names))
+        total = np.fromiter((p['total'] for p in topic_performance.values()), dtype=np.int64, count=len(names))
+        return names, correct, total
+
     def _calculate_actual_level(self, level_performance):
-        actual_level = 1
-        for level in range(5, 0, -1):
-            perf = level_performance[level]
-            if perf['total'] > 0:
-                percentage = (perf['correct'] / perf['total'] * 100)
-                if percentage >= self.mastery_threshold:
-                    actual_level = level
-                    break
-        return actual_level
+        correct = np.array([[level_performance[level]['correct'] for level in range(1, 6)]])
+        total = np.array([[level_performance[level]['total'] for level in range(1, 6)]])
+        return int(self.actual_levels(correct, total)[0])
+
+    def actual_levels(self, level_correct, level_total):
+        """
+        Highest mastered level for many students at once
+
+        Args:
+            level_correct: Correct answers per student for levels 1-5 (or 0-5, column 0 ignored)
+            level_total: Questions per student and level, same shape
+        """
+        level_correct = np.asarray(level_correct, dtype=float)[:, -5:]
+        level_total = np.asarray(level_total, dtype=float)[:, -5:]
+        percentage = np.divide(level_correct, level_total, out=np.zeros_like(level_correct),
+                               where=level_total > 0) * 100
+        mastered = (level_total > 0) & (percentage >= self.mastery_threshold)
+        highest = 5 - np.argmax(mastered[:, ::-1], axis=1)
+        return np.where(mastered.any(axis=1), highest, 1)
+
+    def _percentages(self, correct, total):
+        correct = np.asarray(correct, dtype=float)
+        total = np.asarray(total, dtype=float)
+        return np.divide(correct, total, out=np.zeros_like(correct), where=total > 0) * 100
+
+    def topic_bands(self, percentage):
+        """Band index per topic percentage: 0 strong, 1 moderate, 2 weak (see TOPIC_BANDS)"""
+        percentage = np.asarray(percentage)
+        return np.where(percentage >= self.strong_threshold, 0,
+                        np.where(percentage < self.moderate_threshold, 2, 1))
+
+    def mastery_bands(self, probability):
+        """topic_bands for mastery probabilities"""
+        probability = np.asarray(probability)
+        return np.where(probability >= self.strong_mastery, 0, np.where(probability < self.weak_mastery, 2, 1))
+
+    def readiness_band(self, overall_scores):
+        """Index into readiness_bands for each overall score"""
+        scores = np.asarray(overall_scores, dtype=float)
+        band = np.full(scores.shape, len(self.readiness_bands) - 1)
+        for i, (minimum, _, _) in reversed(list(enumerate(self.readiness_bands))):
+            if minimum is not None:
+                band[scores >= minimum] = i
+        return band
+
+    def analyze_cohort(self, level_correct, level_total, topic_correct, topic_total, topics: Sequence[str],
+                       overall_scores, initial_levels=None, student_ids=None) -> Dict:
+        """
+        Gap analysis for a whole cohort from columnar tallies
+
+        Uses the same thresholds and labels as analyze_gaps, with one row per
+        student in every array, so a cohort is a handful of array operations.
+
+        Args:
+            level_correct: Correct answers per student for levels 1-5 (or 0-5, column 0 ignored)
+            level_total: Questions per student and level, same shape
+            topic_correct: Correct answers per student and topic, columns aligned with topics
+            topic_total: Questions per student and topic; 0 where a student met no such question
+            topics: Topic name of each tally column
+            overall_scores: Overall score percentage per student
+            initial_levels: Self-assessed level per student, if known
+            student_ids: Row labels for the per-student table
+        """
+        topic_total = np.asarray(topic_total)
+        attempted = topic_total > 0
+        percentage = self._percentages(topic_correct, topic_total)
+        band = self.topic_bands(percentage)
+        overall_scores = np.asarray(overall_scores, dtype=float)
+        readiness = self.readiness_band(overall_scores)
+        actual = self.actual_levels(level_correct, level_total)
+
+        labels = [label for _, label, _ in self.readiness_bands]
+        students = pd.DataFrame({
+            'overall_score': overall_scores,
+            'readiness': pd.Categorical.from_codes(readiness, labels),
+            'actual_level': actual
+        }, index=student_ids)
+        for i, name in enumerate(TOPIC_BANDS):
+            students[f'{name}_topics'] = ((band == i) & attempted).sum(axis=1)
+        if initial_levels is not None:
+            students['self_assessed_level'] = np.asarray(initial_levels)
+            students['level_gap'] = students['self_assessed_level'] - actual
+
+        # Per-topic counts of strong / moderate / weak students among those who met the topic
+        counts = np.stack([((band == i) & attempted).sum(axis=0) for i in range(len(TOPIC_BANDS))], axis=1)
+        seen = attempted.sum(axis=0)
+        topic_summary = pd.DataFrame(counts, index=list(topics), columns=list(TOPIC_BANDS))
+        topic_summary.insert(0, 'students', seen)
+        topic_summary.insert(1, 'mean_percentage',
+                             np.divide(np.where(attempted, percentage, 0).sum(axis=0), seen,
+                                       out=np.full(len(seen), np.nan), where=seen > 0))
+        topic_summary['weak_share'] = np.divide(counts[:, 2], seen, out=np.full(len(seen), np.nan), where=seen > 0)
+
+        # Weak share per actual level and topic: one-hot level matrix times the weak mask
+        by_level = np.eye(6, dtype=np.int64)[actual][:, 1:]
+        weak_by_level = by_level.T @ ((band == 2) & attempted).astype(np.int64)
+        seen_by_level = by_level.T @ attempted.astype(np.int64)
+        heatmap = pd.DataFrame(
+            np.divide(weak_by_level, seen_by_level, out=np.full(weak_by_level.shape, np.nan), where=seen_by_level > 0),
+            index=pd.Index(range(1, 6), name='actual_level'), columns=list(topics)
+        )
+
+        return {
+            'students': students,
+            'readiness_distribution': students['readiness'].value_counts(sort=False),
+            'level_distribution': pd.Series(np.bincount(actual, minlength=6)[1:], index=range(1, 6)),
+            'topics': topic_summary.sort_values('weak_share', ascending=False),
+            'topic_heatmap': heatmap
+        }
+
+    def analyze_batch_scores(self, scores, initial_levels=None, student_ids=None) -> Dict:
+        """analyze_cohort for AssessmentEngine.score_batch results"""
+        topics = [scores.topic_names[code] for code in scores.topic_codes]
+        return self.analyze_cohort(scores.level_correct, scores.level_total, scores.topic_correct,
+                                   scores.topic_total, topics, scores.score_percentage, initial_levels, student_ids)
+
+    def _priority_score(self, topic):
+        """The figure a topic was banded by: its mastery estimate when traced, else this quiz's percentage"""
+        if 'mastery' in topic:
+            return topic['mastery'] * 100, 'estimated mastery'
+        return topic['percentage'], 'performance'
 
     def _get_level_gap_message(self, gap):
         if gap > 2:
@@ -89,22 +235,24 @@ class GapAnalyzer:
 
         # High priority: Weak topics
         for topic in gap_analysis['weak_topics']:
+            score, basis = self._priority_score(topic)
             priorities.append({
                 'priority': 'High',
                 'area': topic['topic'],
                 'type': 'Topic',
-                'score': topic['percentage'],
-                'reason': f"Low performance ({topic['percentage']:.1f}%) - needs immediate attention"
+                'score': score,
+                'reason': f"Low {basis} ({score:.1f}%) - needs immediate attention"
             })
 
         # Medium priority: Moderate topics
         for topic in gap_analysis['moderate_topics']:
+            score, basis = self._priority_score(topic)
             priorities.append({
                 'priority': 'Medium',
                 'area': topic['topic'],
                 'type': 'Topic',
-                'score': topic['percentage'],
-                'reason': f"Room for improvement ({topic['percentage']:.1f}%)"
+                'score': score,
+                'reason': f"Room for improvement in {basis} ({score:.1f}%)"
             })
 
         return priorities
\ No newline at end of file
@@ -0,0 +1,168 @@
+import threading
+import weakref
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+# Ability values every table is evaluated on
+THETA_GRID = np.linspace(-4.0, 4.0, 61)
+
+# Defaults for banks without calibrated parameters: difficulty follows the
+# hand-assigned level, guessing is one in four options
+DEFAULT_DISCRIMINATION = 1.2
+DEFAULT_GUESSING = 0.25
+LEVEL_DIFFICULTY_STEP = 1.0
+
+
+def probability(theta, a, b, c=0.0):
+    """Three-parameter logistic probability of a correct response"""
+    return c + (1.0 - c) / (1.0 + np.exp(-a * (theta - b)))
+
+
+def information(theta, a, b, c=0.0):
+    """Fisher information of 3PL items at ability theta"""
+    p = probability(theta, a, b, c)
+    q = 1.0 - p
+    return (a ** 2) * (q / p) * ((p - c) / (1.0 - c)) ** 2
+
+
+def level_to_theta(level):
+    """Ability on the theta scale that corresponds to a 1-5 level"""
+    return (np.asarray(level, dtype=float) - 3.0) * LEVEL_DIFFICULTY_STEP
+
+
+def nearest_grid_index(grid: np.ndarray, theta):
+    """Index of the grid point closest to each ability value (grid ascending)"""
+    upper = np.clip(np.searchsorted(grid, theta), 1, len(grid) - 1)
+    lower = upper - 1
+    return np.where(np.abs(theta - grid[lower]) <= np.abs(grid[upper] - theta), lower, upper)
+
+
+def theta_to_level(theta):
+    """Nearest 1-5 level for an ability estimate"""
+    return np.clip(np.rint(np.asarray(theta) / LEVEL_DIFFICULTY_STEP + 3.0), 1, 5).astype(int)
+
+
+class ItemPool:
+    """
+    Precomputed IRT tables for one bank version
+
+    For every ability grid point the items are pre-sorted by Fisher
+    information, so choosing the next item is a short scan of one row that
+    skips the handful of items already administered.
+    """
+
+    def __init__(self, a: np.ndarray, b: np.ndarray, c: np.ndarray, grid: np.ndarray = THETA_GRID):
+        self.a = np.asarray(a, dtype=np.float64)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.c = np.asarray(c, dtype=np.float64)
+        self.grid = grid
+
+        info = information(grid[:, None], self.a[None, :], self.b[None, :], self.c[None, :]).astype(np.float32)
+        self.ranking = np.argsort(-info, axis=1, kind='stable').astype(np.int32)
+        self.max_information = info.max(axis=1)
+
+    @classmethod
+    def from_bank(cls, bank) -> 'ItemPool':
+        """Use calibrated parameters when the bank has them, level-based defaults otherwise"""
+        df = bank.df
+        n = len(df)
+        if 'irt_b' in df.columns:
+            a = df['irt_a'].to_numpy(dtype=np.float64)
+            b = df['irt_b'].to_numpy(dtype=np.float64)
+            c = df['irt_c'].to_numpy(dtype=np.float64) if 'irt_c' in df.columns else np.full(n, DEFAULT_GUESSING)
+            # Items the calibration has not seen keep their level-based defaults
+            missing = np.isnan(b)
+            a = np.where(missing | np.isnan(a), DEFAULT_DISCRIMINATION, a)
+            b = np.where(missing, level_to_theta(bank.levels), b)
+            c = np.where(missing | np.isnan(c), DEFAULT_GUESSING, c)
+        else:
+            a = np.full(n, DEFAULT_DISCRIMINATION)
+            b = level_to_theta(bank.levels)
+            c = np.full(n, DEFAULT_GUESSING)
+        return cls(a, b, c)
+
+    def __len__(self) -> int:
+        return len(self.a)
+
+    def grid_index(self, theta: float) -> int:
+        """Nearest grid point to an ability value"""
+        return int(nearest_grid_index(self.grid, theta))
+
+    def next_item(self, theta: float, administered: Sequence[int], rng: Optional[np.random.Generator] = None,
+                  randomesque: int = 1) -> int:
+        """
+        Most informative unused item at theta
+
+        With randomesque > 1 the item is drawn from the top-k candidates,
+        which spreads exposure across items with (near) equal information.
+        Returns -1 when every item has been used.
+        """
+        row = self.ranking[self.grid_index(theta)]
+        used = set(int(i) for i in administered)
+        candidates = []
+        for item in row[:len(used) + randomesque]:
+            if int(item) not in used:
+                candidates.append(int(item))
+                if len(candidates) == randomesque:
+                    break
+        if not candidates:
+            return -1
+        if len(candidates) == 1 or rng is None:
+            return candidates[0]
+        return candidates[int(rng.integers(len(candidates)))]
+
+    def response_likelihood(self, item: int, correct: bool) -> np.ndarray:
+        """Likelihood of one response over the ability grid"""
+        p = probability(self.grid, self.a[item], self.b[item], self.c[item])
+        return p if correct else 1.0 - p
+
+
+class AbilityEstimate:
+    """Expected-a-posteriori ability estimate over the theta grid, updated one response at a time"""
+
+    __slots__ = ('grid', 'log_posterior')
+
+    def __init__(self, prior_mean: float = 0.0, prior_sd: float = 1.0, grid: np.ndarray = THETA_GRID):
+        self.grid = grid
+        self.log_posterior = -0.5 * ((grid - prior_mean) / prior_sd) ** 2
+
+    def update(self, likelihood: np.ndarray):
+        self.log_posterior = self.log_posterior + np.log(np.maximum(likelihood, 1e-12))
+
+    def posterior(self) -> np.ndarray:
+        weights = np.exp(self.log_posterior - self.log_posterior.max())
+        return weights / weights.sum()
+
+    @property
+    def theta(self) -> float:
+        return float(np.dot(self.grid, self.posterior()))
+
+    @property
+    def standard_error(self) -> float:
+        posterior = self.posterior()
+        mean = np.dot(self.grid, posterior)
+        return float(np.sqrt(np.dot((self.grid - mean) ** 2, posterior)))
+
+    def level_confidence(self):
+        """Most probable 1-5 level and the posterior probability that the student is at it"""
+        by_level = np.bincount(theta_to_level(self.grid), weights=self.posterior(), minlength=6)
+        level = int(np.argmax(by_level))
+        return level, float(by_level[level])
+
+
+_pools = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+def get_item_pool(bank) -> ItemPool:
+    """ItemPool for a bank version, built on first use and shared by every session"""
+    pool = _pools.get(bank)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(bank)
+            if pool is None:
+                pool = ItemPool.from_bank(bank)
+                _pools[bank] = pool
+    return pool
@@ -0,0 +1,248 @@
+"""
+Bayesian knowledge tracing of topic mastery
+
+Every (learner, course, topic) carries a probability that the learner has
+mastered the topic. Each answer updates it in constant time; the values
+persist in SQLite so they carry over from one quiz attempt to the next,
+and GapAnalyzer reads them instead of bucketing a single quiz's raw
+percentages.
+
+The store can be rebuilt from the app's response log, replaying each
+learner's first answer to every question in logged order, vectorized
+across (learner, topic) sequences:
+
+Usage:
+    python knowledge_tracing.py --course "Data Science" --event-log uploads/.events/responses.sqlite
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from calibration import load_responses
+from data_processor import DataProcessor
+from event_log import read_responses
+
+DEFAULT_STORE = os.path.join('uploads', '.events', 'mastery.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mastery (
+    learner_id TEXT NOT NULL,
+    course TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    p_mastery REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (learner_id, course, topic)
+);
+"""
+
+
+class KnowledgeTracer:
+    """
+    Standard BKT model: one skill per topic, no forgetting
+
+    An answer updates the mastery probability by Bayes' rule (a mastered
+    learner slips with p_slip, an unmastered one guesses with p_guess),
+    then the learner may learn the topic with p_learn.
+    """
+
+    def __init__(self, p_init: float = 0.3, p_learn: float = 0.1, p_slip: float = 0.1, p_guess: float = 0.25):
+        self.p_init = p_init
+        self.p_learn = p_learn
+        self.p_slip = p_slip
+        self.p_guess = p_guess
+
+    def update(self, p: float, correct: bool) -> float:
+        """Mastery probability after one answer"""
+        if correct:
+            known = p * (1 - self.p_slip)
+            posterior = known / (known + (1 - p) * self.p_guess)
+        else:
+            known = p * self.p_slip
+            posterior = known / (known + (1 - p) * (1 - self.p_guess))
+        return posterior + (1 - posterior) * self.p_learn
+
+    def update_batch(self, p: np.ndarray, correct: np.ndarray) -> np.ndarray:
+        """update() element-wise over arrays"""
+        known = p * np.where(correct, 1 - self.p_slip, self.p_slip)
+        unknown = (1 - p) * np.where(correct, self.p_guess, 1 - self.p_guess)
+        posterior = known / (known + unknown)
+        return posterior + (1 - posterior) * self.p_learn
+
+    def replay(self, keys: np.ndarray, correct: np.ndarray, n_keys: int, p: Optional[np.ndarray] = None,
+               attempts: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Apply a time-ordered answer history to many sequences at once
+
+        keys holds the sequence (e.g. learner x topic code) of each answer.
+        Answers are grouped by their position within their sequence, so step
+        k updates the k-th answer of every sequence in one array operation;
+        the loop runs once per answer of the longest sequence, not once per
+        answer. p and attempts, if given, are the state to continue from.
+        """
+        state = np.full(n_keys, self.p_init)
+        counts = np.zeros(n_keys, dtype=np.int64)
+        if p is not None:
+            state[:len(p)] = p
+            counts[:len(attempts)] = attempts
+        if len(keys) == 0:
+            return state, counts
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        group_start = np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+        step = np.empty(len(keys), dtype=np.int64)
+        step[order] = np.arange(len(keys)) - group_start
+
+        by_step = np.argsort(step, kind='stable')
+        for events in np.split(by_step, np.cumsum(np.bincount(step))[:-1]):
+            k = keys[events]
+            state[k] = self.update_batch(state[k], correct[events])
+        counts += np.bincount(keys, minlength=n_keys)
+        return state, counts
+
+
+class LearnerMastery:
+    """
+    One learner's topic mastery within a course, updated answer by answer
+
+    Only the first answer to each quiz question is traced, so revising an
+    answer in a fixed-form quiz does not count as extra evidence.
+    """
+
+    def __init__(self, tracer: KnowledgeTracer, course: str, known: Dict[str, Tuple[float, int]] = None):
+        self.tracer = tracer
+        self.course = course
+        self.state: Dict[str, List] = {topic: [p, n] for topic, (p, n) in (known or {}).items()}
+        self.changed = set()
+        self._traced = set()
+
+    def record(self, topic: str, correct: bool, question=None):
+        """Trace one answer; question identifies the quiz item so repeats are ignored"""
+        if question is not None:
+            if question in self._traced:
+                return
+            self._traced.add(question)
+        entry = self.state.get(topic)
+        if entry is None:
+            entry = self.state[topic] = [self.tracer.p_init, 0]
+        entry[0] = self.tracer.update(entry[0], correct)
+        entry[1] += 1
+        self.changed.add(topic)
+
+    def probabilities(self) -> Dict[str, float]:
+        return {topic: p for topic, (p, _) in self.state.items()}
+
+
+class MasteryStore:
+    """Mastery probabilities per learner, course and topic in SQLite (WAL mode)"""
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def load(self, learner_id: str, course: str) -> Dict[str, Tuple[float, int]]:
+        """Current (probability, attempts) per topic for one learner"""
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT topic, p_mastery, attempts FROM mastery WHERE learner_id = ? AND course = ?",
+                (learner_id, course)
+            ).fetchall()
+        finally:
+            connection.close()
+        return {topic: (p, attempts) for topic, p, attempts in rows}
+
+    def save(self, learner_id: str, mastery: LearnerMastery):
+        """Write the topics a learner's answers changed since they were loaded"""
+        self.save_many(mastery.course, ((learner_id, topic, *mastery.state[topic]) for topic in mastery.changed))
+        mastery.changed.clear()
+
+    def save_many(self, course: str, rows: Iterable[Tuple[str, str, float, int]]):
+        """Upsert (learner_id, topic, probability, attempts) rows for a course"""
+        now = time.time()
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO mastery (learner_id, course, topic, p_mastery, attempts, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (learner_id, course, topic) DO UPDATE SET "
+                    "p_mastery = excluded.p_mastery, attempts = excluded.attempts, updated_at = excluded.updated_at",
+                    ((str(learner), course, str(topic), float(p), int(n), now) for learner, topic, p, n in rows)
+                )
+        finally:
+            connection.close()
+
+
+def replay_course(event_log: str, course: str, uploads_dir: str = 'uploads', store_path: str = DEFAULT_STORE,
+                  tracer: KnowledgeTracer = None, chunk_size: int = 1000000) -> Dict:
+    """
+    Rebuild a course's mastery store from every answer in the app's response log
+
+    Estimates are keyed by the learner id each answer was logged with, the
+    key the app loads mastery by, so all of a learner's attempts replay as
+    one sequence.
+    """
+    started = time.perf_counter()
+    bank = DataProcessor(uploads_dir, prefetch=0).get_bank(course)
+    if bank is None or len(bank) == 0:
+        raise ValueError(f"No question bank for course {course!r}")
+    tracer = tracer or KnowledgeTracer()
+
+    learner_codes: Dict[str, int] = {}
+    learners, items, correct, stats = load_responses(
+        read_responses(event_log, course, chunk_size, which='first'), bank, learner_codes
+    )
+    topics = bank.index.topic_codes[items].astype(np.int64)
+    n_topics = len(bank.index.topics)
+    p, attempts = tracer.replay(learners.astype(np.int64) * n_topics + topics, correct,
+                                len(learner_codes) * n_topics)
+
+    sequences = np.flatnonzero(attempts)
+    learner_ids = np.array(list(learner_codes), dtype=object)
+    MasteryStore(store_path).save_many(course, zip(
+        learner_ids[sequences // n_topics], np.array(bank.index.topics, dtype=object)[sequences % n_topics],
+        p[sequences], attempts[sequences]
+    ))
+    stats.update(responses=len(items), learners=len(learner_codes), sequences=len(sequences),
+                 seconds=time.perf_counter() - started)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild topic mastery for a course from the response log")
+    parser.add_argument('--course', required=True, help="Course to replay")
+    parser.add_argument('--event-log', default=os.path.join('uploads', '.events', 'responses.sqlite'),
+                        help="The app's SQLite response log")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="Mastery store to write")
+    parser.add_argument('--uploads-dir', default='uploads', help="Directory the question banks live in")
+    parser.add_argument('--chunk-size', type=int, default=1000000, help="Responses per read")
+    args = parser.parse_args(argv)
+
+    stats = replay_course(args.event_log, args.course, args.uploads_dir, args.store, chunk_size=args.chunk_size)
+    print(f"Replayed {stats['responses']:,} answers from {stats['learners']:,} learners "
+          f"({stats['skipped']:,} rows skipped) into {stats['sequences']:,} topic estimates "
+          f"in {stats['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,82 +1,21 @@
 import pandas as pd
 from typing import Dict, List
 
+from resource_index import DEFAULT_RESOURCES, get_resource_index
+from skill_graph import get_skill_graph
+from topic_aliases import get_topic_aliases
+
 
 class LearningPathGenerator:
     """Generate personalized learning paths based on gap analysis"""
 
-    def __init__(self):
-        # Learning resources mapped to topics and levels
-        self.resource_library = self._build_resource_library()
-
-    def _build_resource_library(self) -> Dict:
-        """Build a library of learning resources"""
-        return {
-            'Data Science': {
-                'Stati': {
-                    1: ['Khan Academy: Basic Statistics', 'Coursera: Statistics Fundamentals'],
-                    2: ['DataCamp: Intermediate Statistics', 'YouTube: StatQuest'],
-                    3: ['Coursera: Inferential Statistics', 'edX: Probability and Statistics'],
-                    4: ['MIT OpenCourseWare: Advanced Statistics', 'Coursera: Bayesian Statistics'],
-                    5: ['Research Papers on Statistical Methods', 'Advanced Statistical Modeling']
-                },
-                'Python': {
-                    1: ['Codecademy: Python Basics', 'Python.org Tutorial'],
-                    2: ['Real Python: Intermediate Python', 'DataCamp: Python Programming'],
-                    3: ['Effective Python by Brett Slatkin', 'Advanced Python Features'],
-                    4: ['Fluent Python by Luciano Ramalho', 'Python Design Patterns'],
-                    5: ['Python Core Development', 'Contributing to Python Projects']
-                }
-            },
-            'AI/ML': {
-                'calculus': {
-                    1: ['Khan Academy: Calculus Basics', 'Paul\'s Online Math Notes'],
-                    2: ['MIT OCW: Single Variable Calculus', 'Coursera: Calculus One'],
-                    3: ['MIT OCW: Multivariable Calculus', 'Advanced Calculus Concepts'],
-                    4: ['Vector Calculus Applications', 'Optimization Theory'],
-                    5: ['Research-level Calculus', 'Mathematical Analysis']
-                },
-                'machine learning': {
-                    1: ['Google: Machine Learning Crash Course', 'Coursera: ML for Beginners'],
-                    2: ['Andrew Ng: Machine Learning Course', 'Fast.ai: Practical ML'],
-                    3: ['Deep Learning Specialization', 'Hands-on Machine Learning'],
-                    4: ['Advanced ML Algorithms', 'Research Papers'],
-                    5: ['Cutting-edge ML Research', 'Novel Algorithm Development']
-                }
-            },
-            'Cybersecurity': {
-                'os_linux -cybersecurtiy': {
-                    1: ['Linux Journey', 'Introduction to Linux'],
-                    2: ['Linux Command Line Basics', 'Linux System Administration'],
-                    3: ['Advanced Linux Security', 'Linux Hardening Guide'],
-                    4: ['Linux Kernel Security', 'Security Auditing'],
-                    5: ['Linux Security Research', 'Kernel Development']
-                },
-                'network security': {
-                    1: ['Network Security Basics', 'Introduction to Cybersecurity'],
-                    2: ['CompTIA Security+', 'Network Security Fundamentals'],
-                    3: ['Ethical Hacking Course', 'Penetration Testing'],
-                    4: ['Advanced Network Security', 'Security Architecture'],
-                    5: ['Security Research', 'Zero-day Analysis']
-                }
-            },
-            'Full Stack': {
-                'Web Fundamentals-HTML & CSS': {
-                    1: ['MDN: HTML Basics', 'W3Schools: CSS Tutorial'],
-                    2: ['Responsive Web Design', 'CSS Flexbox & Grid'],
-                    3: ['Advanced CSS Techniques', 'CSS Animations'],
-                    4: ['CSS Architecture', 'Performance Optimization'],
-                    5: ['Web Standards Development', 'Browser Engine Internals']
-                },
-                'JavaScript': {
-                    1: ['JavaScript.info', 'Codecademy: JavaScript'],
-                    2: ['You Don\'t Know JS', 'JavaScript: The Good Parts'],
-                    3: ['Async JavaScript', 'Modern JavaScript Features'],
-                    4: ['JavaScript Design Patterns', 'Performance Optimization'],
-                    5: ['V8 Engine Internals', 'TC39 Proposals']
-                }
-            }
-        }
+    resources_per_area = 3
+
+    def __init__(self, resources_path: str = DEFAULT_RESOURCES):
+        # Learning resources searchable by title, topic, level and tags
+        self.resource_index = get_resource_index(resources_path)
+        for course in self.resource_index.course_names:
+            get_topic_aliases(course).add_vocabulary('resource', self.resource_index.topics_for(course))
 
     def generate_learning_path(self, course: str, gap_analysis: Dict, priorities: List[Dict]) -> Dict:
         """
@@ -94,20 +33,35 @@ class LearningPathGenerator:
             'immediate_focus': [],
             'short_term': [],
             'long_term': [],
+            'next_skills': [],
             'estimated_hours': 0
         }
 
+        aliases = get_topic_aliases(course)
+        graph = get_skill_graph(course)
+        mastered = [skill for topic in gap_analysis['strong_topics']
+                    for skill in aliases.lookup('skill', topic['topic'])]
+
         # Process high priority items (immediate focus)
         high_priority = [p for p in priorities if p['priority'] == 'High']
+        if graph is not None:
+            # Foundations first: areas whose skills come earlier in the prerequisite graph
+            high_priority.sort(key=lambda p: min((graph.index[s] for s in aliases.lookup('skill', p['area'])
+                                                  if s in graph), default=len(graph)))
         for item in high_priority[:3]:  # Top 3 high priority items
             resources = self._get_resources(course, item['area'], gap_analysis['actual_level'])
-            learning_path['immediate_focus'].append({
+            focus = {
                 'area': item['area'],
                 'current_score': f"{item['score']:.1f}%",
                 'target_score': '70%+',
                 'resources': resources,
                 'estimated_hours': 5
-            })
+            }
+            if graph is not None:
+                # What the area's own skills build on, less what is already mastered or part of the area
+                skills = aliases.lookup('skill', item['area'])
+                focus['prerequisites'] = graph.unmet_prerequisites(skills, mastered + list(skills))
+            learning_path['immediate_focus'].append(focus)
             learning_path['estimated_hours'] += 5
 
         # Process medium priority items (short-term)
@@ -135,6 +89,10 @@ class LearningPathGenerator:
             })
             learning_path['estimated_hours'] += 2
 
+        # Skills whose prerequisites are all in hand
+        if graph is not None:
+            learning_path['next_skills'] = graph.frontier(mastered)
+
         return learning_path
 
     def _get_resources(self, course: str, area: str, level: int) -> List[str]:
@@ -142,22 +100,18 @@ class LearningPathGenerator:
         # Clean up area name
         area_clean = area.replace(' concepts', '').replace('Level ', '').strip()
 
-        # Try to find exact match
-        if course in self.resource_library:
-            course_resources = self.resource_library[course]
-
-            # Try exact topic match
-            if area_clean in course_resources:
-                level_resources = course_resources[area_clean].get(level, [])
-                if level_resources:
-                    return level_resources
-
-            # Try partial match
-            for topic_key in course_resources.keys():
-                if topic_key.lower() in area_clean.lower() or area_clean.lower() in topic_key.lower():
-                    level_resources = course_resources[topic_key].get(level, [])
-                    if level_resources:
-                        return level_resources
+        # Search the resource topics the alias index maps this area to, then
+        # anything in the course that matches every word of the area
+        topics = get_topic_aliases(course).lookup('resource', area_clean)
+        matches = []
+        if topics:
+            matches = self.resource_index.search(area_clean, course, level, topics=topics,
+                                                 limit=self.resources_per_area)
+        if not matches:
+            matches = self.resource_index.search(area_clean, course, level, limit=self.resources_per_area,
+                                                 match_all=True)
+        if matches:
+            return [resource['title'] for resource in matches]
 
         # Generic resources if no specific match
         return [
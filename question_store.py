@@ -0,0 +1,286 @@
+import copy
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bank_reader import CATEGORICAL_COLUMNS
+
+
+EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store repeated strings as categoricals and small integers as int8
+
+    Topic and course names repeat on every row of a bank; as categoricals
+    each name is held once and rows carry integer codes that the index and
+    scoring code work on directly.
+    """
+    conversions = {col: 'category' for col in CATEGORICAL_COLUMNS
+                   if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)}
+    conversions.update({col: 'int8' for col in ('level', 'correct_answer') if col in df.columns})
+    return df.astype(conversions)
+
+
+def group_positions(keys: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Split row positions into one array per distinct key with a single stable sort"""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)) if len(keys) else boundaries
+    return sorted_keys[starts], np.split(order, boundaries)
+
+
+def first_seen_order(topics: List[str], topic_codes: np.ndarray) -> List[str]:
+    """Topics present in a bank, in order of first appearance"""
+    present, first_seen = np.unique(topic_codes, return_index=True)
+    return [topics[code] for code in present[np.argsort(first_seen)] if code >= 0]
+
+
+def move_positions(groups: Dict, positions: np.ndarray, old_keys: List, new_keys: List) -> Dict:
+    """
+    Copy of a key -> sorted positions mapping with rows moved between groups
+
+    A key of None means the row was in no group (an added row). Groups no
+    row leaves or joins are shared with the original mapping.
+    """
+    leaving: Dict = {}
+    joining: Dict = {}
+    for position, old, new in zip(positions.tolist(), old_keys, new_keys):
+        if old != new:
+            if old is not None:
+                leaving.setdefault(old, []).append(position)
+            joining.setdefault(new, []).append(position)
+
+    groups = dict(groups)
+    for key in leaving.keys() | joining.keys():
+        group = groups.get(key, EMPTY_POSITIONS)
+        left = np.sort(np.asarray(leaving.get(key, ()), dtype=np.int64))
+        kept = np.delete(group, np.searchsorted(group, left))
+        joined = np.sort(np.asarray(joining.get(key, ()), dtype=np.int64))
+        merged = np.insert(kept, np.searchsorted(kept, joined), joined)
+        if len(merged):
+            groups[key] = merged
+        else:
+            groups.pop(key, None)
+    return groups
+
+
+class QuestionIndex:
+    """
+    Row positions of a bank grouped by level, topic and (level, topic)
+
+    Built once when a bank version is published so that filtering and
+    summary queries are dictionary lookups instead of column scans.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        levels = df['level'].to_numpy(dtype=np.int64) if len(df) else EMPTY_POSITIONS
+        topic = df['topic']
+        if not isinstance(topic.dtype, pd.CategoricalDtype):
+            topic = topic.astype('category')
+        topic_codes = topic.cat.codes.to_numpy()
+        self.topics: List[str] = [str(name) for name in topic.cat.categories]
+        self.topic_codes = topic_codes.astype(np.int32)
+        self.topic_order: List[str] = first_seen_order(self.topics, topic_codes)
+
+        level_keys, level_groups = group_positions(levels)
+        self.by_level: Dict[int, np.ndarray] = {int(k): g for k, g in zip(level_keys, level_groups)}
+
+        topic_keys, topic_groups = group_positions(topic_codes)
+        self.by_topic: Dict[str, np.ndarray] = {self.topics[k]: g for k, g in zip(topic_keys, topic_groups) if k >= 0}
+
+        pair_keys, pair_groups = group_positions(levels * max(len(self.topics), 1) + topic_codes)
+        self.by_level_topic: Dict[Tuple[int, str], np.ndarray] = {}
+        for key, group in zip(pair_keys, pair_groups):
+            level, code = divmod(int(key), max(len(self.topics), 1))
+            if code >= 0 and level > 0:
+                self.by_level_topic[(level, self.topics[code])] = group
+
+        self.level_distribution: Dict[int, int] = {level: len(g) for level, g in self.by_level.items()}
+
+    def patched(self, df: pd.DataFrame, positions: np.ndarray, old_levels: List, old_topics: List) -> 'QuestionIndex':
+        """
+        Index of a bank version that differs from this one only at the given rows
+
+        Every other row must keep its position. old_levels and old_topics
+        hold the previous keys of those rows (None for added rows); only the
+        groups they leave or join are rebuilt.
+        """
+        index = copy.copy(self)
+        index.size = len(df)
+        topic = df['topic']
+        index.topics = [str(name) for name in topic.cat.categories]
+        index.topic_codes = topic.cat.codes.to_numpy().astype(np.int32)
+        index.topic_order = first_seen_order(index.topics, index.topic_codes)
+
+        new_levels = df['level'].to_numpy(dtype=np.int64)[positions].tolist()
+        new_topics = [index.topics[code] for code in index.topic_codes[positions]]
+        index.by_level = move_positions(self.by_level, positions, old_levels, new_levels)
+        index.by_topic = move_positions(self.by_topic, positions, old_topics, new_topics)
+        index.by_level_topic = move_positions(
+            self.by_level_topic, positions,
+            [None if level is None else (level, topic) for level, topic in zip(old_levels, old_topics)],
+            list(zip(new_levels, new_topics))
+        )
+        index.level_distribution = {level: len(g) for level, g in index.by_level.items()}
+        return index
+
+    def positions(self, level: Optional[int] = None, topic: Optional[str] = None) -> np.ndarray:
+        """Row positions matching an optional level and topic"""
+        if level is not None and topic is not None:
+            return self.by_level_topic.get((level, topic), EMPTY_POSITIONS)
+        if level is not None:
+            return self.by_level.get(level, EMPTY_POSITIONS)
+        if topic is not None:
+            return self.by_topic.get(topic, EMPTY_POSITIONS)
+        return np.arange(self.size, dtype=np.int64)
+
+
+class QuestionBank:
+    """
+    One immutable version of a course question bank
+
+    Banks are never modified after publication. A reload publishes a new
+    version instead, so any session holding a reference keeps a consistent
+    view of the questions it was given.
+    """
+
+    __slots__ = ('course', 'version', 'df', 'index', 'answer_key', 'levels', 'source', 'published_at', '__weakref__')
+
+    def __init__(self, course: str, df: pd.DataFrame, version: int, source: Optional[str] = None,
+                 index: Optional[QuestionIndex] = None):
+        self.course = course
+        self.version = version
+        self.df = compact_frame(df)
+        self.index = index if index is not None else QuestionIndex(self.df)
+        # Flat arrays for scoring without touching the DataFrame
+        self.answer_key = self.df['correct_answer'].to_numpy(dtype=np.int8)
+        self.levels = self.df['level'].to_numpy(dtype=np.int8)
+        self.source = source
+        self.published_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def apply_changes(self, df: pd.DataFrame, changes: Dict) -> Tuple[pd.DataFrame, QuestionIndex]:
+        """
+        Next version's frame and index from this version and a diff_banks() result
+
+        Unchanged rows are reused with their categorical codes, changed rows
+        are overwritten from df, removed rows are dropped and added rows are
+        appended, so surviving rows keep their relative order. Without
+        removals every row keeps its position and the index is patched;
+        otherwise it is rebuilt.
+        """
+        removed, added = changes['removed'], changes['added']
+        keep = np.setdiff1d(np.arange(len(self.df)), removed, assume_unique=True)
+        targets = np.searchsorted(keep, changes['changed'])
+        sources = np.concatenate((changes['changed_to'], added))
+        rows = np.concatenate((targets, len(keep) + np.arange(len(added))))
+
+        columns = {}
+        for col in self.df.columns:
+            old = self.df[col]
+            new = df[col].iloc[sources]
+            if isinstance(old.dtype, pd.CategoricalDtype):
+                # Existing codes stay valid: new strings are appended to the categories
+                categories = old.cat.categories
+                categories = categories.append(pd.Index(new.unique()).difference(categories, sort=False))
+                codes = np.zeros(len(keep) + len(added), dtype=np.int32)
+                codes[:len(keep)] = old.cat.codes.to_numpy()[keep]
+                codes[rows] = categories.get_indexer(new)
+                # Drop the names only removed or overwritten rows used
+                used = np.bincount(codes, minlength=len(categories)) > 0
+                if not used.all():
+                    codes = (np.cumsum(used) - 1)[codes]
+                    categories = categories[used]
+                columns[col] = pd.Categorical.from_codes(codes, categories)
+            else:
+                values = pd.concat([old.iloc[keep], new.iloc[len(targets):]], ignore_index=True)
+                values.iloc[targets] = new.iloc[:len(targets)].to_numpy()
+                columns[col] = values
+        merged = compact_frame(pd.DataFrame(columns, columns=list(self.df.columns)))
+
+        if len(removed):
+            return merged, QuestionIndex(merged)
+        changed = changes['changed']
+        positions = np.concatenate((changed, rows[len(targets):])).astype(np.int64)
+        old_topics = self.df['topic'].to_numpy()[changed]
+        return merged, self.index.patched(
+            merged, positions,
+            self.levels[changed].astype(np.int64).tolist() + [None] * len(added),
+            [str(topic) for topic in old_topics] + [None] * len(added)
+        )
+
+    def question(self, question_id: int) -> Dict:
+        """Resolve a question id (row position in this version) to its display fields"""
+        row = self.df.iloc[int(question_id)]
+        return {
+            'id': str(row['id']),
+            'topic': str(row['topic']),
+            'level': int(row['level']),
+            'question': row['question'],
+            'options': [row['option_a'], row['option_b'], row['option_c'], row['option_d']]
+        }
+
+    def __repr__(self) -> str:
+        return f"QuestionBank({self.course!r}, version={self.version}, questions={len(self.df)})"
+
+
+class QuestionStore:
+    """Process-wide registry of the current bank version for each course"""
+
+    def __init__(self):
+        self._banks: Dict[str, QuestionBank] = {}
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+
+    def get(self, course: str) -> Optional[QuestionBank]:
+        """Current bank version for a course, or None if it has not been loaded"""
+        return self._banks.get(course)
+
+    def publish(self, course: str, df: pd.DataFrame, source: Optional[str] = None,
+                index: Optional[QuestionIndex] = None) -> QuestionBank:
+        """Make a new bank version current; readers of older versions are unaffected"""
+        with self._lock:
+            bank = QuestionBank(course, df, next(self._versions), source, index)
+            # Swap in a new mapping so lock-free readers never see a partial update
+            banks = dict(self._banks)
+            banks[course] = bank
+            self._banks = banks
+        return bank
+
+    def remove(self, course: str):
+        """Drop a course from the store"""
+        with self._lock:
+            banks = dict(self._banks)
+            banks.pop(course, None)
+            self._banks = banks
+
+    def courses(self) -> List[str]:
+        return list(self._banks)
+
+    def snapshot(self) -> Dict[str, QuestionBank]:
+        """Consistent view of every current bank"""
+        return self._banks
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_question_store() -> QuestionStore:
+    """The question store shared by every session in this process"""
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = QuestionStore()
+    return _shared_store
@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from question_store import QuestionBank
+
+
+class QuizForm:
+    """One ready-made quiz: question ids into a bank version and the level each was drawn for"""
+
+    __slots__ = ('bank', 'question_ids', 'levels', 'seed')
+
+    def __init__(self, bank: QuestionBank, question_ids: np.ndarray, levels: np.ndarray, seed: int):
+        self.bank = bank
+        self.question_ids = question_ids
+        self.levels = levels
+        self.seed = seed
+
+
+class QuizFormPool:
+    """
+    Rotating pools of pre-generated quiz forms per (course, starting level)
+
+    Handing out a form is a deque pop. When a pool runs low it is topped up
+    on a background thread, so form building stays out of the request path.
+    Every form is drawn with its own seed, which spreads item exposure across
+    the bank. Forms are tied to a bank version; a reloaded bank gets fresh
+    pools and the old ones are dropped.
+    """
+
+    def __init__(self, build_form: Callable[[QuestionBank, int, np.random.Generator], Tuple[np.ndarray, np.ndarray]],
+                 pool_size: int = 8, levels=range(1, 6), workers: int = 1):
+        self.build_form = build_form
+        self.pool_size = pool_size
+        self.refill_at = pool_size // 2
+        self.levels = list(levels)
+        self._pools: Dict[Tuple, deque] = {}
+        self._lock = threading.Lock()
+        self._refilling = set()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quiz-forms')
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self, bank: Optional[QuestionBank]) -> List[Future]:
+        """Fill the pools of every starting level for a bank in the background"""
+        if bank is None or len(bank) == 0:
+            return []
+        return [future for future in (self._schedule_refill(bank, level) for level in self.levels) if future]
+
+    def take(self, bank: QuestionBank, level: int) -> QuizForm:
+        """Next form for a bank version and starting level, built on the spot only if the pool is empty"""
+        pool = self._pools.get(self._key(bank, level))
+        try:
+            form = pool.popleft() if pool is not None else None
+        except IndexError:
+            form = None
+
+        if form is None:
+            self.misses += 1
+            form = self._build(bank, level)
+        else:
+            self.hits += 1
+
+        if pool is None or len(pool) <= self.refill_at:
+            self._schedule_refill(bank, level)
+        return form
+
+    def available(self, bank: QuestionBank, level: int) -> int:
+        """Number of ready forms for a bank version and starting level"""
+        return len(self._pools.get(self._key(bank, level), ()))
+
+    def _key(self, bank: QuestionBank, level: int) -> Tuple:
+        return bank.course, bank.version, level
+
+    def _schedule_refill(self, bank: QuestionBank, level: int) -> Optional[Future]:
+        key = self._key(bank, level)
+        with self._lock:
+            if key in self._refilling:
+                return None
+            self._refilling.add(key)
+        return self._executor.submit(self._refill, bank, level)
+
+    def _refill(self, bank: QuestionBank, level: int):
+        key = self._key(bank, level)
+        try:
+            with self._lock:
+                # Forms of older versions of this course are never handed out again
+                for stale in [k for k in self._pools if k[0] == bank.course and k[1] < bank.version]:
+                    del self._pools[stale]
+                pool = self._pools.setdefault(key, deque())
+            while len(pool) < self.pool_size:
+                pool.append(self._build(bank, level))
+        except Exception as e:
+            print(f"Error building quiz forms for {bank.course} level {level}: {e}")
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def _build(self, bank: QuestionBank, level: int) -> QuizForm:
+        seed = int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
+        question_ids, levels = self.build_form(bank, level, np.random.default_rng(seed))
+        return QuizForm(bank, question_ids, levels, seed)
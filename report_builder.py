@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Dict, List
+
+
+RECOMMENDATIONS = [
+    "Review and practice core concepts",
+    "Take advanced courses on weak areas",
+    "Practice with real-world projects",
+    "Participate in coding exercises",
+    "Engage in peer learning activities"
+]
+
+
+def performance_breakdown(topic_performance: Dict) -> List[Dict]:
+    """Section-wise performance rows for the gap analysis report"""
+    performance_data = []
+    for topic, perf in topic_performance.items():
+        if perf['total'] > 0:
+            percentage = (perf['correct'] / perf['total'] * 100)
+            if percentage >= 80:
+                strength = "Excellent"
+                remarks = "Strong understanding of this topic"
+            elif percentage >= 70:
+                strength = "Good"
+                remarks = "Good performance, minor improvements needed"
+            elif percentage >= 60:
+                strength = "Satisfactory"
+                remarks = "Basic understanding, needs practice"
+            else:
+                strength = "Needs Improvement"
+                remarks = "Significant improvement required"
+
+            performance_data.append({
+                'Section': topic,
+                'Correct': perf['correct'],
+                'Incorrect': perf['total'] - perf['correct'],
+                'Unattempted': 0,
+                'Strength Level': strength,
+                'Remarks': remarks
+            })
+    return performance_data
+
+
+def build_report(course: str, results: Dict, gap: Dict, candidate_name: str = 'Student',
+                 test_date: str = None, learning_path: Dict = None, study_schedule: List[Dict] = None) -> Dict:
+    """
+    Downloadable gap analysis report for one candidate
+
+    The learning path and study schedule are included when given.
+    """
+    report_data = {
+        'candidate_name': candidate_name,
+        'course': course,
+        'test_date': test_date or datetime.now().strftime('%Y-%m-%d'),
+        'score': f"{results['correct_count']}/{results['total_count']}",
+        'percentage': gap['overall_score'],
+        'status': gap['readiness'],
+        'performance_breakdown': performance_breakdown(results['topic_performance']),
+        'strengths': [f"Excellent knowledge of {topic['topic']}" for topic in gap['strong_topics']],
+        'improvement_areas': [f"Improve understanding of {topic['topic']}" for topic in gap['weak_topics']],
+        'recommendations': list(RECOMMENDATIONS)
+    }
+    if learning_path is not None:
+        report_data['learning_path'] = learning_path
+    if study_schedule is not None:
+        report_data['study_schedule'] = study_schedule
+    return report_data
@@ -0,0 +1,146 @@
+import bisect
+import json
+import math
+import os
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+from topic_aliases import MIN_PREFIX, tokenize
+
+DEFAULT_RESOURCES = os.path.join('uploads', 'resources.json')
+
+
+class ResourceIndex:
+    """
+    In-memory inverted index over learning resources with BM25 ranking
+
+    Each resource (title, course, topic, level, tags) is tokenized the way
+    bank topics are, with its topic counted topic_weight times. Postings
+    carry their precomputed BM25 term weight, so a query costs one vector
+    update per matching term. A query token also matches indexed terms it
+    is a prefix of, or that are a prefix of it ('stati' <-> 'statistics').
+    """
+
+    k1 = 1.2
+    b = 0.75
+    topic_weight = 2
+
+    def __init__(self, resources: List[Dict]):
+        self.resources = resources
+        n = len(resources)
+        self.levels = np.array([int(r.get('level') or 0) for r in resources], dtype=np.int64)
+        self.course_names: List[str] = sorted({str(r.get('course', '')) for r in resources})
+        self._course_code = {name: code for code, name in enumerate(self.course_names)}
+        self.course_codes = np.array([self._course_code[str(r.get('course', ''))] for r in resources], dtype=np.int64)
+        self.topic_names: List[str] = sorted({str(r.get('topic', '')) for r in resources})
+        self._topic_code = {name: code for code, name in enumerate(self.topic_names)}
+        self.topic_codes = np.array([self._topic_code[str(r.get('topic', ''))] for r in resources], dtype=np.int64)
+
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(n)
+        for i, resource in enumerate(resources):
+            ignore = tokenize(resource.get('course', ''))
+            fields = [(resource.get('title', ''), 1), (resource.get('topic', ''), self.topic_weight)]
+            fields += [(tag, 1) for tag in resource.get('tags', ())]
+            for text, weight in fields:
+                for token in tokenize(text, ignore):
+                    docs = postings.setdefault(token, {})
+                    docs[i] = docs.get(i, 0) + weight
+                    lengths[i] += weight
+
+        average = lengths.mean() if n else 1.0
+        self.terms = sorted(postings)
+        self._docs: Dict[str, np.ndarray] = {}
+        self._weights: Dict[str, np.ndarray] = {}
+        for term, docs in postings.items():
+            ids = np.fromiter(docs, dtype=np.int64, count=len(docs))
+            tf = np.fromiter(docs.values(), dtype=np.float64, count=len(docs))
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average)
+            self._docs[term] = ids
+            self._weights[term] = idf * tf * (self.k1 + 1) / (tf + norm)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ResourceIndex':
+        """Index a {"resources": [...]} JSON file; a missing file gives an empty index"""
+        if not os.path.exists(path):
+            print(f"No resource library at {path}; learning paths will use generic suggestions")
+            return cls([])
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f).get('resources', []))
+
+    def __len__(self) -> int:
+        return len(self.resources)
+
+    def topics_for(self, course: str) -> List[str]:
+        """Resource topics of a course, in first-seen order"""
+        return list(dict.fromkeys(str(r.get('topic', '')) for r in self.resources if r.get('course') == course))
+
+    def _matching_terms(self, token: str) -> List[str]:
+        terms = [token] if token in self._docs else []
+        if len(token) >= MIN_PREFIX:
+            # Indexed terms the token is a prefix of, then prefixes of the token
+            i = bisect.bisect_left(self.terms, token)
+            while i < len(self.terms) and self.terms[i].startswith(token):
+                if self.terms[i] != token:
+                    terms.append(self.terms[i])
+                i += 1
+            terms.extend(token[:k] for k in range(MIN_PREFIX, len(token)) if token[:k] in self._docs)
+        return terms
+
+    def search(self, query: str, course: Optional[str] = None, level: Optional[int] = None,
+               topics: Optional[Iterable[str]] = None, limit: int = 5, match_all: bool = False) -> List[Dict]:
+        """
+        Best-ranked resources for a query
+
+        Results are limited to the course and topics given, and to the
+        resource level closest to level among the matches. With match_all,
+        a resource must match every query token rather than any of them.
+        """
+        if course is not None and course not in self._course_code:
+            return []
+        ignore: FrozenSet[str] = tokenize(course) if course else frozenset()
+        tokens = tokenize(query, ignore)
+        if not tokens:
+            # e.g. 'Level 3': nothing to rank by, and match_all would otherwise match everything
+            return []
+        scores = np.zeros(len(self.resources))
+        matched = np.zeros(len(self.resources), dtype=np.int64)
+        for token in tokens:
+            # Each query token scores a document once, through its best-matching term
+            token_scores = np.zeros(len(self.resources))
+            for term in self._matching_terms(token):
+                docs = self._docs[term]
+                token_scores[docs] = np.maximum(token_scores[docs], self._weights[term])
+            scores += token_scores
+            matched += token_scores > 0
+
+        matches = np.flatnonzero(matched == len(tokens) if match_all else matched > 0)
+        if course is not None:
+            matches = matches[self.course_codes[matches] == self._course_code[course]]
+        if topics is not None:
+            wanted = [self._topic_code[t] for t in topics if t in self._topic_code]
+            matches = matches[np.isin(self.topic_codes[matches], wanted)]
+        if level is not None and len(matches):
+            distance = np.abs(self.levels[matches] - level)
+            matches = matches[distance == distance.min()]
+
+        order = np.argsort(-scores[matches], kind='stable')[:limit]
+        return [self.resources[i] for i in matches[order]]
+
+
+_indexes: Dict[str, ResourceIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_resource_index(path: str = DEFAULT_RESOURCES) -> ResourceIndex:
+    """Resource index for a library file, built on first use and shared in the process"""
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = ResourceIndex.from_file(path)
+    return index
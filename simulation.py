@@ -0,0 +1,245 @@
+"""
+Monte Carlo simulation of quiz policies
+
+Generates synthetic examinees with known ability, runs them through a quiz
+policy vectorized across examinees and reports how well the resulting
+level placement matches the truth, how long the quizzes were and how often
+each item was shown. Responses follow the same IRT item parameters the
+adaptive engine uses (calibrated where available).
+
+Usage:
+    python simulation.py --course "Data Science" --examinees 100000
+    python simulation.py --course "Data Science" --policy adaptive --stop-se 0.4 --max-questions 30
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict
+
+import numpy as np
+
+from assessment_engine import AssessmentEngine
+from data_processor import DataProcessor
+from gap_analyzer import GapAnalyzer
+from irt import THETA_GRID, get_item_pool, level_to_theta, nearest_grid_index, probability, theta_to_level
+from question_store import QuestionBank
+from stratified_sampler import get_stratified_sampler
+
+POLICIES = ('fixed', 'adaptive')
+
+
+class PolicySimulator:
+    """
+    Runs synthetic examinees through the fixed-form and adaptive policies
+
+    Quiz settings (length bounds, stopping thresholds, randomesque) are read
+    from an AssessmentEngine so a sweep only has to change the engine.
+    """
+
+    def __init__(self, engine: AssessmentEngine, bank: QuestionBank, gap_analyzer: GapAnalyzer = None,
+                 self_assessment_noise: float = 1.0):
+        self.engine = engine
+        self.bank = bank
+        self.gap_analyzer = gap_analyzer or GapAnalyzer()
+        self.pool = get_item_pool(bank)
+        self.self_assessment_noise = self_assessment_noise
+
+    def examinees(self, n: int, rng: np.random.Generator, ability_sd: float = 1.0):
+        """True abilities and noisy self-assessed levels"""
+        theta = rng.normal(0.0, ability_sd, n)
+        self_levels = theta_to_level(theta + rng.normal(0.0, self.self_assessment_noise, n))
+        return theta, self_levels
+
+    def run_fixed(self, theta: np.ndarray, rng: np.random.Generator, forms: int = 500) -> Dict:
+        """
+        Fixed-form policy: every examinee sits one stratified form
+
+        Forms are drawn once and shared, as the form pool would hand them out.
+        """
+        sampler = get_stratified_sampler(self.bank)
+        length = self.engine.max_questions
+        form_items = np.full((forms, length), -1, dtype=np.int64)
+        for f in range(forms):
+            question_ids, _ = sampler.draw(length, rng)
+            form_items[f, :len(question_ids)] = question_ids
+
+        items = form_items[rng.integers(forms, size=len(theta))]
+        correct = self._respond(theta, items, rng)
+        return {'items': items, 'correct': correct, 'lengths': (items >= 0).sum(axis=1)}
+
+    def run_adaptive(self, theta: np.ndarray, self_levels: np.ndarray, rng: np.random.Generator) -> Dict:
+        """Adaptive policy: maximum-information selection with the engine's stopping rule"""
+        engine = self.engine
+        n = len(theta)
+        max_length = min(engine.max_questions, len(self.pool))
+        grid = THETA_GRID
+        grid_levels = np.eye(6)[theta_to_level(grid)]
+
+        # Log-likelihood of each (item, outcome) over the grid: row item * 2 + correct
+        p = probability(grid[None, :], self.pool.a[:, None], self.pool.b[:, None], self.pool.c[:, None])
+        log_likelihood = np.log(np.maximum(np.stack([1.0 - p, p], axis=1), 1e-12)).reshape(-1, len(grid))
+
+        items = np.full((n, max_length), -1, dtype=np.int64)
+        correct = np.zeros((n, max_length), dtype=bool)
+        log_posterior = -0.5 * (grid[None, :] - level_to_theta(self_levels)[:, None]) ** 2
+        theta_hat = level_to_theta(self_levels).astype(float)
+        active = np.ones(n, dtype=bool)
+        lengths = np.zeros(n, dtype=np.int64)
+
+        for step in range(max_length):
+            rows = np.flatnonzero(active)
+            if len(rows) == 0:
+                break
+            chosen = self._next_items(theta_hat[rows], items[rows, :step], rng)
+            outcome = self._respond(theta[rows], chosen[:, None], rng)[:, 0]
+            items[rows, step] = chosen
+            correct[rows, step] = outcome
+            lengths[rows] = step + 1
+
+            log_rows = log_posterior[rows] + log_likelihood[chosen * 2 + outcome]
+            log_posterior[rows] = log_rows
+            posterior = np.exp(log_rows - log_rows.max(axis=1, keepdims=True))
+            posterior /= posterior.sum(axis=1, keepdims=True)
+            estimate = posterior @ grid
+            theta_hat[rows] = estimate
+            se = np.sqrt(np.maximum(posterior @ grid ** 2 - estimate ** 2, 0.0))
+            confidence = (posterior @ grid_levels).max(axis=1)
+
+            answered = step + 1
+            stop = np.full(len(rows), answered >= max_length)
+            if answered >= engine.min_questions:
+                stop |= (se <= engine.stop_standard_error) | (confidence >= engine.stop_level_confidence)
+            active[rows[stop]] = False
+
+        return {'items': items, 'correct': correct, 'lengths': lengths, 'theta_hat': theta_hat}
+
+    def _next_items(self, theta_hat: np.ndarray, administered: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """ItemPool.next_item for many examinees: a random pick among the top unused candidates"""
+        randomesque = max(self.engine.randomesque, 1)
+        width = min(administered.shape[1] + randomesque, len(self.pool))
+        grid_index = nearest_grid_index(self.pool.grid, theta_hat)
+        candidates = self.pool.ranking[grid_index, :width].astype(np.int64)
+        unused = ~(candidates[:, :, None] == administered[:, None, :]).any(axis=2)
+
+        rank = np.cumsum(unused, axis=1)
+        available = np.minimum(rank[:, -1], randomesque)
+        pick = rng.integers(0, np.maximum(available, 1))
+        column = np.argmax(unused & (rank == pick[:, None] + 1), axis=1)
+        return candidates[np.arange(len(candidates)), column]
+
+    def _respond(self, theta: np.ndarray, items: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Simulated correctness; padding slots (-1) are never correct"""
+        safe = np.maximum(items, 0)
+        p = probability(theta[:, None], self.pool.a[safe], self.pool.b[safe], self.pool.c[safe])
+        return (rng.random(items.shape) < p) & (items >= 0)
+
+    def summarize(self, theta: np.ndarray, run: Dict) -> Dict:
+        """Placement accuracy, test length and item exposure for one policy run"""
+        items = run['items']
+        padded = items < 0
+        safe = np.maximum(items, 0)
+        key = self.bank.answer_key[safe].astype(np.int64)
+        # Padding after an early stop counts under level 0, which no placement rule reads
+        levels = np.where(padded, 0, self.bank.levels[safe])
+        answers = np.where(run['correct'], key, -1)
+        scores = self.engine.score_batch(answers, key, levels, self.bank.index.topic_codes[safe],
+                                         self.bank.index.topics)
+
+        true_level = theta_to_level(theta)
+        placed = self.gap_analyzer.actual_levels(scores.level_correct, scores.level_total)
+        exposure = np.bincount(items[~padded], minlength=len(self.bank)) / len(theta)
+
+        summary = {
+            'examinees': len(theta),
+            'mean_length': float(run['lengths'].mean()),
+            'length_p10': float(np.percentile(run['lengths'], 10)),
+            'length_p90': float(np.percentile(run['lengths'], 90)),
+            'placement_accuracy': float((placed == true_level).mean()),
+            'placement_within_one': float((np.abs(placed - true_level) <= 1).mean()),
+            'max_exposure': float(exposure.max(initial=0)),
+            'items_over_20pct': int((exposure > 0.2).sum()),
+            'unused_items': int((exposure == 0).sum()),
+            'bank_size': len(self.bank)
+        }
+        if 'theta_hat' in run:
+            estimated = theta_to_level(run['theta_hat'])
+            summary['ability_rmse'] = float(np.sqrt(np.mean((run['theta_hat'] - theta) ** 2)))
+            summary['estimate_accuracy'] = float((estimated == true_level).mean())
+        return summary
+
+
+def simulate(bank: QuestionBank, engine: AssessmentEngine, examinees: int = 100000, policies=POLICIES,
+             seed: int = None, ability_sd: float = 1.0, forms: int = 500) -> Dict[str, Dict]:
+    """Run every policy on the same synthetic cohort and return one summary per policy"""
+    rng = np.random.default_rng(seed)
+    simulator = PolicySimulator(engine, bank)
+    theta, self_levels = simulator.examinees(examinees, rng, ability_sd)
+
+    summaries = {}
+    for policy in policies:
+        started = time.perf_counter()
+        if policy == 'adaptive':
+            run = simulator.run_adaptive(theta, self_levels, rng)
+        else:
+            run = simulator.run_fixed(theta, rng, forms)
+        summary = simulator.summarize(theta, run)
+        summary['seconds'] = time.perf_counter() - started
+        summaries[policy] = summary
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate quiz policies on synthetic examinees")
+    parser.add_argument('--course', required=True, help="Course whose bank to simulate")
+    parser.add_argument('--uploads-dir', default='uploads', help="Directory the question banks live in")
+    parser.add_argument('--examinees', type=int, default=100000, help="Synthetic examinees per policy")
+    parser.add_argument('--policy', choices=POLICIES + ('both',), default='both', help="Policy to simulate")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for a reproducible run")
+    parser.add_argument('--ability-sd', type=float, default=1.0, help="Spread of true abilities")
+    parser.add_argument('--forms', type=int, default=500, help="Distinct fixed forms to rotate")
+    parser.add_argument('--min-questions', type=int, help="Override AssessmentEngine.min_questions")
+    parser.add_argument('--max-questions', type=int, help="Override AssessmentEngine.max_questions")
+    parser.add_argument('--stop-se', type=float, help="Override the adaptive standard error target")
+    parser.add_argument('--stop-confidence', type=float, help="Override the adaptive level confidence target")
+    parser.add_argument('--json', help="Also write the summaries to this file")
+    args = parser.parse_args(argv)
+
+    data_processor = DataProcessor(args.uploads_dir, prefetch=0)
+    bank = data_processor.get_bank(args.course)
+    if bank is None or len(bank) == 0:
+        parser.error(f"no question bank for course {args.course!r}")
+
+    engine = AssessmentEngine(data_processor)
+    if args.min_questions is not None:
+        engine.min_questions = args.min_questions
+    if args.max_questions is not None:
+        engine.max_questions = args.max_questions
+    if args.stop_se is not None:
+        engine.stop_standard_error = args.stop_se
+    if args.stop_confidence is not None:
+        engine.stop_level_confidence = args.stop_confidence
+
+    policies = POLICIES if args.policy == 'both' else (args.policy,)
+    summaries = simulate(bank, engine, args.examinees, policies, args.seed, args.ability_sd, args.forms)
+
+    for policy, summary in summaries.items():
+        print(f"{policy}: {summary['examinees']:,} examinees in {summary['seconds']:.1f}s")
+        print(f"  placement accuracy {summary['placement_accuracy']:.1%} "
+              f"(within one level {summary['placement_within_one']:.1%})")
+        if 'estimate_accuracy' in summary:
+            print(f"  IRT level estimate accuracy {summary['estimate_accuracy']:.1%}, "
+                  f"ability RMSE {summary['ability_rmse']:.2f}")
+        print(f"  test length mean {summary['mean_length']:.1f} "
+              f"(p10 {summary['length_p10']:.0f}, p90 {summary['length_p90']:.0f})")
+        print(f"  exposure max {summary['max_exposure']:.1%}, {summary['items_over_20pct']} items above 20%, "
+              f"{summary['unused_items']} of {summary['bank_size']} unused")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
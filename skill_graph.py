@@ -0,0 +1,235 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from topic_aliases import get_topic_aliases
+
+# Skill tree of each course: tier -> skill -> the skills it directly depends on.
+# SkillTreeBuilder draws the tiers and SkillGraph is built from the edges.
+COURSE_SKILLS = {
+    'Data Science': {
+        'Foundation': {
+            'Basic Statistics': [],
+            'Python Basics': [],
+            'Data Types': ['Python Basics']
+        },
+        'Intermediate': {
+            'Probability': ['Basic Statistics'],
+            'Data Manipulation': ['Python Basics', 'Data Types'],
+            'Visualization': ['Data Manipulation']
+        },
+        'Advanced': {
+            'Hypothesis Testing': ['Probability'],
+            'Machine Learning': ['Probability', 'Data Manipulation'],
+            'Big Data': ['Data Manipulation']
+        },
+        'Expert': {
+            'Statistical Modeling': ['Hypothesis Testing'],
+            'Deep Learning': ['Machine Learning'],
+            'Data Engineering': ['Big Data']
+        }
+    },
+    'AI/ML': {
+        'Foundation': {
+            'Mathematics': [],
+            'Python Basics': [],
+            'Calculus': ['Mathematics'],
+            'Linear Algebra': ['Mathematics']
+        },
+        'Intermediate': {
+            'Supervised Learning': ['Python Basics', 'Calculus', 'Linear Algebra'],
+            'Unsupervised Learning': ['Python Basics', 'Linear Algebra'],
+            'Neural Networks': ['Supervised Learning', 'Calculus']
+        },
+        'Advanced': {
+            'Deep Learning': ['Neural Networks'],
+            'NLP': ['Deep Learning'],
+            'Computer Vision': ['Deep Learning']
+        },
+        'Expert': {
+            'Reinforcement Learning': ['Neural Networks'],
+            'GANs': ['Deep Learning'],
+            'Transformers': ['NLP']
+        }
+    },
+    'Cybersecurity': {
+        'Foundation': {
+            'OS Basics': [],
+            'Linux': ['OS Basics'],
+            'Networking': [],
+            'Programming Basics': []
+        },
+        'Intermediate': {
+            'Network Security': ['Networking'],
+            'Cryptography': [],
+            'Web Security': ['Networking']
+        },
+        'Advanced': {
+            'Penetration Testing': ['Programming Basics', 'Linux', 'Network Security', 'Web Security'],
+            'Malware Analysis': ['Programming Basics', 'OS Basics', 'Linux'],
+            'Incident Response': ['Network Security']
+        },
+        'Expert': {
+            'Security Architecture': ['Network Security', 'Cryptography'],
+            'Threat Hunting': ['Incident Response', 'Malware Analysis'],
+            'Zero-day Research': ['Penetration Testing', 'Malware Analysis']
+        }
+    },
+    'Full Stack': {
+        'Foundation': {
+            'HTML': [],
+            'CSS': ['HTML'],
+            'JavaScript': ['HTML']
+        },
+        'Intermediate': {
+            'React/Vue': ['JavaScript', 'CSS'],
+            'Node.js': ['JavaScript'],
+            'Databases': []
+        },
+        'Advanced': {
+            'API Design': ['Node.js', 'Databases'],
+            'Authentication': ['API Design'],
+            'Cloud Deployment': ['Node.js']
+        },
+        'Expert': {
+            'Microservices': ['API Design', 'Cloud Deployment'],
+            'DevOps': ['Cloud Deployment'],
+            'System Design': ['Microservices', 'Databases']
+        }
+    }
+}
+
+# Other names bank topics use for a skill, matched like the skill name itself
+SKILL_ALIASES = {
+    'Data Science': {'Data Manipulation': ['DBMS', 'SQL']},
+    'AI/ML': {'Supervised Learning': ['Machine Learning']},
+    'Cybersecurity': {
+        'OS Basics': ['Computer Fundamentals'],
+        'Network Security': ['Information Security']
+    },
+    'Full Stack': {'Databases': ['DBMS', 'SQL']}
+}
+
+# Direct prerequisites of each skill, per course
+COURSE_PREREQUISITES = {
+    course: {skill: needs for skills in tiers.values() for skill, needs in skills.items()}
+    for course, tiers in COURSE_SKILLS.items()
+}
+
+
+class SkillGraph:
+    """
+    Prerequisite DAG of a curriculum with a precomputed transitive closure
+
+    Skill sets are bitsets packed into uint64 words, and row i of closure
+    holds every skill that skill i depends on, directly or indirectly. Set
+    queries are then a few bitwise operations over the closure matrix,
+    whatever the depth of the graph. Skills are numbered in topological
+    order, so results list prerequisites before the skills that need them.
+    """
+
+    def __init__(self, prerequisites: Dict[str, Iterable[str]]):
+        prerequisites = {skill: list(needs) for skill, needs in prerequisites.items()}
+        for needs in list(prerequisites.values()):
+            for need in needs:
+                prerequisites.setdefault(need, [])
+
+        self.skills = self._topological_order(prerequisites)
+        self.index = {skill: i for i, skill in enumerate(self.skills)}
+        n = len(self.skills)
+        self.words = max((n + 63) // 64, 1)
+
+        self.direct = np.zeros((n, self.words), dtype='<u8')
+        self.closure = np.zeros((n, self.words), dtype='<u8')
+        for i, skill in enumerate(self.skills):
+            for need in prerequisites[skill]:
+                j = self.index[need]
+                self.direct[i, j >> 6] |= np.uint64(1 << (j & 63))
+                # needs come earlier in topological order, so their closure is complete
+                self.closure[i] |= self.closure[j]
+            self.closure[i] |= self.direct[i]
+
+    @staticmethod
+    def _topological_order(prerequisites: Dict[str, List[str]]) -> List[str]:
+        waiting = {skill: len(set(needs)) for skill, needs in prerequisites.items()}
+        unlocks: Dict[str, List[str]] = {}
+        for skill, needs in prerequisites.items():
+            for need in set(needs):
+                unlocks.setdefault(need, []).append(skill)
+
+        ready = deque(skill for skill, count in waiting.items() if count == 0)
+        order = []
+        while ready:
+            skill = ready.popleft()
+            order.append(skill)
+            for later in unlocks.get(skill, ()):
+                waiting[later] -= 1
+                if waiting[later] == 0:
+                    ready.append(later)
+        if len(order) < len(prerequisites):
+            cyclic = sorted(skill for skill, count in waiting.items() if count > 0)
+            raise ValueError(f"Prerequisite cycle among: {', '.join(cyclic)}")
+        return order
+
+    def __len__(self) -> int:
+        return len(self.skills)
+
+    def __contains__(self, skill: str) -> bool:
+        return skill in self.index
+
+    def mask(self, skills: Iterable[str]) -> np.ndarray:
+        """Bitset of the given skills; names outside the graph are ignored"""
+        bits = np.zeros(self.words * 64, dtype=bool)
+        positions = [self.index[skill] for skill in skills if skill in self.index]
+        bits[positions] = True
+        return np.packbits(bits, bitorder='little').view('<u8')
+
+    def names(self, mask: np.ndarray) -> List[str]:
+        """Skills in a bitset, in topological order"""
+        bits = np.unpackbits(mask.view(np.uint8), bitorder='little')[:len(self.skills)]
+        return [self.skills[i] for i in np.flatnonzero(bits)]
+
+    def prerequisites(self, skills: Iterable[str]) -> np.ndarray:
+        """Bitset of everything the given skills depend on"""
+        rows = [self.index[skill] for skill in skills if skill in self.index]
+        return np.bitwise_or.reduce(self.closure[rows], axis=0) if rows else np.zeros(self.words, dtype='<u8')
+
+    def unmet_prerequisites(self, skills: Iterable[str], mastered: Iterable[str] = ()) -> List[str]:
+        """Every prerequisite of the given skills, direct or indirect, not yet mastered"""
+        return self.names(self.prerequisites(skills) & ~self.mask(mastered))
+
+    def blocked_by(self, skills: Iterable[str]) -> List[str]:
+        """Skills that depend, directly or indirectly, on any of the given skills"""
+        target = self.mask(skills)
+        return [self.skills[i] for i in np.flatnonzero((self.closure & target).any(axis=1))]
+
+    def frontier(self, mastered: Iterable[str]) -> List[str]:
+        """Skills not yet mastered whose prerequisites all are: what can be learned next"""
+        done = self.mask(mastered)
+        ready = ~(self.closure & ~done).any(axis=1)
+        bits = np.unpackbits(done.view(np.uint8), bitorder='little')[:len(self.skills)].astype(bool)
+        return [self.skills[i] for i in np.flatnonzero(ready & ~bits)]
+
+
+_graphs: Dict[str, SkillGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_skill_graph(course: str) -> Optional[SkillGraph]:
+    """
+    Prerequisite graph of a course, built on first use; None for courses without one
+
+    Its skills, with their SKILL_ALIASES, become the course's 'skill'
+    vocabulary in the topic alias index, so bank topics map onto graph nodes.
+    """
+    graph = _graphs.get(course)
+    if graph is None and course in COURSE_PREREQUISITES:
+        with _graphs_lock:
+            graph = _graphs.get(course)
+            if graph is None:
+                graph = SkillGraph(COURSE_PREREQUISITES[course])
+                get_topic_aliases(course).add_vocabulary('skill', graph.skills, SKILL_ALIASES.get(course))
+                _graphs[course] = graph
+    return graph
@@ -2,41 +2,23 @@ import plotly.graph_objects as go
 import plotly.express as px
 from typing import Dict, List
 
+from skill_graph import COURSE_SKILLS, get_skill_graph
+from topic_aliases import get_topic_aliases
+
 
 class SkillTreeBuilder:
     """Build and visualize skill trees for courses"""
 
     def __init__(self):
         self.skill_hierarchies = self._define_skill_hierarchies()
+        # Building a course's graph registers its skills as the topic alias 'skill' vocabulary
+        for course in self.skill_hierarchies:
+            get_skill_graph(course)
 
     def _define_skill_hierarchies(self) -> Dict:
-        """Define skill hierarchies for each course"""
-        return {
-            'Data Science': {
-                'Foundation': ['Basic Statistics', 'Python Basics', 'Data Types'],
-                'Intermediate': ['Probability', 'Data Manipulation', 'Visualization'],
-                'Advanced': ['Hypothesis Testing', 'Machine Learning', 'Big Data'],
-                'Expert': ['Statistical Modeling', 'Deep Learning', 'Data Engineering']
-            },
-            'AI/ML': {
-                'Foundation': ['Mathematics', 'Calculus', 'Linear Algebra'],
-                'Intermediate': ['Supervised Learning', 'Unsupervised Learning', 'Neural Networks'],
-                'Advanced': ['Deep Learning', 'NLP', 'Computer Vision'],
-                'Expert': ['Reinforcement Learning', 'GANs', 'Transformers']
-            },
-            'Cybersecurity': {
-                'Foundation': ['OS Basics', 'Linux', 'Networking'],
-                'Intermediate': ['Network Security', 'Cryptography', 'Web Security'],
-                'Advanced': ['Penetration Testing', 'Malware Analysis', 'Incident Response'],
-                'Expert': ['Security Architecture', 'Threat Hunting', 'Zero-day Research']
-            },
-            'Full Stack': {
-                'Foundation': ['HTML', 'CSS', 'JavaScript'],
-                'Intermediate': ['React/Vue', 'Node.js', 'Databases'],
-                'Advanced': ['API Design', 'Authentication', 'Cloud Deployment'],
-                'Expert': ['Microservices', 'DevOps', 'System Design']
-            }
-        }
+        """Skill names of each course's tiers, from the shared skill table"""
+        return {course: {tier: list(skills) for tier, skills in tiers.items()}
+                for course, tiers in COURSE_SKILLS.items()}
 
     def build_skill_tree(self, course: str, gap_analysis: Dict) -> go.Figure:
         """Build an interactive skill tree visualization"""
@@ -51,18 +33,23 @@ class SkillTreeBuilder:
         parents = []
         values = []
         colors = []
+        hovertext = []
 
         # Root node
         labels.append(course)
         parents.append("")
         values.append(100)
         colors.append('lightblue')
+        hovertext.append('Click to focus')
 
         # Add hierarchy levels
         level_names = ['Foundation', 'Intermediate', 'Advanced', 'Expert']
         level_colors = ['lightgreen', 'yellow', 'orange', 'red']
 
         actual_level = gap_analysis['actual_level']
+        skill_status = self._skill_statuses(course, gap_analysis)
+        graph = get_skill_graph(course)
+        mastered = [skill for skill, status in skill_status.items() if status == 'strong']
 
         for idx, level_name in enumerate(level_names):
             level_num = idx + 1
@@ -72,6 +59,7 @@ class SkillTreeBuilder:
             labels.append(level_name)
             parents.append(course)
             values.append(len(skills) * 10)
+            hovertext.append('Click to focus')
 
             # Color based on mastery
             if level_num <= actual_level:
@@ -88,14 +76,19 @@ class SkillTreeBuilder:
                 values.append(10)
 
                 # Check if this skill is in weak/strong topics
-                skill_status = self._get_skill_status(skill, gap_analysis)
-                if skill_status == 'strong':
+                status = skill_status.get(skill, 'moderate')
+                if status == 'strong':
                     colors.append('darkgreen')
-                elif skill_status == 'weak':
+                elif status == 'weak':
                     colors.append('darkred')
+                elif status == 'blocked':
+                    colors.append('lightgray')  # Depends on a weak skill
                 else:
                     colors.append('lightyellow')
 
+                unmet = graph.unmet_prerequisites([skill], mastered) if graph is not None else []
+                hovertext.append(f"Needs first: {', '.join(unmet)}" if unmet else 'Prerequisites met')
+
         # Create sunburst chart
         fig = go.Figure(go.Sunburst(
             labels=labels,
@@ -103,7 +96,8 @@ class SkillTreeBuilder:
             values=values,
             marker=dict(colors=colors),
             branchvalues="total",
-            hovertemplate='<b>%{label}</b><br>Click to focus<extra></extra>'
+            hovertext=hovertext,
+            hovertemplate='<b>%{label}</b><br>%{hovertext}<extra></extra>'
         ))
 
         fig.update_layout(
@@ -115,21 +109,26 @@ class SkillTreeBuilder:
 
         return fig
 
-    def _get_skill_status(self, skill: str, gap_analysis: Dict) -> str:
-        """Determine if a skill is strong, weak, or moderate"""
-        skill_lower = skill.lower()
-
-        # Check in strong topics
-        for topic in gap_analysis['strong_topics']:
-            if skill_lower in topic['topic'].lower() or topic['topic'].lower() in skill_lower:
-                return 'strong'
-
-        # Check in weak topics
-        for topic in gap_analysis['weak_topics']:
-            if skill_lower in topic['topic'].lower() or topic['topic'].lower() in skill_lower:
-                return 'weak'
-
-        return 'moderate'
+    def _skill_statuses(self, course: str, gap_analysis: Dict) -> Dict[str, str]:
+        """
+        Strong or weak status of the skills the analyzed topics map to
+
+        Skills that depend on a weak skill are 'blocked'; the rest are moderate.
+        """
+        aliases = get_topic_aliases(course)
+        statuses = {}
+        # Strong wins when a skill maps to both a strong and a weak topic
+        for status in ('weak', 'strong'):
+            for topic in gap_analysis[f'{status}_topics']:
+                for skill in aliases.lookup('skill', topic['topic']):
+                    statuses[skill] = status
+
+        graph = get_skill_graph(course)
+        if graph is not None:
+            weak = [skill for skill, status in statuses.items() if status == 'weak']
+            for skill in graph.blocked_by(weak):
+                statuses.setdefault(skill, 'blocked')
+        return statuses
 
     def _create_empty_tree(self) -> go.Figure:
         """Create an empty tree for unknown courses"""
@@ -0,0 +1,266 @@
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from question_store import QuestionBank
+
+LEVELS = range(1, 6)
+
+
+class AliasTable:
+    """
+    Vose alias table over a set of bank positions
+
+    Built once in O(n); every draw is one uniform integer and one uniform
+    float regardless of how skewed the weights are.
+    """
+
+    __slots__ = ('positions', 'prob', 'alias')
+
+    def __init__(self, positions: np.ndarray, weights: np.ndarray):
+        n = len(positions)
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.prob = np.ones(n)
+        self.alias = np.arange(n, dtype=np.int64)
+
+        total = float(np.sum(weights))
+        if n == 0 or total <= 0:
+            return
+        scaled = np.asarray(weights, dtype=np.float64) * (n / total)
+        small = [int(i) for i in np.flatnonzero(scaled < 1.0)]
+        large = [int(i) for i in np.flatnonzero(scaled >= 1.0)]
+        prob = scaled.tolist()
+        alias = list(range(n))
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            alias[s] = l
+            prob[l] -= 1.0 - prob[s]
+            if prob[l] < 1.0:
+                small.append(large.pop())
+        for i in small + large:
+            prob[i] = 1.0
+        self.prob = np.array(prob)
+        self.alias = np.array(alias, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def draw(self, rng: np.random.Generator) -> int:
+        i = int(rng.integers(len(self.positions)))
+        if rng.random() >= self.prob[i]:
+            i = int(self.alias[i])
+        return int(self.positions[i])
+
+
+class UnusedPositions:
+    """
+    Positions of one alias table not yet drawn for the current quiz
+
+    A virtual swap-remove over the table's slots: only slots that have been
+    swapped are stored, so creating one is O(1) and removing or drawing a
+    position costs a dict lookup plus a binary search (table positions are
+    ascending). Draws are uniform over what is left.
+    """
+
+    __slots__ = ('table', 'size', 'item_at', 'slot_of', 'synced')
+
+    def __init__(self, table: AliasTable):
+        self.table = table
+        self.size = len(table)
+        self.item_at: Dict[int, int] = {}
+        self.slot_of: Dict[int, int] = {}
+        self.synced = 0
+
+    def sync(self, chosen: List[int]):
+        """Remove the positions chosen since the last sync"""
+        for position in chosen[self.synced:]:
+            self.remove(position)
+        self.synced = len(chosen)
+
+    def remove(self, position: int):
+        positions = self.table.positions
+        item = int(np.searchsorted(positions, position))
+        if item >= len(positions) or positions[item] != position:
+            return
+        slot = self.slot_of.get(item, item)
+        if slot >= self.size:
+            return
+        last = self.size - 1
+        moved = self.item_at.get(last, last)
+        self.item_at[slot], self.slot_of[moved] = moved, slot
+        self.item_at[last], self.slot_of[item] = item, last
+        self.size = last
+
+    def draw(self, rng: np.random.Generator) -> Optional[int]:
+        if self.size == 0:
+            return None
+        slot = int(rng.integers(self.size))
+        return int(self.table.positions[self.item_at.get(slot, slot)])
+
+
+class StratifiedSampler:
+    """
+    Quiz sampler over the topic x level blueprint of one bank version
+
+    When the quiz has a place for every (level, topic) cell of the bank, each
+    cell gets one question. Otherwise every topic gets at least one question
+    (when the quiz is long enough; otherwise a weighted draw of distinct
+    topics). Each level gets its share of the quiz, and the remaining places
+    are filled by weighted draws within each level. Item weights come from an optional
+    exposure_weight column so over-exposed items can be damped.
+    """
+
+    max_retries = 8
+
+    def __init__(self, bank: QuestionBank, weights: Optional[np.ndarray] = None):
+        if weights is None:
+            if 'exposure_weight' in bank.df.columns:
+                weights = bank.df['exposure_weight'].fillna(1.0).to_numpy(dtype=np.float64)
+            else:
+                weights = np.ones(len(bank))
+        weights = np.clip(np.asarray(weights, dtype=np.float64), 0.0, None)
+        self.topics = bank.index.topics
+
+        self.strata: Dict[Tuple[int, int], AliasTable] = {}
+        self.topic_levels: Dict[int, List[int]] = {}
+        topic_codes = {name: code for code, name in enumerate(self.topics)}
+        for (level, topic), positions in bank.index.by_level_topic.items():
+            positions = positions[weights[positions] > 0]
+            if len(positions):
+                code = topic_codes[topic]
+                self.strata[(level, code)] = AliasTable(positions, weights[positions])
+                self.topic_levels.setdefault(code, []).append(level)
+
+        self.levels: Dict[int, AliasTable] = {}
+        for level in LEVELS:
+            positions = bank.index.by_level.get(level, np.empty(0, dtype=np.int64))
+            positions = positions[weights[positions] > 0]
+            if len(positions):
+                self.levels[level] = AliasTable(positions, weights[positions])
+
+        covered = np.array(sorted(self.topic_levels), dtype=np.int64)
+        topic_weight = np.bincount(bank.index.topic_codes[weights > 0], weights=weights[weights > 0],
+                                   minlength=len(self.topics))
+        self.topic_table = AliasTable(covered, topic_weight[covered])
+
+    def draw(self, length: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and levels of one quiz of up to length distinct questions"""
+        available = sum(len(table) for table in self.levels.values())
+        length = min(length, available)
+
+        chosen = []
+        levels = []
+        used = set()
+        unused: Dict[AliasTable, UnusedPositions] = {}
+
+        if length >= len(self.strata):
+            # Room for the whole blueprint: one question from every (level, topic) cell,
+            # then the levels are topped up towards an even split
+            for (level, _), table in self.strata.items():
+                position = table.draw(rng)
+                chosen.append(position)
+                levels.append(level)
+                used.add(position)
+            seeded = {level: levels.count(level) for level in LEVELS}
+            quota = self._level_quota(length, rng, seeded)
+            quota = {level: quota[level] - seeded[level] for level in LEVELS}
+        else:
+            quota = self._level_quota(length, rng)
+
+            # One question per topic first, at the level that most needs filling; topics
+            # found at few levels go first so they still find a level with room
+            topics = sorted(self._topics_to_cover(length, rng), key=lambda t: len(self.topic_levels[t]))
+            for topic in topics:
+                candidates = [level for level in self.topic_levels[topic] if quota[level] > 0]
+                if not candidates:
+                    continue
+                level = max(candidates, key=lambda lv: (quota[lv], rng.random()))
+                position = self._draw_unused(self.strata[(level, topic)], used, chosen, unused, rng)
+                if position is not None:
+                    chosen.append(position)
+                    levels.append(level)
+                    used.add(position)
+                    quota[level] -= 1
+
+        # Fill each level's remaining places with weighted draws across its topics
+        for level in LEVELS:
+            while quota[level] > 0:
+                position = self._draw_unused(self.levels[level], used, chosen, unused, rng)
+                if position is None:
+                    break
+                chosen.append(position)
+                levels.append(level)
+                used.add(position)
+                quota[level] -= 1
+
+        return np.array(chosen, dtype=np.int32), np.array(levels, dtype=np.int8)
+
+    def _level_quota(self, length: int, rng: np.random.Generator,
+                     floor: Optional[Dict[int, int]] = None) -> Dict[int, int]:
+        """
+        Split length evenly over levels, moving places from short levels to the others
+
+        floor gives places a level already holds; the rest go to the levels
+        with the fewest places first.
+        """
+        capacity = {level: len(self.levels[level]) if level in self.levels else 0 for level in LEVELS}
+        quota = dict(floor) if floor else {level: 0 for level in LEVELS}
+        remaining = length - sum(quota.values())
+        while remaining > 0:
+            open_levels = [level for level in LEVELS if quota[level] < capacity[level]]
+            if not open_levels:
+                break
+            lowest = min(quota[level] for level in open_levels)
+            tied = [level for level in open_levels if quota[level] == lowest]
+            # Too few places left for every tied level: a random subset gets one
+            lucky = tied if remaining >= len(tied) else rng.permutation(tied)[:remaining].tolist()
+            for level in lucky:
+                quota[level] += 1
+            remaining -= len(lucky)
+        return quota
+
+    def _topics_to_cover(self, length: int, rng: np.random.Generator) -> List[int]:
+        topics = list(self.topic_levels)
+        if len(topics) <= length:
+            return [topics[i] for i in rng.permutation(len(topics))]
+        # More topics than questions: a weighted draw of distinct topics, so coverage rotates across quizzes
+        picked = []
+        seen = set()
+        while len(picked) < length:
+            topic = self.topic_table.draw(rng)
+            if topic not in seen:
+                seen.add(topic)
+                picked.append(topic)
+        return picked
+
+    def _draw_unused(self, table: AliasTable, used: set, chosen: List[int],
+                     unused: Dict[AliasTable, UnusedPositions], rng: np.random.Generator) -> Optional[int]:
+        for _ in range(self.max_retries):
+            position = table.draw(rng)
+            if position not in used:
+                return position
+        # Nearly exhausted table: draw from its unused positions, tracked from here on
+        remaining = unused.get(table)
+        if remaining is None:
+            remaining = unused[table] = UnusedPositions(table)
+        remaining.sync(chosen)
+        return remaining.draw(rng)
+
+
+_samplers = weakref.WeakKeyDictionary()
+_samplers_lock = threading.Lock()
+
+
+def get_stratified_sampler(bank: QuestionBank) -> StratifiedSampler:
+    """StratifiedSampler for a bank version, built on first use and shared by every session"""
+    sampler = _samplers.get(bank)
+    if sampler is None:
+        with _samplers_lock:
+            sampler = _samplers.get(bank)
+            if sampler is None:
+                sampler = StratifiedSampler(bank)
+                _samplers[bank] = sampler
+    return sampler
@@ -0,0 +1,61 @@
+import json
+import sqlite3
+
+from event_log import ResponseLog, read_responses
+from knowledge_tracing import KnowledgeTracer, MasteryStore, replay_course
+
+COURSE = 'Data Science'
+
+
+def write_bank(uploads_dir):
+    rows = ['id,course,topic,level,question,option_a,option_b,option_c,option_d,correct_answer']
+    for i, topic in enumerate(['Statistics', 'Statistics', 'Python', 'Python']):
+        rows.append(f"q{i},{COURSE},{topic},{i % 2 + 1},Question {i}?,a,b,c,d,A")
+    (uploads_dir / 'ds.csv').write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    manifest = {'courses': [{'name': COURSE, 'file': 'ds.csv', 'popularity': 100}]}
+    (uploads_dir / 'manifest.json').write_text(json.dumps(manifest), encoding='utf-8')
+
+
+def test_replay_keys_mastery_by_learner_across_retakes(tmp_path):
+    write_bank(tmp_path)
+    log_path = str(tmp_path / 'responses.sqlite')
+    log = ResponseLog(log_path, flush_interval=0.05)
+    # Two attempts by the same learner, each in its own browser session
+    log.record('session-1', COURSE, 'q0', 1, False, learner_id='ada')
+    log.record('session-1', COURSE, 'q2', 0, True, learner_id='ada')
+    log.record('session-2', COURSE, 'q1', 0, True, learner_id='ada')
+    log.record('session-2', COURSE, 'q3', 0, True, learner_id='ada')
+    log.close()
+
+    store_path = str(tmp_path / 'mastery.sqlite')
+    stats = replay_course(log_path, COURSE, str(tmp_path), store_path)
+    assert stats['learners'] == 1
+
+    tracer = KnowledgeTracer()
+    statistics = tracer.update(tracer.update(tracer.p_init, False), True)
+    python = tracer.update(tracer.update(tracer.p_init, True), True)
+    mastery = MasteryStore(store_path).load('ada', COURSE)
+    assert set(mastery) == {'Statistics', 'Python'}
+    assert mastery['Statistics'][1] == 2 and abs(mastery['Statistics'][0] - statistics) < 1e-9
+    assert mastery['Python'][1] == 2 and abs(mastery['Python'][0] - python) < 1e-9
+    assert MasteryStore(store_path).load('session-1', COURSE) == {}
+
+
+def test_rows_without_learner_fall_back_to_session(tmp_path):
+    log_path = str(tmp_path / 'responses.sqlite')
+    # A log from before answers carried the learner
+    connection = sqlite3.connect(log_path)
+    connection.execute("CREATE TABLE responses (id INTEGER PRIMARY KEY, logged_at REAL NOT NULL, "
+                       "session_id TEXT NOT NULL, course TEXT, bank_version INTEGER, mode TEXT, position INTEGER, "
+                       "question_id TEXT, chosen INTEGER, correct INTEGER, latency_ms REAL)")
+    connection.execute("INSERT INTO responses (logged_at, session_id, course, question_id, correct) "
+                       "VALUES (0, 'old-session', ?, 'q0', 1)", (COURSE,))
+    connection.commit()
+    connection.close()
+
+    log = ResponseLog(log_path, flush_interval=0.05)
+    log.record('new-session', COURSE, 'q1', 0, True, learner_id='ada')
+    log.close()
+
+    rows = next(read_responses(log_path, COURSE))
+    assert rows['student_id'].tolist() == ['old-session', 'ada']
@@ -0,0 +1,26 @@
+from resource_index import ResourceIndex
+
+RESOURCES = [
+    {'title': 'Coursera: Calculus One', 'course': 'AI/ML', 'topic': 'calculus', 'level': 2, 'tags': ['Coursera']},
+    {'title': 'Andrew Ng: Machine Learning Course', 'course': 'AI/ML', 'topic': 'machine learning', 'level': 2,
+     'tags': ['Coursera']},
+    {'title': 'Khan Academy: Basic Statistics', 'course': 'Data Science', 'topic': 'Stati', 'level': 1,
+     'tags': ['Khan Academy']},
+]
+
+
+def test_query_ranks_within_course():
+    index = ResourceIndex(RESOURCES)
+    assert [r['title'] for r in index.search('calculus', 'AI/ML', 2)] == ['Coursera: Calculus One']
+    assert index.search('calculus', 'Data Science', 2) == []
+
+
+def test_prefix_query_matches_longer_terms():
+    index = ResourceIndex(RESOURCES)
+    assert [r['title'] for r in index.search('Statistics', 'Data Science', 1)] == ['Khan Academy: Basic Statistics']
+
+
+def test_query_without_tokens_matches_nothing():
+    index = ResourceIndex(RESOURCES)
+    assert index.search('', 'AI/ML', 2, match_all=True) == []
+    assert index.search('3', 'AI/ML', 2, match_all=True) == []
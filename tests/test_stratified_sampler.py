@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from question_store import QuestionBank
+from stratified_sampler import StratifiedSampler
+
+
+def make_bank(cells):
+    """Bank with the given number of questions per (level, topic) cell"""
+    rows = []
+    for (level, topic), count in cells.items():
+        for i in range(count):
+            rows.append({'id': f"{topic}-{level}-{i}", 'course': 'Test', 'topic': topic, 'level': level,
+                         'question': f"{topic} {level} {i}?", 'correct_answer': 0})
+    return QuestionBank('Test', pd.DataFrame(rows), version=1)
+
+
+def form_cells(bank, positions, levels):
+    topics = bank.df['topic'].to_numpy()
+    return {(int(level), topics[position]) for position, level in zip(positions, levels)}
+
+
+def test_forms_cover_every_cell_when_length_allows():
+    # Level 1 holds most of the cells, more than an even split of the quiz gives it
+    cells = {(1, f"T{t}"): 40 for t in range(8)}
+    cells.update({(level, 'T0'): 3 for level in range(2, 6)})
+    bank = make_bank(cells)
+    sampler = StratifiedSampler(bank)
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        positions, levels = sampler.draw(15, rng)
+        assert len(positions) == 15
+        assert len(set(positions.tolist())) == 15
+        assert form_cells(bank, positions, levels) == set(cells)
+
+
+def test_draws_exhaust_the_bank_without_repeats():
+    cells = {(level, topic): 5 for level in range(1, 6) for topic in ('A', 'B')}
+    bank = make_bank(cells)
+    weights = np.ones(len(bank))
+    weights[:5] = 1000.0  # Heavily weighted items keep getting redrawn once used
+    positions, _ = StratifiedSampler(bank, weights).draw(len(bank), np.random.default_rng(3))
+    assert sorted(positions.tolist()) == list(range(len(bank)))
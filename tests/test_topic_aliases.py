@@ -0,0 +1,46 @@
+import pytest
+
+from skill_graph import get_skill_graph
+from topic_aliases import TopicAliasIndex, get_topic_aliases
+
+
+# Topic names as they appear in the uploaded question banks
+@pytest.mark.parametrize('course, topic, skills', [
+    ('Data Science', 'Stati', ('Basic Statistics',)),
+    ('Data Science', '_Python MCQ', ('Python Basics',)),
+    ('Data Science', 'DBMS_Question_Bank_Full_80', ('Data Manipulation',)),
+    ('AI/ML', 'calculus', ('Calculus',)),
+    ('AI/ML', 'Machine Learning', ('Supervised Learning',)),
+    ('AI/ML', '_Python MCQ', ('Python Basics',)),
+    ('Cybersecurity', 'Networking_Prerequisite', ('Networking',)),
+    ('Cybersecurity', 'ComputerFundamentals_Prerequisite', ('OS Basics',)),
+    ('Cybersecurity', 'infomation security (15 Questions)', ('Network Security',)),
+    ('Cybersecurity', 'programming for cybersecurity', ('Programming Basics',)),
+    ('Cybersecurity', 'os_linux -cybersecurtiy', ('OS Basics', 'Linux')),
+    ('Full Stack', 'Web Fundamentals-HTML & CSS', ('HTML', 'CSS')),
+])
+def test_bank_topics_map_to_skills(course, topic, skills):
+    get_skill_graph(course)
+    assert get_topic_aliases(course).lookup('skill', topic) == skills
+
+
+def test_prefix_matches_only_from_topic_to_name():
+    index = TopicAliasIndex('Cybersecurity')
+    index.add_vocabulary('skill', ['Network Security', 'Networking'])
+    assert index.lookup('skill', 'Networking_Prerequisite') == ('Networking',)
+    assert index.lookup('skill', 'Netw') == ('Networking',)
+
+
+def test_only_best_scoring_names_are_kept():
+    index = TopicAliasIndex('Data Science')
+    index.add_vocabulary('skill', ['Statistical Modeling', 'Basic Statistics'])
+    assert index.lookup('skill', 'Stati') == ('Basic Statistics',)
+    assert index.lookup('skill', 'Statistical Modeling') == ('Statistical Modeling',)
+
+
+def test_aliases_match_as_their_name():
+    index = TopicAliasIndex('Full Stack')
+    index.add_topics(['DBMS'])
+    index.add_vocabulary('skill', ['Databases', 'API Design'], {'Databases': ['DBMS', 'SQL']})
+    assert index.lookup('skill', 'DBMS') == ('Databases',)
+    assert index.lookup('skill', 'Gardening') == ()
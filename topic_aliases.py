@@ -0,0 +1,132 @@
+import re
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Words that label a question bank rather than the subject it covers
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'the', 'for', 'of', 'to', 'in', 'on', 'with',
+    'question', 'questions', 'bank', 'mcq', 'mcqs', 'full', 'prerequisite', 'prerequisites',
+    'basic', 'basics', 'concept', 'concepts', 'level', 'intro', 'introduction'
+})
+
+# Misspellings seen in uploaded bank topic names
+CORRECTIONS = {
+    'cybersecurtiy': 'cybersecurity',
+    'infomation': 'information'
+}
+
+# Shortest topic token that may match a longer name token it is a prefix of ('stati' -> 'statistics')
+MIN_PREFIX = 4
+
+
+def tokenize(text: str, ignore: FrozenSet[str] = frozenset()) -> FrozenSet[str]:
+    """
+    Normalized subject tokens of a topic, skill or resource name
+
+    CamelCase and punctuation split words, numbers and stopwords are
+    dropped, and tokens in ignore (the course name) are dropped unless
+    nothing else is left.
+    """
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', str(text)).lower()
+    tokens = [CORRECTIONS.get(t, t) for t in re.findall(r'[a-z0-9]+', text) if not t.isdigit()]
+    tokens = {t for t in tokens if t not in STOPWORDS}
+    return frozenset(tokens - ignore) or frozenset(tokens)
+
+
+def _token_match(query: str, term: str) -> bool:
+    """A topic token matches a name token equal to it or, if long enough, one it begins"""
+    return query == term or (len(query) >= MIN_PREFIX and term.startswith(query))
+
+
+def _score(topic_tokens: FrozenSet[str], tokens: FrozenSet[str]) -> Optional[Tuple[int, int]]:
+    """(name tokens the topic covers, minus those it leaves uncovered), or None if it covers none"""
+    covered = sum(1 for t in tokens if any(_token_match(q, t) for q in topic_tokens))
+    return (covered, covered - len(tokens)) if covered else None
+
+
+class TopicAliasIndex:
+    """
+    Bank topic -> matching skill nodes and resource keys for one course
+
+    Each consumer registers the names it knows (a vocabulary, e.g. 'skill'
+    or 'resource'); topics are matched against every vocabulary once, when
+    the bank is published or the vocabulary is added, and lookups after
+    that are dictionary hits. A name scores by how many of its tokens the
+    topic covers, less the ones it leaves uncovered, and a topic maps to
+    the best-scoring names only: 'Stati' to 'Basic Statistics' but not
+    'Statistical Modeling', an 'HTML & CSS' topic to both 'HTML' and 'CSS'.
+    """
+
+    def __init__(self, course: str):
+        self.course = course
+        self.ignore = tokenize(course)
+        self._lock = threading.Lock()
+        self._topics: Dict[str, FrozenSet[str]] = {}
+        # Per vocabulary, (name, tokens) for every name and every alternate name
+        self._vocabularies: Dict[str, Tuple[Tuple[str, FrozenSet[str]], ...]] = {}
+        self._aliases: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+    def add_topics(self, topics: Iterable[str]):
+        """Precompute aliases for bank topics in every registered vocabulary"""
+        with self._lock:
+            for topic in topics:
+                if topic not in self._topics:
+                    self._topics[topic] = tokenize(topic, self.ignore)
+                    for kind in self._vocabularies:
+                        self._aliases[(kind, topic)] = self._match(kind, topic)
+
+    def add_vocabulary(self, kind: str, names: Iterable[str], aliases: Dict[str, List[str]] = None):
+        """
+        Register the names one consumer looks topics up against; re-registering is a no-op
+
+        aliases maps a name to other names bank topics use for it, matched
+        as if they were the name itself.
+        """
+        vocabulary = []
+        for name in names:
+            vocabulary.append((name, tokenize(name, self.ignore)))
+            vocabulary.extend((name, tokenize(alias, self.ignore)) for alias in (aliases or {}).get(name, ()))
+        vocabulary = tuple(vocabulary)
+        with self._lock:
+            if self._vocabularies.get(kind) == vocabulary:
+                return
+            self._vocabularies[kind] = vocabulary
+            for topic in self._topics:
+                self._aliases[(kind, topic)] = self._match(kind, topic)
+
+    def lookup(self, kind: str, topic: str) -> Tuple[str, ...]:
+        """Best-scoring names in a vocabulary for a topic, in vocabulary order"""
+        aliases = self._aliases.get((kind, topic))
+        if aliases is None:
+            # A topic from outside the bank (e.g. a renamed area): match it once and remember
+            with self._lock:
+                self._topics.setdefault(topic, tokenize(topic, self.ignore))
+                aliases = self._aliases[(kind, topic)] = self._match(kind, topic)
+        return aliases
+
+    def _match(self, kind: str, topic: str) -> Tuple[str, ...]:
+        topic_tokens = self._topics[topic]
+        scores: Dict[str, Tuple[int, int]] = {}
+        for name, tokens in self._vocabularies.get(kind, ()):
+            score = _score(topic_tokens, tokens)
+            if score is not None and (name not in scores or score > scores[name]):
+                scores[name] = score
+        if not scores:
+            return ()
+        best = max(scores.values())
+        return tuple(name for name, score in scores.items() if score == best)
+
+
+_indexes: Dict[str, TopicAliasIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_topic_aliases(course: str) -> TopicAliasIndex:
+    """Process-wide alias index for a course, shared by every consumer"""
+    index = _indexes.get(course)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(course)
+            if index is None:
+                index = _indexes[course] = TopicAliasIndex(course)
+    return index